@@ -0,0 +1,179 @@
+"""
+Opt-in tracking of the objects allocated per frame by the hot render and update paths.
+
+When installed, each tracked function is wrapped so that it counts the objects it allocated
+during each call, including anything its callees allocated. The count comes from the
+collector's generation 0 allocation counter, so it is the number of container objects
+(tuples, lists, dicts and so on) that drive young generation collections. Objects recycled
+from the interpreter's free lists (small tuples, floats, frames) never reach the allocator and
+are not counted, and tracemalloc cannot see them either. Totals are kept per frame and checked
+against the budgets in ALLOCATION_BUDGETS. Frames that change screens tear down one world and
+build the next, so they count towards the totals but are not held to the budgets.
+"""
+import functools
+import gc
+import importlib
+import logging
+from collections.abc import Callable
+
+import config as cfg
+
+TRACKED_FUNCTIONS = (
+    "render.trench",
+    "render.barriers",
+    "render.render_barrier",
+    "render.torpedoes",
+    "render.distance",
+    "utils.project",
+    "screens.MainMenuScreen.update",
+    "screens.GameplayScreen.update",
+    "screens.VictoryScreen.update",
+)
+
+
+class AllocationBudgetExceeded(RuntimeError):
+
+    """Raised when a tracked function allocates more than its budget in a frame."""
+
+
+class AllocationTracker:
+
+    """Attributes per-frame allocations to the tracked functions."""
+
+    def __init__(self, budgets: dict[str, int] = cfg.ALLOCATION_BUDGETS, strict: bool = True) -> None:
+        """
+        Create the tracker, without installing it
+
+        Args:
+            budgets (dict): Per frame allocation budget of each function, in objects
+            strict (bool): Whether exceeding a budget fails the run
+        """
+        self.budgets = budgets
+        self.strict = strict
+        self.frame_count: int = 0
+
+        self._originals: dict[str, tuple[object, str, Callable]] = {}
+        self._collected: int = 0  # Generation 0 counts cleared by collections since the tracker was installed
+        self._stack: list[list[int]] = []  # [counter at entry, net of tracked callees, allocated by tracked callees]
+        self._frame: dict[str, list[int]] = {name: [0, 0] for name in TRACKED_FUNCTIONS}  # [calls, objects]
+        self._totals: dict[str, list[int]] = {name: [0, 0, 0] for name in TRACKED_FUNCTIONS}  # [calls, objects, worst]
+
+    def __repr__(self) -> str:
+        """Return a string representation of the tracker."""
+        return f"AllocationTracker(frames={self.frame_count}, installed={bool(self._originals)})"
+
+    def install(self) -> None:
+        """Start counting collections and wrap each of the tracked functions."""
+        gc.callbacks.append(self._on_gc)
+        for name in TRACKED_FUNCTIONS:
+            module_name, *path = name.split(".")
+            owner = importlib.import_module(module_name)
+            for attribute in path[:-1]:
+                owner = getattr(owner, attribute)
+            original = getattr(owner, path[-1])
+            self._originals[name] = (owner, path[-1], original)
+            setattr(owner, path[-1], self._wrap(name, original))
+
+    def uninstall(self) -> None:
+        """Restore the original functions and stop counting collections."""
+        for owner, attribute, original in self._originals.values():
+            setattr(owner, attribute, original)
+        self._originals.clear()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def begin_frame(self) -> None:
+        """Reset the per-frame counters."""
+        for counters in self._frame.values():
+            counters[0] = 0
+            counters[1] = 0
+
+    def end_frame(self, budgeted: bool = True) -> None:
+        """
+        Fold the frame's counters into the session totals and check the budgets
+
+        Args:
+            budgeted: False for frames that change screens, which are left out of the worst
+                case and the budget check
+
+        Raises:
+            AllocationBudgetExceeded: If strict, and a function allocated more than its budget
+        """
+        self.frame_count += 1
+        over_budget = []
+        for name, (calls, allocated) in self._frame.items():
+            totals = self._totals[name]
+            totals[0] += calls
+            totals[1] += allocated
+            if not budgeted:
+                continue
+            totals[2] = max(totals[2], allocated)
+            budget = self.budgets.get(name)
+            if budget is not None and allocated > budget:
+                over_budget.append(f"{name} allocated {allocated} objects (budget {budget})")
+
+        if over_budget and self.strict:
+            self.report()
+            raise AllocationBudgetExceeded(f"Frame {self.frame_count}: " + ", ".join(over_budget))
+
+    def report(self) -> str:
+        """
+        Log the per-frame allocation budget table
+
+        Returns:
+            str: The table
+        """
+        frames = max(self.frame_count, 1)
+        rows = [f"{'Function':<32}{'Calls/frame':>12}{'Objs/frame':>12}{'Worst objs':>12}{'Budget':>12}"]
+        for name, (calls, allocated, worst) in self._totals.items():
+            budget = self.budgets.get(name)
+            rows.append(
+                f"{name:<32}{calls / frames:>12.1f}{allocated / frames:>12.1f}"
+                f"{worst:>12}{'-' if budget is None else budget:>12}"
+            )
+
+        table = "\n".join(rows)
+        logging.info(f"Allocations over {self.frame_count} frames\n{table}")
+        return table
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        """Carry the generation 0 count over a collection, which clears it."""
+        if phase == "start":
+            self._collected += gc.get_count()[0]
+
+    def _counter(self) -> int:
+        """Return the objects allocated less those freed since the tracker was installed."""
+        return self._collected + gc.get_count()[0]
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        """
+        Wrap a function to count the objects it allocates per call
+
+        The generation 0 counter goes down again as objects are freed, so on its own it only
+        gives the net change over a call. A call's count is therefore the sum of what its
+        tracked callees counted, plus whatever of its own net change is positive. An object
+        is counted if it outlives the tracked call that created it, which catches the
+        temporaries handed back by tracked helpers such as utils.project even when the caller
+        drops them straight away.
+        """
+        stack = self._stack
+        counters = self._frame[name]
+        counter = self._counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = [counter(), 0, 0]
+            stack.append(call)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack.pop()
+                net = counter() - call[0]
+                allocated = max(net - call[1], 0) + call[2]
+                counters[0] += 1
+                counters[1] += allocated
+                if stack:
+                    stack[-1][1] += net
+                    stack[-1][2] += allocated
+
+        return wrapper
@@ -0,0 +1,215 @@
+"""
+Low latency sound effects, preloaded at startup and played on a pool of channels.
+
+The mixer is opened with a small AUDIO_BUFFER so sounds start within a few milliseconds of
+being triggered. Every sound in SOUNDS is loaded and decoded into a pygame.mixer.Sound when the
+engine is created, from SOUND_DIRECTORY if a file for it exists and otherwise synthesized, so
+playing one in the frame loop never touches the disk or a decoder. Sounds are played on a fixed
+pool of AUDIO_CHANNELS channels. When they are all busy a new sound steals the channel of the
+lowest priority sound playing, the oldest if there are several, as long as that is no more
+important than the new one. The engine hum loops on a channel of its own, for as long as any
+run that started it is still flying.
+
+Without an audio device the engine stays silent and every call does nothing.
+"""
+import logging
+import time
+from pathlib import Path
+
+import config as cfg
+import numpy as np
+import pygame
+
+# Name -> (priority, volume), a higher priority sound can steal the channel of a lower one
+SOUNDS: dict[str, tuple[int, float]] = {
+    "engine": (0, 0.35),
+    "torpedo": (2, 0.8),
+    "impact": (2, 0.8),
+    "explosion": (3, 1.0),
+    "launch_zone": (4, 0.9),
+    "bullseye": (4, 0.9),
+    "out_of_ammo": (1, 0.6),
+}
+SOUND_EXTENSIONS = (".ogg", ".wav")
+
+
+def pre_init() -> None:
+    """Set up the mixer for low latency, must be called before pygame.init()."""
+    pygame.mixer.pre_init(cfg.AUDIO_FREQUENCY, -16, 2, cfg.AUDIO_BUFFER)
+
+
+def find_file(directory: Path, name: str) -> Path | None:
+    """Return the file of a sound in the sound directory, if there is one."""
+    for extension in SOUND_EXTENSIONS:
+        path = directory / f"{name}{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def synthesize(name: str, frequency: int) -> np.ndarray:
+    """
+    Generate a stand-in for a sound that has no file
+
+    Args:
+        name (str): One of SOUNDS
+        frequency (int): The mixer's sample rate
+
+    Returns:
+        np.ndarray: Mono samples, -1 to 1
+    """
+    rng = np.random.default_rng(sum(name.encode()))
+
+    def timeline(seconds: float) -> np.ndarray:
+        return np.arange(int(seconds * frequency)) / frequency
+
+    if name == "engine":
+        # A whole number of cycles of each partial, so the loop is seamless
+        t = timeline(1.0)
+        wave = 0.6 * np.sin(2 * np.pi * 55 * t) + 0.3 * np.sin(2 * np.pi * 110 * t) + 0.1 * np.sin(2 * np.pi * 165 * t)
+        return wave * (0.8 + 0.2 * np.sin(2 * np.pi * 4 * t))
+    if name == "torpedo":
+        t = timeline(0.6)
+        pitch = 900 * np.exp(-t * 3)
+        wave = np.sin(2 * np.pi * np.cumsum(pitch) / frequency) + 0.3 * rng.uniform(-1, 1, len(t))
+        return wave * np.exp(-t * 4)
+    if name in {"impact", "explosion"}:
+        seconds = 0.5 if name == "impact" else 2.5
+        t = timeline(seconds)
+        noise = rng.uniform(-1, 1, len(t))
+        # Low pass the noise for a rumble
+        kernel = 24 if name == "impact" else 64
+        noise = np.convolve(noise, np.ones(kernel) / kernel * 4, mode="same")
+        return np.clip(noise, -1, 1) * np.exp(-t * (8 if name == "impact" else 1.6))
+    if name == "out_of_ammo":
+        t = timeline(0.15)
+        return np.sign(np.sin(2 * np.pi * 220 * t)) * 0.5 * np.exp(-t * 20)
+
+    # Rising chimes for the radio calls
+    notes = (523.25, 659.25, 783.99) if name == "launch_zone" else (523.25, 659.25, 783.99, 1046.5)
+    parts = []
+    for note in notes:
+        t = timeline(0.18)
+        parts.append(np.sin(2 * np.pi * note * t) * np.exp(-t * 6))
+    return np.concatenate(parts) * 0.8
+
+
+class AudioEngine:
+
+    """Plays the preloaded sounds on a fixed pool of channels."""
+
+    def __init__(self, directory: str = cfg.SOUND_DIRECTORY, channels: int = cfg.AUDIO_CHANNELS) -> None:
+        """
+        Open the mixer and load every sound
+
+        Args:
+            directory (str): Where sound files are looked for, by the name of the sound
+            channels (int): The size of the channel pool for sound effects
+        """
+        self.sounds: dict[str, pygame.mixer.Sound] = {}
+        self.pool: list[pygame.mixer.Channel] = []
+        self.playing: list[tuple[int, float]] = []  # Priority and start time of each pool channel's sound
+        self.hum: pygame.mixer.Channel | None = None
+        self.hum_holders: set[object] = set()  # The runs still flying, the hum plays while there are any
+        self.stolen: int = 0
+        self.dropped: int = 0
+
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+        except pygame.error as error:
+            logging.warning(f"No audio, {error}")
+            return
+
+        frequency, _, mixer_channels = pygame.mixer.get_init()
+        pygame.mixer.set_num_channels(channels + 1)
+        pygame.mixer.set_reserved(1)
+        self.hum = pygame.mixer.Channel(0)
+        self.pool = [pygame.mixer.Channel(i) for i in range(1, channels + 1)]
+        self.playing = [(0, 0.0)] * channels
+
+        start = time.perf_counter()
+        for name, (_, volume) in SOUNDS.items():
+            path = find_file(Path(directory), name)
+            if path is not None:
+                sound = pygame.mixer.Sound(path)
+            else:
+                samples = (synthesize(name, frequency) * 32767 * 0.8).astype(np.int16)
+                if mixer_channels > 1:
+                    samples = np.repeat(samples[:, np.newaxis], mixer_channels, axis=1)
+                sound = pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+            sound.set_volume(volume)
+            self.sounds[name] = sound
+        logging.info(
+            f"Loaded {len(self.sounds)} sounds in {(time.perf_counter() - start) * 1000:.1f}ms, "
+            f"{channels} channels, {cfg.AUDIO_BUFFER} sample buffer"
+        )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the engine."""
+        return f"AudioEngine(sounds={len(self.sounds)}, channels={len(self.pool)}, stolen={self.stolen}, dropped={self.dropped})"
+
+    @property
+    def enabled(self) -> bool:
+        """Whether there is an audio device to play on."""
+        return bool(self.sounds)
+
+    def play(self, name: str) -> None:
+        """
+        Play a sound on a free channel, or steal the channel of a less important one
+
+        Args:
+            name (str): One of SOUNDS
+        """
+        if not self.sounds:
+            return
+
+        priority = SOUNDS[name][0]
+        victim = -1
+        for i, channel in enumerate(self.pool):
+            if not channel.get_busy():
+                victim = i
+                break
+            if self.playing[i][0] <= priority and (victim < 0 or self.playing[i] < self.playing[victim]):
+                victim = i
+
+        if victim < 0:
+            self.dropped += 1
+            return
+        if self.pool[victim].get_busy():
+            self.stolen += 1
+        self.pool[victim].play(self.sounds[name])
+        self.playing[victim] = (priority, time.perf_counter())
+
+    def start_hum(self, holder: object = None) -> None:
+        """
+        Start the looping engine hum, if no run is already holding it, cutting short a fade out still in progress
+
+        Args:
+            holder (object, optional): The run the hum is for, it keeps playing until every holder has stopped it
+        """
+        # The hum plays for as long as there are holders, asking the channel would count one still fading out as busy
+        playing = bool(self.hum_holders)
+        self.hum_holders.add(holder)
+        if self.hum is not None and not playing:
+            self.hum.stop()
+            self.hum.play(self.sounds["engine"], loops=-1, fade_ms=300)
+
+    def stop_hum(self, holder: object = None) -> None:
+        """
+        Fade out the engine hum, once no other run is using it
+
+        Args:
+            holder (object, optional): The run that no longer needs the hum, None to stop it for every run
+        """
+        if holder is None:
+            self.hum_holders.clear()
+        else:
+            self.hum_holders.discard(holder)
+        if self.hum is not None and not self.hum_holders:
+            self.hum.fadeout(500)
+
+    def report(self) -> None:
+        """Log how often sounds had to steal a channel or were dropped."""
+        if self.sounds:
+            logging.info(f"Audio: {self.stolen} sounds stole a channel, {self.dropped} were dropped")
@@ -0,0 +1,234 @@
+"""
+First launch calibration of the render quality preset.
+
+The hardware the game runs on ranges from single board computers to desktops. On first launch
+a short scripted fly-through of the trench is run with each of the QUALITY_PRESETS, from best to
+worst, and the best preset that holds the frame rate with headroom is kept. The choice is stored
+in CALIBRATION_FILE along with a fingerprint of the hardware, software and renderer, and the
+calibration is run again whenever that fingerprint changes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import platform
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from renderers import Renderer
+import config as cfg
+import numpy as np
+import profiles
+import pygame
+import utils
+from greebles import Greebles
+from projectiles import ProjectilePool
+from starfield import Starfield
+from torpedos import Torpedos
+
+
+def apply_preset(name: str) -> None:
+    """
+    Apply a quality preset to the configuration, re-deriving the values that depend on it
+
+    Must be called before the display is created and anything is sized from the configuration.
+    Settings pinned by a config profile are left as the profile set them.
+
+    Args:
+        name (str): One of the keys of QUALITY_PRESETS
+    """
+    for setting, value in cfg.QUALITY_PRESETS[name].items():
+        if setting not in profiles.pinned:
+            setattr(cfg, setting, value)
+    profiles.refresh()
+
+
+def fingerprint(renderer: str) -> str:
+    """
+    Identify the hardware, software and renderer that a calibration is valid for
+
+    Args:
+        renderer (str): The name of the renderer backend in use
+
+    Returns:
+        str: A short hash, which changes whenever any of them do
+    """
+    parts = {
+        "version": cfg.VERSION,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "system": platform.platform(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+        "renderer": renderer,
+        "presets": cfg.QUALITY_PRESETS,
+        "pinned": {setting: getattr(cfg, setting) for setting in sorted(profiles.pinned)},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load(renderer: str, path: str = cfg.CALIBRATION_FILE) -> str | None:
+    """
+    Read the stored preset, if it was calibrated on this hardware and version
+
+    Args:
+        renderer (str): The name of the renderer backend in use
+        path (str): The calibration file
+
+    Returns:
+        str: The name of the stored preset, None if calibration needs to be run
+    """
+    try:
+        stored = json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+
+    if stored.get("fingerprint") != fingerprint(renderer) or stored.get("preset") not in cfg.QUALITY_PRESETS:
+        logging.info("Hardware or version changed since the last calibration")
+        return None
+    return stored["preset"]
+
+
+def save(renderer: str, preset: str, results: dict[str, dict[str, float]], path: str = cfg.CALIBRATION_FILE) -> None:
+    """
+    Store the chosen preset along with the measurements it was chosen from
+
+    Args:
+        renderer (str): The name of the renderer backend in use
+        preset (str): The chosen preset
+        results (dict): Frame time percentiles, in milliseconds, of each preset that was measured
+        path (str): The calibration file
+    """
+    stored = {
+        "fingerprint": fingerprint(renderer),
+        "preset": preset,
+        "calibrated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(stored, indent=2))
+
+
+def fly_through(renderer: Renderer, surface: pygame.Surface, frames: int = cfg.CALIBRATION_FRAMES) -> np.ndarray:
+    """
+    Fly a scripted run down the trench as fast as possible, timing every frame
+
+    The ship weaves through the trench from the start to the exhaust port, firing its torpedoes
+    in the launch zone and pulling up out of the trench at the end, so every part of the
+    gameplay scene is drawn. Collisions are not checked.
+
+    Args:
+        renderer (Renderer): The renderer to draw with
+        surface (pygame.Surface): The display surface
+        frames (int): The number of frames to fly for
+
+    Returns:
+        np.ndarray: The time taken by each frame after the warm up, in seconds
+    """
+    barriers = utils.create_barriers()
+    greebles = Greebles(0) if cfg.GREEBLE_PANELS > 0 else None
+    pool = ProjectilePool()
+    torpedos = Torpedos(pool)
+    stars = Starfield(seed=0)
+    barrier_index = 0
+    times = np.zeros(frames, dtype=np.float64)
+
+    for frame in range(frames):
+        start = time.perf_counter()
+        progress = frame / frames
+        pos = (
+            math.sin(progress * 6 * math.pi) * cfg.TRENCH_WIDTH / 4,
+            math.cos(progress * 4 * math.pi) * cfg.TRENCH_HEIGHT / 4 - max(0.0, progress - 0.9) * 10 * cfg.TRENCH_HEIGHT,
+            progress * (cfg.EXHAUST_POSITION + 20),
+        )
+        while barrier_index < len(barriers) - 1 and pos[2] > barriers[barrier_index][0]:
+            barrier_index += 1
+        if pos[2] >= cfg.LAUNCH_POSITION and not torpedos.launched:
+            torpedos.fire(pos)
+        pool.update()
+
+        pygame.event.pump()
+        renderer.begin_frame(surface)
+        if pos[1] < -cfg.TRENCH_HEIGHT / 2:
+            stars.update(cfg.STAR_CRUISE_SPEED_MS)
+            renderer.stars(stars, surface, cfg.CANVAS_CENTER_Y)
+        renderer.trench(surface, pos)
+        if greebles is not None:
+            renderer.greebles(surface, greebles.project(pos))
+        renderer.barriers(surface, barriers, barrier_index, pos)
+        renderer.exhaust_port(surface, pos)
+        renderer.torpedoes(surface, pool, pos)
+        renderer.distance(surface, int(cfg.EXHAUST_POSITION - pos[2]))
+        renderer.end_frame(surface)
+        pygame.display.flip()
+        times[frame] = time.perf_counter() - start
+
+    return times[cfg.CALIBRATION_WARMUP_FRAMES:]
+
+
+def calibrate(renderer: Renderer) -> tuple[str, dict[str, dict[str, float]]]:
+    """
+    Run the fly-through with each preset, from best to worst, until one fits the frame budget
+
+    The display mode is changed to each preset's resolution in turn. If no preset fits, the
+    worst is chosen. The chosen preset is left applied.
+
+    Args:
+        renderer (Renderer): The renderer to draw with
+
+    Returns:
+        tuple: The chosen preset, and the frame time percentiles in milliseconds of each preset measured
+    """
+    budget = cfg.CALIBRATION_HEADROOM / cfg.FPS
+    results: dict[str, dict[str, float]] = {}
+    chosen = None
+    for name in cfg.QUALITY_PRESETS:
+        apply_preset(name)
+        surface = pygame.display.set_mode((cfg.CANVAS_WIDTH, cfg.CANVAS_HEIGHT))
+        times = fly_through(renderer, surface)
+        p50, p95, p99 = np.percentile(times, (50, 95, 99)) * 1000
+        measured = np.percentile(times, cfg.CALIBRATION_PERCENTILE)
+        results[name] = {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)}
+        logging.info(f"Calibration {name}: p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms")
+        chosen = name
+        if measured <= budget:
+            break
+
+    apply_preset(chosen)
+    return chosen, results
+
+
+def choose_preset(renderer: Renderer, renderer_name: str, preset: str | None = None, recalibrate: bool = False) -> str:
+    """
+    Pick and apply the quality preset for this launch
+
+    An explicitly requested preset always wins. Otherwise the stored calibration is used, and
+    calibration is run if there is none for this hardware and version, or if it is requested.
+
+    Args:
+        renderer (Renderer): The renderer calibration draws with
+        renderer_name (str): The name of the renderer, calibrations are only valid for the renderer they measured
+        preset (str): A preset to use without calibrating
+        recalibrate (bool): Whether to calibrate even if a stored calibration is valid
+
+    Returns:
+        str: The name of the applied preset
+    """
+    if preset is None and not recalibrate:
+        preset = load(renderer_name)
+
+    if preset is None:
+        logging.info("Calibrating render quality")
+        preset, results = calibrate(renderer)
+        save(renderer_name, preset, results)
+        logging.info(f"Calibrated to the {preset} preset")
+    else:
+        apply_preset(preset)
+
+    return preset
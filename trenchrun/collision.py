@@ -0,0 +1,187 @@
+"""
+Collision detection between projectiles and the trench.
+
+The barriers are indexed by z, one bucket per metre of trench, so finding the barrier
+(if any) at a projectile's depth is a single array lookup. This keeps the per-frame cost
+proportional to the number of projectiles rather than the number of barriers. The blocks of
+each barrier are kept as a bitset per row, so whether a block is solid is a lookup, a shift and
+a mask, whatever the barrier's grid size.
+"""
+import math
+
+import config as cfg
+import geometry as geo
+import grid
+import numpy as np
+from grid import Barrier
+
+# What a projectile impacted
+IMPACT_NONE = 0
+IMPACT_FLOOR = 1
+IMPACT_BARRIER = 2
+IMPACT_TARGET = 3
+
+
+class BarrierIndex:
+
+    """Z-indexed lookup table of the barriers in a trench."""
+
+    def __init__(self, barriers: list[Barrier]) -> None:
+        """
+        Build the index for the given barriers
+
+        Args:
+            barriers (list): The barriers, as created by utils.create_barriers
+        """
+        count = len(barriers)
+        self.starts = np.zeros(max(count, 1), dtype=np.float64)
+        self.ends = np.zeros(max(count, 1), dtype=np.float64)
+        self.sizes = np.ones(max(count, 1), dtype=np.float64)
+        # The solid blocks of each row of each barrier, bit column
+        self.rows = np.zeros((max(count, 1), cfg.BARRIER_MAX_GRID), dtype=np.intp)
+
+        # Bucket i holds the index of the barrier occupying z in [i, i + 1), or -1
+        self.z_index = np.full(math.ceil(cfg.TRENCH_LENGTH) + 1, -1, dtype=np.intp)
+        for i, (start, length, blocks, size) in enumerate(barriers):
+            self.starts[i] = start
+            self.ends[i] = start + length
+            self.sizes[i] = size
+            self.rows[i, :size] = grid.rows(blocks, size)
+            self.z_index[int(start):int(start + length) + 1] = i
+
+        self.rows_flat = self.rows.reshape(-1)
+
+    def barrier_at(self, z: float) -> int:
+        """
+        Find the barrier occupying the given depth
+
+        Args:
+            z (float): The depth along the trench
+
+        Returns:
+            int: The index of the barrier, or -1 if there is none
+        """
+        bucket = int(z)
+        if bucket < 0 or bucket >= len(self.z_index):
+            return -1
+
+        index = self.z_index[bucket]
+        if index < 0 or z < self.starts[index] or z > self.ends[index]:
+            return -1
+        return int(index)
+
+    def solid_at(self, x: float, y: float, z: float) -> bool:
+        """Check whether the given point lies inside a solid barrier block."""
+        index = self.barrier_at(z)
+        if index < 0:
+            return False
+
+        table = geo.table
+        half_width = table.trench_half_width
+        half_height = table.trench_half_height
+        if abs(x) >= half_width or abs(y) >= half_height:
+            return False
+
+        size = self.sizes[index]
+        column = int((x + half_width) / (2 * half_width) * size)
+        row = int((y + half_height) / (2 * half_height) * size)
+        return bool(self.rows[index, row] >> column & 1)
+
+
+class ProjectileCollider:
+
+    """Resolves projectile collisions against a barrier index, without allocating per frame."""
+
+    def __init__(self, index: BarrierIndex, capacity: int) -> None:
+        """
+        Create the collider and its scratch buffers
+
+        Args:
+            index (BarrierIndex): The barriers to collide against
+            capacity (int): The capacity of the projectile pool being tested
+        """
+        self.index = index
+        self._bucket = np.zeros(capacity, dtype=np.intp)
+        self._barrier = np.zeros(capacity, dtype=np.intp)
+        self._cell = np.zeros(capacity, dtype=np.intp)
+        self._row = np.zeros(capacity, dtype=np.intp)
+        self._coord = np.zeros(capacity, dtype=np.float64)
+        self._bound = np.zeros(capacity, dtype=np.float64)
+        self._mask = np.zeros(capacity, dtype=bool)
+        self._size = np.zeros(capacity, dtype=np.float64)
+        self._solid = np.zeros(capacity, dtype=np.intp)
+
+    def barrier_hits(self, position: np.ndarray, candidates: np.ndarray, out: np.ndarray) -> None:
+        """
+        Find the projectiles that are inside a solid barrier block
+
+        The broad phase looks up each projectile's z bucket in the barrier index, the narrow
+        phase then looks up the row of blocks of that barrier the projectile is in, and tests
+        the bit of its column.
+
+        Args:
+            position (np.ndarray): The (N, 3) projectile positions
+            candidates (np.ndarray): Mask of the projectiles to test
+            out (np.ndarray): Mask that receives the projectiles that hit a block
+        """
+        index = self.index
+        z = position[:, 2]
+        coord = self._coord
+        mask = self._mask
+
+        # Broad phase: z bucket -> barrier
+        np.clip(z, 0, len(index.z_index) - 1, out=coord)
+        np.copyto(self._bucket, coord, casting="unsafe")
+        np.take(index.z_index, self._bucket, out=self._barrier)
+        np.greater_equal(self._barrier, 0, out=out)
+        np.logical_and(out, candidates, out=out)
+        if not out.any():
+            return
+
+        np.take(index.starts, self._barrier, out=self._bound, mode="clip")
+        np.greater_equal(z, self._bound, out=mask)
+        np.logical_and(out, mask, out=out)
+        np.take(index.ends, self._barrier, out=self._bound, mode="clip")
+        np.less_equal(z, self._bound, out=mask)
+        np.logical_and(out, mask, out=out)
+
+        # Narrow phase: which block of the barrier's grid, and is it solid
+        half_width = geo.table.trench_half_width
+        half_height = geo.table.trench_half_height
+        np.take(index.sizes, self._barrier, out=self._size, mode="clip")
+        for axis, half_extent, cells in ((0, half_width, self._cell), (1, half_height, self._row)):
+            np.abs(position[:, axis], out=coord)
+            np.less(coord, half_extent, out=mask)
+            np.logical_and(out, mask, out=out)
+            np.add(position[:, axis], half_extent, out=coord)
+            np.multiply(coord, self._size, out=coord)
+            np.multiply(coord, 1.0 / (2 * half_extent), out=coord)
+            np.clip(coord, 0, cfg.BARRIER_MAX_GRID - 1, out=coord)
+            np.copyto(cells, coord, casting="unsafe")
+
+        # The row of blocks, shifted down to the bit of the column
+        np.multiply(self._barrier, cfg.BARRIER_MAX_GRID, out=self._bucket)
+        np.add(self._bucket, self._row, out=self._bucket)
+        np.take(index.rows_flat, self._bucket, out=self._solid, mode="clip")
+        np.right_shift(self._solid, self._cell, out=self._solid)
+        np.bitwise_and(self._solid, 1, out=self._solid)
+        np.not_equal(self._solid, 0, out=mask)
+        np.logical_and(out, mask, out=out)
+
+    def exhaust_port_hits(self, position: np.ndarray, candidates: np.ndarray, out: np.ndarray) -> None:
+        """
+        Find the projectiles whose whole radius lies within the exhaust port opening
+
+        Args:
+            position (np.ndarray): The (N, 3) projectile positions
+            candidates (np.ndarray): Mask of the projectiles to test, those that reached the floor
+            out (np.ndarray): Mask that receives the projectiles that went down the port
+        """
+        half_opening = geo.table.exhaust_half_width - cfg.TORPEDO_RADIUS
+        np.abs(position[:, 0], out=self._coord)
+        np.less_equal(self._coord, half_opening, out=out)
+        np.subtract(position[:, 2], geo.table.exhaust_position, out=self._coord)
+        np.abs(self._coord, out=self._coord)
+        np.less_equal(self._coord, half_opening, out=self._mask)
+        np.logical_and(out, self._mask, out=out)
+        np.logical_and(out, candidates, out=out)
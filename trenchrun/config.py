@@ -3,7 +3,25 @@ Hardcoded configuration settings for the game.
 
 All distances or sizes are in meters unless otherwise specified.
 """
-from pygame.locals import K_DOWN, K_LEFT, K_RIGHT, K_UP, K_a, K_d, K_s, K_w
+from pygame.locals import (
+    K_2,
+    K_BACKSPACE,
+    K_DOWN,
+    K_F7,
+    K_F9,
+    K_F10,
+    K_F11,
+    K_F12,
+    K_LEFT,
+    K_RETURN,
+    K_RIGHT,
+    K_SPACE,
+    K_UP,
+    K_a,
+    K_d,
+    K_s,
+    K_w,
+)
 
 VERSION = "1.6"
 
@@ -17,11 +35,143 @@ CANVAS_CENTER_Y = CANVAS_HEIGHT // 2
 CANVAS_CENTER = (CANVAS_CENTER_X, CANVAS_CENTER_Y)
 FONT_STYLE = "font/DeathStar.ttf"
 
+# Garbage Collection Settings
+GC_MANAGED = True  # Collect only in the slack at the end of frames
+GC_HITCH_FACTOR = 1.5  # Frames longer than this multiple of the budget are hitches
+GC_GEN1_INTERVAL = 10  # Every n-th slack collection also collects generation 1
+GC_FORCE_THRESHOLD = 20000  # Pending allocations at which a collection is forced without slack
+GC_SETTLE_MAX_WAIT = 30  # Frames the collection after a run builds its world waits for slack before it is forced
+
+# Input Latency Settings
+LOW_LATENCY = False  # Sample input as late as the predicted frame time allows, and defer non-critical work past the flip
+INPUT_SLEEP_SLICE_S = 0.001  # The wait for the next frame drains the event queue this often
+INPUT_LATENCY_MARGIN = 1.25  # Multiple of the predicted input to flip time that the low-latency wait leaves
+INPUT_LATENCY_HISTORY = 600  # Latency measurements kept for the percentiles
+
+# Joystick Settings
+JOYSTICK_AXES = (0, 1)  # Device axes that steer horizontally and vertically
+JOYSTICK_DEAD_ZONE = 0.08  # Normalised deflection either side of the centre that reads as 0
+JOYSTICK_CURVE = 1.8  # Response curve exponent, above 1 gives finer control near the centre
+JOYSTICK_INVERT_Y = True  # Flight style, pushing the yoke forward dives
+JOYSTICK_CALIBRATE_KEY = K_F7  # Hotkey that starts and finishes a joystick calibration
+JOYSTICK_CALIBRATION_FILE = "joystick.json"
+
+# Audio Settings
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 512  # Mixer buffer in samples, small for low latency (512 is under 12ms at 44.1kHz)
+AUDIO_CHANNELS = 8  # Channels in the pool for sound effects, the engine hum has its own
+SOUND_DIRECTORY = "sounds"  # Sound files replace the synthesized stand-ins, by name (see audio.SOUNDS)
+
+# Async Loop Settings
+ASYNC_LOOP = False  # Run the frame loop on asyncio, with background services in the slack between frames
+ASYNC_TIME_SLICE_S = 0.002  # Background work stops being scheduled this long before the next frame is due
+TELEMETRY_INTERVAL = 5.0  # Seconds between telemetry reports
+TELEMETRY_RECONNECT_MAX_S = 30.0  # Longest wait before trying to reach the collector again
+
+# Frame Scheduler Settings
+SCHEDULER_BUDGET = 0.8  # Fraction of the frame time work may use before deferrable work is put off
+SCHEDULER_MAX_STARVATION = 10  # Frames deferrable work can be put off for before it runs anyway
+SCHEDULER_INITIAL_COST_S = 0.004  # Expected cost of a task that has never run, so its first run waits for a light frame
+PARTICLE_UPDATE_CAP = 200  # Particles moved every frame, the rest are moved as deferrable work
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept for reuse
+DEBUG_LOG = False  # Log the torpedoes in flight with icecream, far too slow to leave on every frame
+
+# Profiling Settings
+PROFILE_KEY = K_F9  # Hotkey that starts a profile capture
+PROFILE_FRAMES = 300
+PROFILE_DIRECTORY = "profiles"
+PROFILE_MIN_STACK_FRACTION = 1e-4  # Stacks carrying less of the capture's time are left out of the flamegraph
+PROFILE_COLLAPSE_SECONDS = 10.0  # Longest the collapsed stacks of a capture are worked on
+PROFILE_WRITE_TIMEOUT_S = 15.0  # Longest the game waits on exit for captures still being written
+
+# Capture Settings
+RECORD_KEY = K_F10  # Hotkey that starts and stops a recording
+REPLAY_KEY = K_F11  # Hotkey that saves the instant replay buffer
+SCREENSHOT_KEY = K_F12
+CAPTURE_DIRECTORY = "captures"
+CAPTURE_FORMAT = "raw"  # raw, png or pipe (to CAPTURE_ENCODER_COMMAND)
+CAPTURE_SCALE = 0.5  # Size of recorded and replay frames relative to the canvas
+CAPTURE_FPS = 30
+CAPTURE_STAGING_FRAMES = 8  # Frames that can be waiting for the worker before capture frames are dropped
+REPLAY_SECONDS = 30
+REPLAY_FPS = 15
+CAPTURE_ENCODER_COMMAND = (
+    "ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+    "-s", "{width}x{height}", "-r", "{fps}", "-i", "-", "{output}",
+)
+
+# Rewind Settings
+PRACTICE_MODE = False  # Allow rewinding the run, and keep it going after a crash until it is rewound
+REWIND_KEY = K_BACKSPACE
+REWIND_SECONDS = 30  # Simulation state kept for rewinding and crash dumps
+REWIND_STEP_SECONDS = 3  # How far back each press of the rewind key goes
+
+# Run Log Settings
+RUN_LOG_FILE = "runs.bin"  # Append-only log of every run, summarise it with python trenchrun/runlog.py
+RUN_LOG_FRAMES = 8192  # Frame times kept per run for its frame time summary, the most recent ones
+
+# Ghost Settings
+GHOSTS = False  # Race the ghosts of earlier runs of the same barrier layout, and save each run as a ghost
+RUN_SEED = None  # Seed of the barrier layout of every run, a random layout each run if None
+GHOST_DIRECTORY = "ghosts"
+GHOST_LIMIT = 500  # Most ghosts raced at once, winning runs first and then those that got furthest
+GHOST_QUANTUM_M = 1 / 256  # Resolution ghost positions are stored at
+GHOST_MAX_TICKS = 8192  # Longest run saved as a ghost, later ticks are left out
+GHOST_Z_STEP_M = 0.25  # Spacing of the z grid ghost trajectories are resampled onto
+GHOST_AHEAD_M = 12.0  # How far ahead of the ship the ghosts are shown
+GHOST_ALPHA = 110  # Opacity of the ghost wireframes, 0 to 255
+
+# Greeble Settings
+GREEBLE_PANELS = 12  # Detail panels on each wall and the floor of every WALL_INTERVAL of trench, 0 for none
+GREEBLE_GRID = 8  # Cells along and across each wall that the panels are laid out on
+GREEBLE_MIN_PIXELS = 2.0  # Detail lines shorter than this on screen are skipped
+
+# Split Screen Settings
+SPLIT_SCREEN_KEY = K_2  # Starts a two player run from the main menu
+PLAYER_KEYS = (  # Steering and fire keys of each player on a split screen from left to right, and who has the joystick
+    {"movement": (K_a, K_d, K_w, K_s), "fire": K_SPACE, "stick": True},
+    {"movement": (K_LEFT, K_RIGHT, K_UP, K_DOWN), "fire": K_RETURN, "stick": False},
+)
+SPLIT_DIVIDER_COLOUR = (90, 90, 90)
+
+# Config Profile Settings
+CONFIG_PROFILE_DIRECTORY = "configs"  # Where --config looks for TOML profiles by name
+
+# Calibration Settings
+CALIBRATION_FILE = "calibration.json"  # Stored result of the first launch calibration
+CALIBRATION_FRAMES = 300  # Length of the scripted fly-through run for each preset
+CALIBRATION_WARMUP_FRAMES = 30  # Frames at the start of each run that are not measured
+CALIBRATION_PERCENTILE = 95  # Frame time percentile that has to fit within the budget
+CALIBRATION_HEADROOM = 0.75  # Fraction of the frame budget a preset may use
+
+# Metrics Settings
+METRICS_HOST = "127.0.0.1"
+METRICS_FILE_INTERVAL = 15.0  # Seconds between writes of the metrics file
+METRICS_DROPPED_FACTOR = 1.5  # Frames longer than this multiple of the budget count as dropped
+METRICS_FRAME_TIME_BUCKETS = (0.004, 0.008, 0.012, 0.0167, 0.02, 0.025, 0.0333, 0.05, 0.1, 0.25)
+METRICS_INPUT_LATENCY_BUCKETS = (0.002, 0.004, 0.008, 0.012, 0.0167, 0.025, 0.0333, 0.05, 0.1)
+
+# Objects allocated per frame by each tracked function, used with --profile-allocations.
+# Set at about three times the worst case seen over full, crash, split screen and low preset runs
+ALLOCATION_BUDGETS = {
+    "render.trench": 48,
+    "render.barriers": 48,
+    "render.render_barrier": 48,
+    "render.torpedoes": 8,
+    "render.distance": 4,
+    "utils.project": 24,
+    "screens.GameplayScreen.update": 32,
+    "screens.MainMenuScreen.update": 16,
+    "screens.VictoryScreen.update": 16,
+}
+
 # Trench Settings
 TRENCH_LENGTH = 2400
 TRENCH_WIDTH = 10
 TRENCH_HEIGHT = 10
 WALL_INTERVAL = 25
+BARRIER_GRIDS = (3,)  # Rows and columns of blocks a barrier can have, each barrier picks one at random
+BARRIER_MAX_GRID = 16  # Finest barrier grid
 EXHAUST_POSITION = TRENCH_LENGTH - 100
 EXHAUST_WIDTH = TRENCH_WIDTH / 3.0
 
@@ -31,14 +181,72 @@ TORPEDO_RADIUS = 0.25
 TORPEDO_SPAN = 0.7
 LAUNCH_POSITION = EXHAUST_POSITION - TORPEDO_RANGE - 50
 
+# Projectile Settings
+PROJECTILE_CAPACITY = 256
+PROJECTILE_DROP_RANGE = 5.0  # Remaining range at which projectiles begin to drop
+PROJECTILE_DROP_RATE = 0.5  # Metres dropped per metre travelled while dropping
+
+# Starfield Settings
+STAR_COUNT = 2000
+STAR_FIELD_DEPTH = 100.0
+STAR_CRUISE_SPEED_MS = 4.0
+STAR_WARP_SPEED_MS = 60.0  # Speed above which stars are drawn as streaks
+STAR_VICTORY_SPEED_MS = 150.0
+STAR_STREAK_SECONDS = 0.05  # How far back in time each streak reaches
+STAR_STREAK_SAMPLES = 8
+
 # Parameters for rendering
+RENDERER = "pygame"  # Renderer backend, see renderers.RENDERERS
+PIPELINE_GEOMETRY = False  # Prepare gameplay geometry a frame ahead, on a worker thread when free-threaded
+RASTER_MIN_SEGMENTS = 256  # Smaller batches are drawn with pygame.draw.line by the surfarray renderer
 DEATH_STAR_RADIUS = CANVAS_HEIGHT * 0.4
 LINE_WIDTH = 2
 NEAR_PLANE_M = 0.1
 FAR_PLANE_M = 180.0
+BARRIER_DETAIL_DISTANCE_M = 180.0  # Barriers further away are drawn without the diagonals across their faces
+HIDDEN_LINES = False  # Skip barrier edges that are provably hidden behind solid blocks
+WALL_DETAIL_DISTANCE_M = 180.0  # How far ahead the ribs along the trench walls are drawn
+PARTICLE_COUNT = 500
 SCALE_WIDTH = CANVAS_WIDTH / 2
 SCALE_HEIGHT = CANVAS_HEIGHT / 2
 
+# Render quality presets, from best to worst, chosen by calibration or --preset
+QUALITY_PRESETS = {
+    "high": {
+        "CANVAS_WIDTH": 1024,
+        "CANVAS_HEIGHT": 768,
+        "FAR_PLANE_M": 180.0,
+        "BARRIER_DETAIL_DISTANCE_M": 180.0,
+        "WALL_DETAIL_DISTANCE_M": 180.0,
+        "GREEBLE_PANELS": 12,
+        "PARTICLE_COUNT": 500,
+        "STAR_COUNT": 2000,
+        "LINE_WIDTH": 2,
+    },
+    "medium": {
+        "CANVAS_WIDTH": 800,
+        "CANVAS_HEIGHT": 600,
+        "FAR_PLANE_M": 140.0,
+        "BARRIER_DETAIL_DISTANCE_M": 70.0,
+        "WALL_DETAIL_DISTANCE_M": 100.0,
+        "GREEBLE_PANELS": 8,
+        "PARTICLE_COUNT": 300,
+        "STAR_COUNT": 1000,
+        "LINE_WIDTH": 1,
+    },
+    "low": {
+        "CANVAS_WIDTH": 640,
+        "CANVAS_HEIGHT": 480,
+        "FAR_PLANE_M": 100.0,
+        "BARRIER_DETAIL_DISTANCE_M": 30.0,
+        "WALL_DETAIL_DISTANCE_M": 50.0,
+        "GREEBLE_PANELS": 4,
+        "PARTICLE_COUNT": 150,
+        "STAR_COUNT": 400,
+        "LINE_WIDTH": 1,
+    },
+}
+
 # Ship Size (dictates collision detection)
 SHIP_WIDTH_M = 1.6
 SHIP_HEIGHT_M = 0.8
@@ -54,14 +262,20 @@ ACCELERATION_MSS = 60.0
 DEATH_STAR_COLOUR = (170, 170, 170)
 TRENCH_COLOUR = (221, 221, 221)
 TORPEDO_COLOUR = (20, 40, 255)
+TURRET_FIRE_COLOUR = (40, 240, 40)
+PROJECTILE_COLOURS = (TORPEDO_COLOUR, TURRET_FIRE_COLOUR)  # Indexed by projectile owner
 DISTANCE_COLOUR = (190, 10, 10)
 EXHAUST_PORT_COLOUR = (110, 110, 140)
 INTRO_TEXT_COLOUR = (245, 188, 0)
 WARNING_TEXT_COLOUR = (190, 10, 10)
 PARTICLE_COLOUR = (255, 255, 255)
+GHOST_COLOUR = (120, 200, 255)
+GREEBLE_COLOUR = (96, 96, 96)
+BARRIER_SHADES = 64  # Steps the barrier colours fade in over the distance to the far plane
 BARRIER_COLOURS = ((240, 0, 0), (240, 185, 0), (0, 240, 0), (240, 240, 0), (0, 240, 240), (240, 0, 240))
 
 BLOCK_VERTEX = ((0, 1), (1, 2), (2, 3), (3, 0), (0, 4), (1, 5), (2, 6), (3, 7), (4, 5), (5, 6), (6, 7), (7, 4), (0, 2), (1, 3))
+BLOCK_OUTLINE = BLOCK_VERTEX[:12]  # Without the diagonals across the front face
 
 HEX_DIGITS = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'a', 'b', 'c', 'd', 'e', 'f')
 
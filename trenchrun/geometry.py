@@ -0,0 +1,178 @@
+"""
+Immutable table of the geometry derived from the configuration.
+
+Block sizes, half-extents, projection scales and the like only change when a config profile or
+quality preset is applied, so they are worked out once into a Geometry table rather than on every
+call of the hot paths. The table in use is module level `table`, rebuilt by compile_table().
+
+Where a view of the trench is drawn, and the constants that project onto it, are a Viewport. The
+table holds the viewport of the whole canvas, which is used unless another one is given, such as
+one of the halves of a split screen.
+"""
+import config as cfg
+
+
+class Frozen:
+
+    """Base of the immutable tables, set up with object.__setattr__ in __init__ and never changed after."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Refuse to change the table, compile a new one instead."""
+        raise AttributeError(f"{type(self).__name__} is immutable, cannot set {name}")
+
+    def __delattr__(self, name: str) -> None:
+        """Refuse to change the table, compile a new one instead."""
+        raise AttributeError(f"{type(self).__name__} is immutable, cannot delete {name}")
+
+
+class Viewport(Frozen):
+
+    """An area of the canvas that a view of the trench is drawn into, and the constants that project onto it."""
+
+    __slots__ = (
+        "centre_x",
+        "centre_y",
+        "height",
+        "left",
+        "scale_height",
+        "scale_width",
+        "top",
+        "width",
+    )
+
+    def __init__(self, left: int = 0, top: int = 0, width: int | None = None, height: int | None = None) -> None:
+        """
+        Work out the projection onto an area of the canvas
+
+        The view fills the area at the scale it would have on the whole canvas, so an area narrower
+        or shorter than the canvas shows less of the sides, or the top and bottom, of the trench.
+        The projection is relative to the area, which is drawn into as a surface of its own.
+
+        Args:
+            left (int): Left edge of the area on the canvas
+            top (int): Top edge of the area on the canvas
+            width (int, optional): Width of the area, defaults to the canvas width
+            height (int, optional): Height of the area, defaults to the canvas height
+        """
+        width = cfg.CANVAS_WIDTH if width is None else width
+        height = cfg.CANVAS_HEIGHT if height is None else height
+        fill = max(width / cfg.CANVAS_WIDTH, height / cfg.CANVAS_HEIGHT)
+        values = {
+            "left": left,
+            "top": top,
+            "width": width,
+            "height": height,
+            "centre_x": width // 2,
+            "centre_y": height // 2,
+            "scale_width": cfg.CANVAS_WIDTH / 2 * fill,
+            "scale_height": cfg.CANVAS_HEIGHT / 2 * fill,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the viewport."""
+        return f"Viewport({self.width}x{self.height} at {self.left},{self.top})"
+
+    @property
+    def rect(self) -> tuple[int, int, int, int]:
+        """The area of the canvas, as left, top, width and height."""
+        return (self.left, self.top, self.width, self.height)
+
+
+def split(count: int) -> tuple[Viewport, ...]:
+    """
+    Divide the canvas into side by side viewports, one for each player
+
+    Args:
+        count (int): The number of viewports
+
+    Returns:
+        tuple: The viewports, from left to right
+    """
+    width = cfg.CANVAS_WIDTH // count
+    return tuple(Viewport(i * width, 0, width, cfg.CANVAS_HEIGHT) for i in range(count))
+
+
+class Geometry(Frozen):
+
+    """Every constant the hot paths derive from the trench, ship and canvas sizes."""
+
+    __slots__ = (
+        "barrier_planes",
+        "barrier_shades",
+        "exhaust_half_width",
+        "exhaust_position",
+        "ship_half_height",
+        "ship_half_width",
+        "ship_x_limit",
+        "ship_y_limit",
+        "trench_half_height",
+        "trench_half_width",
+        "trench_length",
+        "viewport",
+        "wall_interval",
+    )
+
+    def __init__(self) -> None:
+        """Derive the table from the current configuration."""
+        trench_half_width = cfg.TRENCH_WIDTH / 2
+        trench_half_height = cfg.TRENCH_HEIGHT / 2
+        ship_half_width = cfg.SHIP_WIDTH_M / 2
+        ship_half_height = cfg.SHIP_HEIGHT_M / 2
+
+        values = {
+            "trench_length": cfg.TRENCH_LENGTH,
+            "trench_half_width": trench_half_width,
+            "trench_half_height": trench_half_height,
+            "wall_interval": cfg.WALL_INTERVAL,
+            # The x and y of the planes between the columns and rows of blocks, indexed by barrier grid size
+            "barrier_planes": tuple(
+                (
+                    tuple(-trench_half_width + cfg.TRENCH_WIDTH * i / size for i in range(size + 1)),
+                    tuple(-trench_half_height + cfg.TRENCH_HEIGHT * i / size for i in range(size + 1)),
+                ) if size else ((), ())
+                for size in range(cfg.BARRIER_MAX_GRID + 1)
+            ),
+            "ship_half_width": ship_half_width,
+            "ship_half_height": ship_half_height,
+            "ship_x_limit": trench_half_width - ship_half_width,
+            "ship_y_limit": trench_half_height - ship_half_height,
+            "exhaust_position": cfg.EXHAUST_POSITION,
+            "exhaust_half_width": cfg.EXHAUST_WIDTH / 2,
+            # Each barrier colour faded with distance, from nearest to the far plane
+            "barrier_shades": tuple(
+                tuple(
+                    "#" + "".join(f"{min(int(component * (1.0 - 0.9 * level / cfg.BARRIER_SHADES)), 255):02x}" for component in colour)
+                    for level in range(cfg.BARRIER_SHADES + 1)
+                )
+                for colour in cfg.BARRIER_COLOURS
+            ),
+            "viewport": Viewport(),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the table."""
+        return (
+            f"Geometry(trench={self.trench_half_width * 2}x{self.trench_half_height * 2}x{self.trench_length}, "
+            f"canvas={self.viewport.width}x{self.viewport.height})"
+        )
+
+
+table = Geometry()
+
+
+def compile_table() -> Geometry:
+    """
+    Rebuild the geometry table from the configuration, after it has been changed
+
+    Returns:
+        Geometry: The new table, which is also now the module level table
+    """
+    global table
+    table = Geometry()
+    return table
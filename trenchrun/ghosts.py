@@ -0,0 +1,314 @@
+"""
+Ghosts of earlier runs, raced as translucent wireframe ships.
+
+Every run of a barrier layout can be saved as a ghost: the ship position of each tick, quantized
+to GHOST_QUANTUM_M and stored as the difference from the tick before, which fits in 16 bits. When
+a run starts, the best GHOST_LIMIT ghosts of its layout, the seed together with the barrier grid
+sizes it was flown with, are loaded and resampled onto a common z grid, so where every ghost was
+at any z is a single interpolation across all of them. How a run ended and how far it got are
+kept in the header, so ghosts are ranked without decoding them, and only the best GHOST_LIMIT of
+each layout are kept on disk.
+
+The ship always moves down the trench at the same speed, so a ghost at the player's z would sit
+on top of the ship. They are shown GHOST_AHEAD_M ahead instead, each where it flew at that z, and
+disappear where they crashed. Only the ghosts inside the view are expanded into lines, so drawing
+costs the same whether a handful or hundreds are loaded.
+"""
+from __future__ import annotations
+
+import logging
+import struct
+import time
+from pathlib import Path
+
+import config as cfg
+import geometry as geo
+import numpy as np
+import runlog
+
+HEADER = struct.Struct("<4s H B x I I I f f")  # Magic, version, outcome, seed, barrier grids, ticks, quantum, end z
+MAGIC = b"TRGH"
+VERSION = 3
+
+
+def encode(positions: np.ndarray, seed: int, grids: int, outcome: int, quantum: float = cfg.GHOST_QUANTUM_M) -> bytes:
+    """
+    Pack a trajectory into a ghost
+
+    Args:
+        positions (np.ndarray): (ticks, 3) ship positions
+        seed (int): Seed of the barrier layout it was flown through
+        grids (int): The barrier grid sizes of the layout, from grid.configuration
+        outcome (int): How the run ended, one of the runlog outcomes
+        quantum (float): Resolution the positions are stored at, in metres
+
+    Returns:
+        bytes: The header, the first position as 32 bit integers and 16 bit differences for the rest
+
+    Raises:
+        ValueError: If the ship moved too far in one tick to be stored at this resolution
+    """
+    quantized = np.rint(np.asarray(positions, dtype=np.float64) / quantum).astype(np.int64)
+    deltas = np.diff(quantized, axis=0)
+    if len(deltas) and np.abs(deltas).max() > np.iinfo(np.int16).max:
+        raise ValueError(f"The ship moved more than {np.iinfo(np.int16).max * quantum:.1f}m in one tick")
+    end_z = float(quantized[-1, 2] * quantum) if len(quantized) else 0.0
+    return (
+        HEADER.pack(MAGIC, VERSION, outcome, seed, grids, len(quantized), quantum, end_z)
+        + quantized[:1].astype("<i4").tobytes()
+        + deltas.astype("<i2").tobytes()
+    )
+
+
+def decode(data: bytes) -> tuple[int, int, np.ndarray]:
+    """
+    Unpack a ghost
+
+    Args:
+        data (bytes): A ghost, as written by encode
+
+    Returns:
+        tuple: The seed, the outcome and the (ticks, 3) ship positions
+
+    Raises:
+        ValueError: If the data is not a ghost of this version
+    """
+    magic, version, outcome, seed, _, ticks, quantum, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} ghost")
+    if ticks == 0:
+        return seed, outcome, np.zeros((0, 3), dtype=np.float32)
+
+    quantized = np.empty((ticks, 3), dtype=np.int64)
+    quantized[0] = np.frombuffer(data, dtype="<i4", count=3, offset=HEADER.size)
+    quantized[1:] = np.frombuffer(data, dtype="<i2", count=(ticks - 1) * 3, offset=HEADER.size + 12).reshape(-1, 3)
+    np.cumsum(quantized, axis=0, out=quantized)
+    return seed, outcome, (quantized * quantum).astype(np.float32)
+
+
+def rank(seed: int, grids: int, directory: str = cfg.GHOST_DIRECTORY) -> list[tuple[tuple[bool, float], Path]]:
+    """
+    Rank the ghosts of a barrier layout from their headers, winning runs first and then those that got furthest
+
+    Args:
+        seed (int): Seed of the barrier layout
+        grids (int): The barrier grid sizes of the layout, from grid.configuration
+        directory (str): Where ghosts are kept
+
+    Returns:
+        list: The rank and path of each ghost, best first
+    """
+    ranked = []
+    for path in Path(directory).glob(f"{seed:08x}-*.ghost"):
+        try:
+            with path.open("rb") as file:
+                magic, version, outcome, ghost_seed, ghost_grids, ticks, _, end_z = HEADER.unpack(file.read(HEADER.size))
+        except (OSError, struct.error) as error:
+            logging.warning(f"Skipping ghost {path}, {error}")
+            continue
+        if magic != MAGIC or version != VERSION:
+            logging.warning(f"Skipping ghost {path}, not a version {VERSION} ghost")
+            continue
+        if ghost_seed == seed and ghost_grids == grids and ticks:
+            ranked.append(((outcome == runlog.OUTCOME_WON, end_z), path))
+
+    ranked.sort(key=lambda ghost: ghost[0], reverse=True)
+    return ranked
+
+
+class GhostRecorder:
+
+    """Keeps the ship position of every tick of a run, so it can be saved as a ghost."""
+
+    def __init__(self, capacity: int = cfg.GHOST_MAX_TICKS) -> None:
+        """
+        Create the recorder
+
+        Args:
+            capacity (int): Most ticks kept, a longer run is saved up to this tick
+        """
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+
+    def record(self, tick: int, position: tuple[float, float, float]) -> None:
+        """
+        Keep the ship position of a tick, overwriting it if the run was rewound past it
+
+        Args:
+            tick (int): The tick of the run
+            position (tuple): The ship position
+        """
+        if tick < len(self.positions):
+            self.positions[tick] = position
+
+    def save(self, ticks: int, seed: int, grids: int, outcome: int, directory: str = cfg.GHOST_DIRECTORY) -> Path | None:
+        """
+        Write the run to the ghost directory
+
+        Args:
+            ticks (int): Ticks the run lasted
+            seed (int): Seed of the barrier layout
+            grids (int): The barrier grid sizes of the layout, from grid.configuration
+            outcome (int): How the run ended, one of the runlog outcomes
+            directory (str): Where ghosts are kept
+
+        Returns:
+            Path: The ghost file, None if the run could not be saved
+        """
+        ticks = min(ticks, len(self.positions))
+        if ticks < 2:
+            return None
+        try:
+            data = encode(self.positions[:ticks], seed, grids, outcome)
+        except ValueError as error:
+            logging.warning(f"Run not saved as a ghost, {error}")
+            return None
+
+        path = Path(directory) / f"{seed:08x}-{time.time_ns()}.ghost"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.prune(seed, grids, directory)
+        return path
+
+    @staticmethod
+    def prune(seed: int, grids: int, directory: str = cfg.GHOST_DIRECTORY, limit: int = cfg.GHOST_LIMIT) -> None:
+        """
+        Delete the ghosts of a barrier layout that are no longer among the best, as they would never be raced
+
+        Args:
+            seed (int): Seed of the barrier layout
+            grids (int): The barrier grid sizes of the layout, from grid.configuration
+            directory (str): Where ghosts are kept
+            limit (int): Ghosts kept
+        """
+        for _, path in rank(seed, grids, directory)[limit:]:
+            path.unlink(missing_ok=True)
+
+
+class GhostSet:
+
+    """The ghosts raced in a run, resampled onto a shared z grid."""
+
+    def __init__(self, trajectories: list[np.ndarray], step: float = cfg.GHOST_Z_STEP_M) -> None:
+        """
+        Resample the trajectories of the ghosts
+
+        Args:
+            trajectories (list): (ticks, 3) ship positions of each ghost
+            step (float): Spacing of the z grid, in metres
+        """
+        self.step = step
+        self.end_z = np.array([trajectory[-1, 2] for trajectory in trajectories], dtype=np.float32)
+        grid = np.arange(0.0, float(self.end_z.max(initial=0.0)) + 2 * step, step, dtype=np.float32)
+        self.xy = np.empty((len(trajectories), len(grid), 2), dtype=np.float32)
+        for i, trajectory in enumerate(trajectories):
+            # The ship never moves back down the trench, but a rewound run may have paused on a z
+            z = np.maximum.accumulate(trajectory[:, 2])
+            self.xy[i, :, 0] = np.interp(grid, z, trajectory[:, 0])
+            self.xy[i, :, 1] = np.interp(grid, z, trajectory[:, 1])
+
+        # Outline of an X-wing seen head on, as the start and end of each line relative to its centre
+        table = geo.table
+        w = table.ship_half_width
+        h = table.ship_half_height
+        body = h / 2
+        self.model = np.array((
+            ((-w, -h), (w, h)),
+            ((-w, h), (w, -h)),
+            ((-body, -body), (body, -body)),
+            ((body, -body), (body, body)),
+            ((body, body), (-body, body)),
+            ((-body, body), (-body, -body)),
+        ), dtype=np.float32).reshape(-1, 4)
+
+    def __len__(self) -> int:
+        """Return the number of ghosts."""
+        return len(self.end_z)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the ghosts."""
+        return f"GhostSet({len(self)} ghosts, {self.xy.shape[1]} z steps)"
+
+    @classmethod
+    def load(
+        cls,
+        seed: int,
+        grids: int,
+        directory: str = cfg.GHOST_DIRECTORY,
+        limit: int = cfg.GHOST_LIMIT) -> GhostSet | None:
+        """
+        Load the best ghosts of a barrier layout, winning runs first and then those that got furthest
+
+        Args:
+            seed (int): Seed of the barrier layout
+            grids (int): The barrier grid sizes of the layout, from grid.configuration
+            directory (str): Where ghosts are kept
+            limit (int): Most ghosts loaded
+
+        Returns:
+            GhostSet: The ghosts, None if the layout has none
+        """
+        trajectories = []
+        for _, path in rank(seed, grids, directory)[:limit]:
+            try:
+                _, _, positions = decode(path.read_bytes())
+            except (OSError, ValueError, struct.error) as error:
+                logging.warning(f"Skipping ghost {path}, {error}")
+                continue
+            trajectories.append(positions)
+        if not trajectories:
+            return None
+
+        return cls(trajectories)
+
+    def at(self, z: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Work out where every ghost was at a z, in one pass
+
+        Args:
+            z (float): Distance down the trench
+
+        Returns:
+            tuple: (ghosts, 2) x and y of each ghost, and whether each ghost got that far
+        """
+        position = max(0.0, z / self.step)
+        i = min(int(position), self.xy.shape[1] - 2)
+        t = position - i
+        xy = self.xy[:, i] * (1.0 - t) + self.xy[:, i + 1] * t
+        return xy, self.end_z >= z
+
+    def project(
+        self,
+        pos: tuple[float, float, float],
+        ahead: float = cfg.GHOST_AHEAD_M,
+        view: geo.Viewport | None = None) -> np.ndarray:
+        """
+        Project the outlines of the ghosts in view
+
+        Args:
+            pos (tuple): Current position of the ship
+            ahead (float): How far ahead of the ship the ghosts are shown
+            view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+        Returns:
+            np.ndarray: (N, 4) canvas coordinates of the start and end of each line
+        """
+        z = pos[2] + ahead
+        if ahead >= cfg.FAR_PLANE_M or not len(self):
+            return np.zeros((0, 4), dtype=np.float32)
+
+        xy, flying = self.at(z)
+        table = geo.table
+        if view is None:
+            view = table.viewport
+        distance = max(cfg.NEAR_PLANE_M, ahead) + cfg.NEAR_PLANE_M
+        scale = np.array((view.scale_width, view.scale_height), dtype=np.float32) / distance
+        centres = (xy - np.array(pos[:2], dtype=np.float32)) * scale
+        centres += (view.centre_x, view.centre_y)
+
+        # Cull the ghosts whose outline lies entirely outside the viewport
+        margin = np.array((table.ship_half_width, table.ship_half_height), dtype=np.float32) * scale
+        visible = flying & np.all((centres > -margin) & (centres < (view.width, view.height) + margin), axis=1)
+        centres = centres[visible]
+
+        lines = self.model * np.tile(scale, 2)
+        return (centres[:, np.newaxis, :].repeat(2, axis=1).reshape(-1, 1, 4) + lines).reshape(-1, 4)
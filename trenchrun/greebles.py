@@ -0,0 +1,188 @@
+"""
+Procedural detail panels along the trench walls and floor, the greebles of the arcade original.
+
+A small library of detail MESHES is instanced along the trench: every WALL_INTERVAL of trench is
+a segment, and each wall and the floor of a segment gets GREEBLE_PANELS panels, each a mesh
+picked and placed on a GREEBLE_GRID by a generator seeded with the run seed and the segment. A
+segment is the same whenever it is built, so its lines are built the first time it comes into
+view and cached for the rest of the run.
+
+Each frame only the segments between the ship and WALL_DETAIL_DISTANCE_M ahead are projected, as
+one array, which is kept for each viewport so the players of a split screen share the segments
+without invalidating each other's window. The lines are clipped to the near plane, and any too
+short to see or entirely off screen are dropped, so thousands of lines cost a handful of numpy
+operations.
+"""
+from __future__ import annotations
+
+import config as cfg
+import geometry as geo
+import numpy as np
+import utils
+
+# Detail meshes, as the start and end (u, v) of each line in a unit panel, u down the trench and v across the wall
+MESHES = tuple(np.array(mesh, dtype=np.float32) for mesh in (
+    # Plain panel
+    ((0, 0, 1, 0), (1, 0, 1, 1), (1, 1, 0, 1), (0, 1, 0, 0)),
+    # Vent, a panel with slats across it
+    ((0, 0, 1, 0), (1, 0, 1, 1), (1, 1, 0, 1), (0, 1, 0, 0), (0.2, 0.25, 0.2, 0.75), (0.5, 0.25, 0.5, 0.75), (0.8, 0.25, 0.8, 0.75)),
+    # Hatch, a panel with a smaller one inset
+    ((0, 0, 1, 0), (1, 0, 1, 1), (1, 1, 0, 1), (0, 1, 0, 0), (0.25, 0.25, 0.75, 0.25), (0.75, 0.25, 0.75, 0.75), (0.75, 0.75, 0.25, 0.75), (0.25, 0.75, 0.25, 0.25)),
+    # Braced panel
+    ((0, 0, 1, 0), (1, 0, 1, 1), (1, 1, 0, 1), (0, 1, 0, 0), (0, 0, 1, 1), (0, 1, 1, 0)),
+    # Pipes running down the trench
+    ((0, 0.3, 1, 0.3), (0, 0.5, 1, 0.5), (0, 0.7, 1, 0.7)),
+    # Ladder
+    ((0, 0.2, 1, 0.2), (0, 0.8, 1, 0.8), (0.25, 0.2, 0.25, 0.8), (0.5, 0.2, 0.5, 0.8), (0.75, 0.2, 0.75, 0.8)),
+))
+
+
+class Greebles:
+
+    """The detail panels of a run, built a segment at a time as they come into view."""
+
+    def __init__(self, seed: int, panels: int | None = None, grid: int = cfg.GREEBLE_GRID) -> None:
+        """
+        Lay out the trench, without building any segments yet
+
+        Args:
+            seed (int): Seed of the run, the same seed always creates the same panels
+            panels (int, optional): Panels on each wall and the floor of every segment, GREEBLE_PANELS of the preset if None
+            grid (int): Cells along and across each wall that the panels are laid out on
+        """
+        table = geo.table
+        self.seed = seed
+        self.panels = cfg.GREEBLE_PANELS if panels is None else panels
+        self.grid = grid
+        self.interval = table.wall_interval
+        self.length = table.trench_length
+        self.count = int(np.ceil(self.length / self.interval))
+
+        # Origin, direction down the trench and direction across the surface of the left wall, right wall and floor
+        tw = table.trench_half_width
+        th = table.trench_half_height
+        self.surfaces = np.array((
+            ((-tw, -th, 0), (0, 0, 1), (0, 2 * th, 0)),
+            ((tw, -th, 0), (0, 0, 1), (0, 2 * th, 0)),
+            ((-tw, th, 0), (0, 0, 1), (2 * tw, 0, 0)),
+        ), dtype=np.float32)
+
+        self._segments: dict[int, np.ndarray] = {}
+        self._windows: dict[geo.Viewport | None, tuple[tuple[int, int], np.ndarray]] = {}  # Segments in view and their lines
+
+    def __repr__(self) -> str:
+        """Return a string representation of the greebles."""
+        return f"Greebles(seed={self.seed}, panels={self.panels}, built={len(self._segments)}/{self.count} segments)"
+
+    def segment(self, index: int) -> np.ndarray:
+        """
+        Get the lines of a segment, building them the first time
+
+        Args:
+            index (int): The segment, counting WALL_INTERVALs from the start of the trench
+
+        Returns:
+            np.ndarray: (N, 6) start and end of each line in the trench
+        """
+        lines = self._segments.get(index)
+        if lines is None:
+            lines = self._segments[index] = self._build(index)
+        return lines
+
+    def _build(self, index: int) -> np.ndarray:
+        """Pick and place the panels of a segment, and expand them into lines."""
+        if self.panels <= 0:
+            return np.zeros((0, 6), dtype=np.float32)
+        rng = np.random.default_rng((self.seed, index))
+        count = len(self.surfaces) * self.panels
+        meshes = rng.integers(len(MESHES), size=count)
+        size = rng.integers(1, 4, size=(count, 2))
+        corner = rng.integers(0, self.grid - size + 1) / self.grid
+        size = size / self.grid
+
+        start = index * self.interval
+        lines = []
+        for panel, mesh in enumerate(meshes):
+            origin, along, across = self.surfaces[panel // self.panels]
+            uv = corner[panel] + MESHES[mesh].reshape(-1, 2) * size[panel]
+            # Panels running past the end of the trench are cut off there
+            u = np.minimum(start + uv[:, :1] * self.interval, self.length)
+            lines.append(origin + u * along + uv[:, 1:] * across)
+        return np.concatenate(lines).reshape(-1, 6)
+
+    def visible(self, pos: tuple[float, float, float], distance: float, view: geo.Viewport | None = None) -> np.ndarray:
+        """
+        Get the lines of the segments between the ship and the detail distance
+
+        The lines of the segments in view are joined once each time the ship moves into another
+        segment, and reused until the next. Each viewport has its own window of segments.
+
+        Args:
+            pos (tuple): Current position of the ship
+            distance (float): How far ahead detail is shown
+            view (Viewport, optional): The viewport the lines are for
+
+        Returns:
+            np.ndarray: (N, 6) start and end of each line in the trench
+        """
+        first = min(max(0, int(pos[2] // self.interval)), self.count)
+        last = min(max(first, int((pos[2] + distance) // self.interval) + 1), self.count)
+        window = self._windows.get(view)
+        if window is None or window[0] != (first, last):
+            segments = [self.segment(index) for index in range(first, last)]
+            lines = np.concatenate(segments) if segments else np.zeros((0, 6), dtype=np.float32)
+            window = self._windows[view] = ((first, last), lines)
+        return window[1]
+
+    def project(
+        self,
+        pos: tuple[float, float, float],
+        view: geo.Viewport | None = None,
+        distance: float | None = None) -> np.ndarray:
+        """
+        Project the lines in view
+
+        Args:
+            pos (tuple): Current position of the ship
+            view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+            distance (float, optional): How far ahead detail is shown, WALL_DETAIL_DISTANCE_M of the preset if None
+
+        Returns:
+            np.ndarray: (N, 4) canvas coordinates of the start and end of each line
+        """
+        if view is None:
+            view = geo.table.viewport
+        if distance is None:
+            distance = cfg.WALL_DETAIL_DISTANCE_M
+        lines = self.visible(pos, distance, view)
+        near = pos[2] + cfg.NEAR_PLANE_M
+        far = pos[2] + distance
+        z0 = lines[:, 2]
+        z1 = lines[:, 5]
+        lines = lines[(np.maximum(z0, z1) > near) & (np.minimum(z0, z1) < far)]
+        if not len(lines):
+            return np.zeros((0, 4), dtype=np.float32)
+
+        # Cut the lines that pass the ship off at the near plane
+        start = lines[:, :3]
+        end = lines[:, 3:]
+        behind = start[:, 2] < near
+        if behind.any():
+            start = start.copy()
+            t = (near - start[behind, 2]) / (end[behind, 2] - start[behind, 2])
+            start[behind] += (end[behind] - start[behind]) * t[:, np.newaxis]
+        behind = end[:, 2] < near
+        if behind.any():
+            end = end.copy()
+            t = (near - end[behind, 2]) / (start[behind, 2] - end[behind, 2])
+            end[behind] += (start[behind] - end[behind]) * t[:, np.newaxis]
+
+        projected = utils.project_array(np.concatenate((start, end)), pos, view)
+        projected = np.concatenate((projected[:len(start)], projected[len(start):]), axis=1)
+
+        # Drop the lines that are too short to see, or entirely off one side of the viewport
+        x0, y0, x1, y1 = projected.T
+        shown = (x1 - x0) ** 2 + (y1 - y0) ** 2 >= cfg.GREEBLE_MIN_PIXELS ** 2
+        shown &= (np.maximum(x0, x1) >= 0) & (np.minimum(x0, x1) < view.width)
+        shown &= (np.maximum(y0, y1) >= 0) & (np.minimum(y0, y1) < view.height)
+        return projected[shown]
@@ -0,0 +1,149 @@
+"""
+Barriers, and the grids of blocks they are made of.
+
+A barrier is a grid of size x size blocks across the trench, from 1x1 up to BARRIER_MAX_GRID.
+Which blocks are solid is kept as one integer bitset, bit row * size + column counting row by
+row from the top left, so a row of blocks is a shift and a mask and a whole barrier is hashable
+for the caches keyed by its occupancy.
+
+Solid blocks are drawn as boxes: boxes() covers them with as few rectangles as a greedy merge
+of runs finds, so a finer grid costs about as much to draw as its shape, not its block count.
+"""
+from __future__ import annotations
+
+import functools
+import zlib
+from typing import NamedTuple
+
+
+class Barrier(NamedTuple):
+
+    """A barrier across the trench, a grid of solid and open blocks."""
+
+    start: float  # Distance along the trench of its front face
+    length: int
+    blocks: int  # Bitset of the solid blocks, bit row * size + column from the top left
+    size: int  # Rows and columns of blocks
+
+    def row(self, row: int) -> int:
+        """Return the solid blocks of a row as a bitset, bit column."""
+        return (self.blocks >> (row * self.size)) & ((1 << self.size) - 1)
+
+    def solid(self, row: int, column: int) -> bool:
+        """Check whether a block is solid."""
+        return bool(self.blocks >> (row * self.size + column) & 1)
+
+
+def configuration(grids: tuple[int, ...]) -> int:
+    """
+    Identify a choice of grid sizes, which decides the barrier layout a seed creates as much as the seed does
+
+    Args:
+        grids (tuple): Rows and columns of blocks each barrier picks from, as in BARRIER_GRIDS
+
+    Returns:
+        int: A 32 bit identifier, the same for the same sizes in the same order
+    """
+    return zlib.crc32(bytes(grids))
+
+
+def full(size: int) -> int:
+    """
+    Make the bitset of a grid with every block solid
+
+    Args:
+        size (int): Rows and columns of blocks
+
+    Returns:
+        int: The bitset
+    """
+    return (1 << (size * size)) - 1
+
+
+def rectangle(size: int, row: int, column: int, rows: int, columns: int) -> int:
+    """
+    Make the bitset of a rectangle of blocks
+
+    Args:
+        size (int): Rows and columns of blocks in the grid
+        row (int): Top row of the rectangle
+        column (int): Left column of the rectangle
+        rows (int): Height of the rectangle, in blocks
+        columns (int): Width of the rectangle, in blocks
+
+    Returns:
+        int: The bitset, with only the blocks of the rectangle set
+    """
+    line = ((1 << columns) - 1) << column
+    blocks = 0
+    for r in range(row, row + rows):
+        blocks |= line << (r * size)
+    return blocks
+
+
+def rows(blocks: int, size: int) -> list[int]:
+    """
+    Split a bitset into the bitsets of its rows
+
+    Args:
+        blocks (int): The bitset of the grid
+        size (int): Rows and columns of blocks
+
+    Returns:
+        list: The solid blocks of each row from the top, bit column
+    """
+    mask = (1 << size) - 1
+    return [(blocks >> (row * size)) & mask for row in range(size)]
+
+
+def transpose(blocks: int, size: int) -> int:
+    """
+    Swap the rows and columns of a grid
+
+    Args:
+        blocks (int): The bitset of the grid
+        size (int): Rows and columns of blocks
+
+    Returns:
+        int: The bitset of the transposed grid
+    """
+    transposed = 0
+    for row, cells in enumerate(rows(blocks, size)):
+        while cells:
+            column = (cells & -cells).bit_length() - 1
+            transposed |= 1 << (column * size + row)
+            cells &= cells - 1
+    return transposed
+
+
+@functools.lru_cache(maxsize=1024)
+def boxes(blocks: int, size: int) -> tuple[tuple[int, int, int, int], ...]:
+    """
+    Cover the solid blocks with rectangles that do not overlap
+
+    Each run of solid blocks along a row is extended down for as long as the rows below have the
+    whole run solid too.
+
+    Args:
+        blocks (int): The bitset of the grid
+        size (int): Rows and columns of blocks
+
+    Returns:
+        tuple: (left column, top row, right column, bottom row) of each rectangle, the right and bottom exclusive
+    """
+    remaining = rows(blocks, size)
+    covered = []
+    for row in range(size):
+        while remaining[row]:
+            column = (remaining[row] & -remaining[row]).bit_length() - 1
+            run = remaining[row] >> column
+            width = (run ^ (run + 1)).bit_length() - 1  # Trailing solid blocks
+            line = ((1 << width) - 1) << column
+            bottom = row + 1
+            while bottom < size and remaining[bottom] & line == line:
+                bottom += 1
+            for r in range(row, bottom):
+                remaining[r] &= ~line
+            covered.append((column, row, column + width, bottom))
+
+    return tuple(covered)
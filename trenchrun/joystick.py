@@ -0,0 +1,201 @@
+"""
+Analog joystick and yoke input.
+
+The cabinets steer with an analog yoke, like the original arcade machine. Each axis reading is
+normalised with a calibration (the axis' rest position and extremes), a dead zone is cut out
+around the centre and a response curve gives finer control near it. The axes are polled every
+time the frame loop drains its event queue, which is every INPUT_SLEEP_SLICE_S while it waits
+for the next frame, so there are several readings per rendered frame. The simulation steps with
+the average of the readings taken since its last step, so steering stays smooth when frames are
+dropped or slow.
+
+Calibration is stored in JOYSTICK_CALIBRATION_FILE per device. Press JOYSTICK_CALIBRATE_KEY with
+the yoke at rest, move it to its limits on every axis, and press the key again to save.
+"""
+import json
+import logging
+import math
+from pathlib import Path
+
+import config as cfg
+import pygame
+
+
+class AxisCalibration:
+
+    """The rest position and extremes of an axis, used to normalise its readings."""
+
+    def __init__(self, centre: float = 0.0, minimum: float = -1.0, maximum: float = 1.0) -> None:
+        """
+        Create a calibration, defaulting to an ideal axis
+
+        Args:
+            centre (float): The raw reading at rest
+            minimum (float): The lowest raw reading
+            maximum (float): The highest raw reading
+        """
+        self.centre = centre
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __repr__(self) -> str:
+        """Return a string representation of the calibration."""
+        return f"AxisCalibration({self.minimum:.3f} < {self.centre:.3f} < {self.maximum:.3f})"
+
+    def normalise(self, raw: float) -> float:
+        """Map a raw reading to -1 to 1, with 0 at the rest position."""
+        if raw >= self.centre:
+            span = self.maximum - self.centre
+        else:
+            span = self.centre - self.minimum
+        if span <= 0:
+            return 0.0
+        return max(-1.0, min(1.0, (raw - self.centre) / span))
+
+
+def shape(value: float, dead_zone: float = cfg.JOYSTICK_DEAD_ZONE, curve: float = cfg.JOYSTICK_CURVE) -> float:
+    """
+    Cut out the dead zone of a normalised axis value, and apply the response curve
+
+    Args:
+        value (float): The normalised value, -1 to 1
+        dead_zone (float): Deflection either side of the centre that reads as 0
+        curve (float): Exponent of the response, above 1 gives finer control near the centre
+
+    Returns:
+        float: The shaped value, -1 to 1, rising smoothly from 0 at the edge of the dead zone
+    """
+    magnitude = abs(value)
+    if magnitude <= dead_zone:
+        return 0.0
+    magnitude = (magnitude - dead_zone) / (1.0 - dead_zone)
+    return math.copysign(magnitude ** curve, value)
+
+
+class AnalogStick:
+
+    """The first connected joystick, polled at a high rate and averaged for each simulation step."""
+
+    def __init__(self, axes: tuple[int, int] = cfg.JOYSTICK_AXES, path: str = cfg.JOYSTICK_CALIBRATION_FILE) -> None:
+        """
+        Open the first joystick, if one is connected
+
+        Args:
+            axes (tuple): The device axes that steer horizontally and vertically
+            path (str): Where calibrations are stored
+        """
+        self.axes = axes
+        self.path = Path(path)
+        self.device: pygame.joystick.JoystickType | None = None
+        self.calibration: list[AxisCalibration] = [AxisCalibration(), AxisCalibration()]
+        self.calibrating: bool = False
+
+        # Readings accumulated since the last simulation step
+        self._sum: list[float] = [0.0, 0.0]
+        self._samples: int = 0
+        self._last: tuple[float, float] = (0.0, 0.0)
+        self.samples_per_step: float = 0.0  # Moving average, for diagnostics
+
+        pygame.joystick.init()
+        if pygame.joystick.get_count():
+            self.open(0)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the stick."""
+        name = self.device.get_name() if self.device else None
+        return f"AnalogStick({name}, {self.samples_per_step:.1f} samples per step)"
+
+    @property
+    def connected(self) -> bool:
+        """Whether a joystick is open."""
+        return self.device is not None
+
+    def open(self, index: int) -> None:
+        """
+        Open a joystick and load its calibration
+
+        Args:
+            index (int): The device index
+        """
+        self.device = pygame.joystick.Joystick(index)
+        stored = self._load().get(self.device.get_guid())
+        if stored:
+            self.calibration = [AxisCalibration(*axis) for axis in stored]
+        else:
+            self.calibration = [AxisCalibration(), AxisCalibration()]
+        logging.info(f"Using joystick {self.device.get_name()}, {self.calibration}")
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """Follow joysticks being connected and disconnected."""
+        if event.type == pygame.JOYDEVICEADDED and self.device is None:
+            self.open(event.device_index)
+        elif (
+            event.type == pygame.JOYDEVICEREMOVED
+            and self.device is not None
+            and event.instance_id == self.device.get_instance_id()
+        ):
+            logging.info(f"Joystick {self.device.get_name()} disconnected")
+            self.device = None
+            self.calibrating = False
+
+    def poll(self) -> None:
+        """Take a reading of the axes, called every time the event queue is drained."""
+        if self.device is None:
+            return
+
+        for i, axis in enumerate(self.axes):
+            raw = self.device.get_axis(axis)
+            calibration = self.calibration[i]
+            if self.calibrating:
+                calibration.minimum = min(calibration.minimum, raw)
+                calibration.maximum = max(calibration.maximum, raw)
+            else:
+                self._sum[i] += shape(calibration.normalise(raw))
+        if not self.calibrating:
+            self._samples += 1
+
+    def take(self) -> tuple[float, float]:
+        """
+        Average the readings since the last simulation step
+
+        Returns:
+            tuple: The horizontal and vertical deflection, -1 to 1, +y is down like the trench
+        """
+        if self.calibrating or self.device is None:
+            self._last = (0.0, 0.0)
+        elif self._samples:
+            x = self._sum[0] / self._samples
+            y = self._sum[1] / self._samples
+            self._last = (x, -y if cfg.JOYSTICK_INVERT_Y else y)
+            self.samples_per_step = self.samples_per_step * 0.9 + self._samples * 0.1
+
+        self._sum = [0.0, 0.0]
+        self._samples = 0
+        return self._last
+
+    def toggle_calibration(self) -> None:
+        """Start calibrating with the axes at rest, or finish and save the calibration."""
+        if self.device is None:
+            return
+
+        if not self.calibrating:
+            rest = [self.device.get_axis(axis) for axis in self.axes]
+            self.calibration = [AxisCalibration(centre, centre, centre) for centre in rest]
+            self.calibrating = True
+            logging.info("Calibrating joystick, move it to its limits on every axis then press the calibrate key again")
+            return
+
+        self.calibrating = False
+        stored = self._load()
+        stored[self.device.get_guid()] = [
+            (axis.centre, axis.minimum, axis.maximum) for axis in self.calibration
+        ]
+        self.path.write_text(json.dumps(stored, indent=2))
+        logging.info(f"Saved joystick calibration {self.calibration}")
+
+    def _load(self) -> dict[str, list[list[float]]]:
+        """Read the stored calibrations, by device GUID."""
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,199 @@
+"""
+Late input sampling and input to flip latency measurement.
+
+pygame events carry no timestamp, and input that arrives while the frame loop sleeps sits in
+the OS queue until the next poll. Instead of one long sleep, the wait for the next frame is
+split into INPUT_SLEEP_SLICE_S slices and the event queue is drained after each one, so every
+input event is stamped within a slice of when it arrived. The last drain happens right before
+the simulation. The time from the earliest input of a frame to the flip that shows it is
+recorded, and its percentiles are reported in profile captures, the metrics and the log.
+
+In low-latency mode the frame loop also reorders its work: the wait ends just early enough for
+the predicted input to flip time to land the flip on the frame cadence, and deferrable work and
+capture are moved after the flip, so none of it sits between sampling the input and showing it.
+"""
+import asyncio
+import logging
+import time
+
+import config as cfg
+import numpy as np
+import pygame
+from joystick import AnalogStick
+
+INPUT_EVENTS = frozenset((
+    pygame.KEYDOWN,
+    pygame.KEYUP,
+    pygame.JOYAXISMOTION,
+    pygame.JOYBALLMOTION,
+    pygame.JOYHATMOTION,
+    pygame.JOYBUTTONDOWN,
+    pygame.JOYBUTTONUP,
+    pygame.CONTROLLERAXISMOTION,
+    pygame.CONTROLLERBUTTONDOWN,
+    pygame.CONTROLLERBUTTONUP,
+))
+
+
+class InputSampler:
+
+    """Paces the frame loop, samples input as late as possible and measures how long it takes to show."""
+
+    def __init__(
+        self,
+        fps: int = cfg.FPS,
+        low_latency: bool = cfg.LOW_LATENCY,
+        history: int = cfg.INPUT_LATENCY_HISTORY,
+        stick: AnalogStick | None = None) -> None:
+        """
+        Create the sampler
+
+        Args:
+            fps (int): The target frame rate
+            low_latency (bool): Whether to end the wait as late as the predicted frame time allows
+            history (int): Number of latency measurements kept for the percentiles
+            stick (AnalogStick, optional): Joystick polled every time the event queue is drained
+        """
+        self.frame_time: float = 1.0 / fps
+        self.low_latency = low_latency
+        self.stick = stick
+        self.pending: list[pygame.event.Event] = []
+        self.first_input: float | None = None  # When the earliest unshown input was drained
+        self.sampled_at: float = 0.0
+        self.next_frame: float = time.perf_counter()
+        self.next_flip: float = self.next_frame + self.frame_time
+        self.predicted: float = 0.0  # Moving average of the time from sampling to the flip, in seconds
+        self.overruns: int = 0  # Steps of other tasks that ran past their time slice, with wait_async
+
+        self.latencies = np.zeros(history, dtype=np.float64)
+        self._next: int = 0
+        self.count: int = 0
+
+    def __repr__(self) -> str:
+        """Return a string representation of the sampler."""
+        return f"InputSampler(low_latency={self.low_latency}, measured={self.count}, predicted={self.predicted * 1000:.2f}ms)"
+
+    def _drain(self) -> None:
+        """Move everything in the event queue to the pending events, stamping the first input."""
+        events = pygame.event.get()
+        if self.stick is not None:
+            self.stick.poll()
+        if not events:
+            return
+        if self.first_input is None and any(event.type in INPUT_EVENTS for event in events):
+            self.first_input = time.perf_counter()
+        self.pending.extend(events)
+
+    def wait(self, clock: pygame.time.Clock) -> None:
+        """
+        Sleep until the next frame is due, draining the event queue as it arrives
+
+        Args:
+            clock (pygame.time.Clock): Ticked once per frame so it keeps measuring the frame rate
+        """
+        deadline = self._deadline()
+        while True:
+            self._drain()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, cfg.INPUT_SLEEP_SLICE_S))
+        self._advance(clock)
+
+    async def wait_async(self, clock: pygame.time.Clock, time_slice: float = cfg.ASYNC_TIME_SLICE_S) -> None:
+        """
+        Wait for the next frame like wait(), letting other tasks on the event loop run meanwhile
+
+        Other tasks only get to run until time_slice before the frame is due, the rest of the
+        wait sleeps without yielding. A task step that runs on past its slice is counted as an overrun.
+
+        Args:
+            clock (pygame.time.Clock): Ticked once per frame so it keeps measuring the frame rate
+            time_slice (float): The longest a step of another task is allowed to take, in seconds
+        """
+        deadline = self._deadline()
+        while True:
+            self._drain()
+            now = time.perf_counter()
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+            if remaining > time_slice:
+                step = min(remaining - time_slice, cfg.INPUT_SLEEP_SLICE_S)
+                await asyncio.sleep(step)
+                if time.perf_counter() - (now + step) > time_slice:
+                    self.overruns += 1
+            else:
+                # Blocking on purpose: yielding to the loop for the last slice would overshoot it
+                time.sleep(min(remaining, cfg.INPUT_SLEEP_SLICE_S))  # noqa: ASYNC251
+        self._advance(clock)
+
+    def _deadline(self) -> float:
+        """Work out when the wait for the next frame ends."""
+        if self.low_latency:
+            return self.next_flip - self.predicted * cfg.INPUT_LATENCY_MARGIN
+        return self.next_frame
+
+    def _advance(self, clock: pygame.time.Clock) -> None:
+        """Move the frame cadence on, once the wait is over."""
+        # A frame that overran starts the cadence again rather than rushing to catch up
+        now = time.perf_counter()
+        self.next_frame = max(self.next_frame + self.frame_time, now)
+        self.next_flip = max(self.next_flip + self.frame_time, now + self.predicted)
+        clock.tick()
+
+    def sample(self) -> list[pygame.event.Event]:
+        """
+        Drain the last of the event queue, right before the simulation
+
+        Returns:
+            list: Every event since the last sample, in the order they arrived
+        """
+        self._drain()
+        self.sampled_at = time.perf_counter()
+        events, self.pending = self.pending, []
+        return events
+
+    def flipped(self) -> float | None:
+        """
+        Record that the frame has been shown, measuring the latency of its input
+
+        Returns:
+            float: The time from the earliest input of the frame to the flip in seconds, None if it had no input
+        """
+        now = time.perf_counter()
+        taken = now - self.sampled_at
+        self.predicted = taken if self.predicted == 0.0 else self.predicted * 0.9 + taken * 0.1
+
+        if self.first_input is None:
+            return None
+        latency = now - self.first_input
+        self.first_input = None
+        self.latencies[self._next] = latency
+        self._next = (self._next + 1) % len(self.latencies)
+        self.count = min(self.count + 1, len(self.latencies))
+        return latency
+
+    def percentiles(self) -> dict[str, float]:
+        """
+        Summarise the recent input to flip latencies
+
+        Returns:
+            dict: The p50, p95 and p99 latency in milliseconds, empty if no input has been measured
+        """
+        if not self.count:
+            return {}
+        p50, p95, p99 = np.percentile(self.latencies[:self.count], (50, 95, 99)) * 1000
+        return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+    def report(self) -> None:
+        """Log the input to flip latency percentiles, and any background work that overran its time slice."""
+        if self.overruns:
+            logging.warning(f"Background work overran its time slice {self.overruns} times")
+        summary = self.percentiles()
+        if summary:
+            mode = "low-latency" if self.low_latency else "standard"
+            logging.info(
+                f"Input to flip latency ({mode}, {self.count} inputs): "
+                f"p50 {summary['p50']}ms, p95 {summary['p95']}ms, p99 {summary['p99']}ms"
+            )
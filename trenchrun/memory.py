@@ -0,0 +1,192 @@
+"""
+Frame pacing aware control of Python's cyclic garbage collector.
+
+Automatic collection is disabled while the game runs. Instead, everything loaded at startup
+is frozen out of the collector, and young generations are collected in the slack at the end
+of each frame. When a run builds its world, the heap that is not frozen, which is small, is
+collected once in the slack of a following frame. That frees the last world and moves the
+new one into the oldest generation, which the slack collections never scan. Frames that run
+over budget are logged together with whether a collection happened during them, and a
+summary is reported per session.
+"""
+import gc
+import logging
+import time
+
+import config as cfg
+
+CAUSE_GC_AUTOMATIC = "gc (automatic)"
+CAUSE_GC_SCHEDULED = "gc (scheduled)"
+CAUSE_GC_FORCED = "gc (forced)"
+CAUSE_OTHER = "other"
+
+
+class MemoryManager:
+
+    """Schedules garbage collection around the frame loop and detects hitches."""
+
+    def __init__(self, fps: int = cfg.FPS) -> None:
+        """
+        Take over garbage collection from the interpreter
+
+        Args:
+            fps (int): The target frame rate, which sets the frame budget
+        """
+        self.budget: float = 1.0 / fps
+        self.hitch_threshold: float = self.budget * cfg.GC_HITCH_FACTOR
+        self.gc_cost: float = 0.0  # Running estimate of a young generation collection, in seconds
+        self.slack_collections: int = 0
+
+        self.frame_count: int = 0
+        self.frame_start: float = 0.0
+        self.frame_time: float = 0.0  # Duration of the last complete frame
+        self.hitches: dict[str, int] = {}
+        self.gc_pause_total: float = 0.0
+        self.worst_hitch: float = 0.0
+
+        # Collector activity in the current frame
+        self._gc_started: float = 0.0
+        self._gc_time: float = 0.0
+        self._gc_cause: str | None = None
+        self._collecting: str | None = None
+
+        # A full collection of the heap that is not frozen, waiting for a frame with room for it
+        self.settle_pending: bool = False
+        self.settle_cost: float = 0.0  # Duration of the last one, in seconds
+        self._settle_waited: int = 0
+
+        self.enabled: bool = cfg.GC_MANAGED
+        if self.enabled:
+            gc.disable()
+        gc.callbacks.append(self._on_gc)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the memory manager."""
+        return f"MemoryManager(frames={self.frame_count}, hitches={sum(self.hitches.values())})"
+
+    def freeze_startup(self) -> None:
+        """
+        Move every object currently alive into the permanent generation
+
+        Called once the game has started up, before the first frame, so that the modules,
+        fonts, sounds and other objects that live as long as the game are never scanned again.
+        """
+        self._collect(2, CAUSE_GC_SCHEDULED)
+        gc.freeze()
+        logging.info(f"Froze {gc.get_freeze_count()} objects out of the garbage collector")
+
+    def settle_world(self) -> None:
+        """
+        Queue a full collection of the heap that is not frozen, for the slack of a following frame
+
+        Called once a run has built its world. The collection frees the world of the last run
+        and moves the new one into the oldest generation, out of the way of the slack collections.
+        """
+        if self.enabled:
+            self.settle_pending = True
+            self._settle_waited = 0
+
+    def begin_frame(self) -> None:
+        """Start timing a new frame, checking whether the previous one overran its budget."""
+        now = time.perf_counter()
+        if self.frame_count:
+            self.frame_time = now - self.frame_start
+            self._check_hitch(self.frame_time)
+
+        self.frame_count += 1
+        self.frame_start = now
+        self._gc_time = 0.0
+        self._gc_cause = None
+
+    def end_frame(self) -> None:
+        """
+        Spend the slack left in the frame collecting young generations, or settling a new world
+
+        A collection is only run if the estimated cost fits in the time left before the next
+        frame is due. Should allocations pile up past GC_FORCE_THRESHOLD without any slack, a
+        collection is forced regardless so memory can't grow unbounded, and a new world is settled
+        regardless once it has waited GC_SETTLE_MAX_WAIT frames.
+        """
+        if not self.enabled:
+            return
+
+        slack = self.budget - (time.perf_counter() - self.frame_start)
+        if self.settle_pending:
+            self._settle_waited += 1
+            if slack > self.settle_cost or self._settle_waited > cfg.GC_SETTLE_MAX_WAIT:
+                start = time.perf_counter()
+                self._collect(2, CAUSE_GC_SCHEDULED if slack > self.settle_cost else CAUSE_GC_FORCED)
+                self.settle_cost = time.perf_counter() - start
+                self.settle_pending = False
+                return
+
+        pending = gc.get_count()[0]
+        if pending < gc.get_threshold()[0]:
+            return
+
+        if slack > self.gc_cost:
+            self.slack_collections += 1
+            generation = 1 if self.slack_collections % cfg.GC_GEN1_INTERVAL == 0 else 0
+            self._collect(generation, CAUSE_GC_SCHEDULED)
+        elif pending >= cfg.GC_FORCE_THRESHOLD:
+            self._collect(0, CAUSE_GC_FORCED)
+
+    def report(self) -> dict[str, int]:
+        """
+        Log a summary of the session's hitches by cause
+
+        Returns:
+            dict: The number of hitches attributed to each cause
+        """
+        logging.info(
+            f"{self.frame_count} frames, {sum(self.hitches.values())} over {self.hitch_threshold * 1000:.1f}ms, "
+            f"worst {self.worst_hitch * 1000:.1f}ms, {self.gc_pause_total * 1000:.1f}ms spent collecting garbage"
+        )
+        for cause, count in sorted(self.hitches.items(), key=lambda item: -item[1]):
+            logging.info(f"    {cause}: {count}")
+
+        return dict(self.hitches)
+
+    def shutdown(self) -> None:
+        """Hand garbage collection back to the interpreter."""
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        gc.unfreeze()
+        gc.enable()
+
+    def _collect(self, generation: int, cause: str) -> None:
+        """Run a collection of the given generation, attributing it to the given cause."""
+        self._collecting = cause
+        try:
+            gc.collect(generation)
+        finally:
+            self._collecting = None
+
+    def _check_hitch(self, frame_time: float) -> None:
+        """Record and log a frame that took longer than the hitch threshold."""
+        if frame_time <= self.hitch_threshold:
+            return
+
+        # Only blame the collector if it accounts for a good part of the overrun
+        cause = CAUSE_OTHER
+        if self._gc_cause and self._gc_time >= (frame_time - self.budget) / 2:
+            cause = self._gc_cause
+        self.hitches[cause] = self.hitches.get(cause, 0) + 1
+        self.worst_hitch = max(self.worst_hitch, frame_time)
+        logging.warning(
+            f"Frame {self.frame_count} took {frame_time * 1000:.1f}ms "
+            f"(budget {self.budget * 1000:.1f}ms), cause: {cause}, gc: {self._gc_time * 1000:.2f}ms"
+        )
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        """Garbage collector callback, timing every collection."""
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+            return
+
+        duration = time.perf_counter() - self._gc_started
+        self._gc_time += duration
+        self.gc_pause_total += duration
+        self._gc_cause = self._collecting or CAUSE_GC_AUTOMATIC
+        if info["generation"] == 0:
+            self.gc_cost = duration if self.gc_cost == 0.0 else 0.9 * self.gc_cost + 0.1 * duration
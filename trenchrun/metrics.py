@@ -0,0 +1,195 @@
+"""
+Fleet monitoring metrics, exported in the Prometheus text format.
+
+The frame loop only ever bumps pre-aggregated counters and histogram buckets, it never
+takes a lock or does I/O. Exporting happens on a background thread, either serving the
+metrics over HTTP on a local port or periodically writing them to a file for a sidecar
+to scrape.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config as cfg
+
+COUNTERS = {
+    "frames": "Frames rendered",
+    "dropped_frames": "Frames that overran the frame budget",
+    "runs": "Trench runs started",
+    "wins": "Trench runs that destroyed the Death Star",
+    "collisions": "Trench runs that ended by hitting a barrier",
+    "bullseyes": "Torpedoes that went down the exhaust port",
+}
+
+
+class Histogram:
+
+    """Fixed bucket histogram, updated from the frame loop and read from the exporter thread."""
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """
+        Create an empty histogram
+
+        Args:
+            bounds (tuple): The upper bound of each bucket, in increasing order
+        """
+        self.bounds = bounds
+        self.counts: list[int] = [0] * (len(bounds) + 1)
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a value in its bucket."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, description: str) -> list[str]:
+        """
+        Render the histogram in the Prometheus text format
+
+        Reads are not synchronised with observe, so a scrape may be a single observation
+        behind in places, which is fine for monitoring.
+        """
+        lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {cumulative}")
+        return lines
+
+
+class Metrics:
+
+    """The counters and histograms fed by the game."""
+
+    def __init__(self, fps: int = cfg.FPS) -> None:
+        """
+        Create the metrics, all starting from zero
+
+        Args:
+            fps (int): The target frame rate, frames slower than it by METRICS_DROPPED_FACTOR count as dropped
+        """
+        self.counters: dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.frame_time = Histogram(cfg.METRICS_FRAME_TIME_BUCKETS)
+        self.input_latency = Histogram(cfg.METRICS_INPUT_LATENCY_BUCKETS)
+        self.dropped_threshold: float = cfg.METRICS_DROPPED_FACTOR / fps
+        self.start_time: float = time.time()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the metrics."""
+        return f"Metrics({self.counters})"
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase one of the counters."""
+        self.counters[name] += amount
+
+    def observe_frame(self, frame_time: float) -> None:
+        """
+        Record how long a frame took
+
+        Args:
+            frame_time (float): Time between the start of this frame and the last, in seconds
+        """
+        self.frame_time.observe(frame_time)
+        self.counters["frames"] += 1
+        if frame_time > self.dropped_threshold:
+            self.counters["dropped_frames"] += 1
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = [
+            "# HELP trenchrun_start_time_seconds Unix time the game was started",
+            "# TYPE trenchrun_start_time_seconds gauge",
+            f"trenchrun_start_time_seconds {self.start_time}",
+        ]
+        for name, description in COUNTERS.items():
+            lines.append(f"# HELP trenchrun_{name}_total {description}")
+            lines.append(f"# TYPE trenchrun_{name}_total counter")
+            lines.append(f"trenchrun_{name}_total {self.counters[name]}")
+
+        runs = self.counters["runs"]
+        lines.append("# HELP trenchrun_win_rate Fraction of trench runs won")
+        lines.append("# TYPE trenchrun_win_rate gauge")
+        lines.append(f"trenchrun_win_rate {self.counters['wins'] / runs if runs else 0.0}")
+        lines.extend(self.frame_time.render("trenchrun_frame_time_seconds", "Time taken by each frame"))
+        lines.extend(self.input_latency.render("trenchrun_input_latency_seconds", "Time from input to the flip that shows it"))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+
+    """Exports the metrics from a background thread."""
+
+    def __init__(self, metrics: Metrics, port: int | None = None, path: str | None = None) -> None:
+        """
+        Create the exporter, without starting it
+
+        Args:
+            metrics (Metrics): The metrics to export
+            port (int): Local port to serve the metrics over HTTP on
+            path (str): File to periodically write the metrics to
+        """
+        self.metrics = metrics
+        self.port = port
+        self.path = path
+        self.server: ThreadingHTTPServer | None = None
+        self.thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the exporter."""
+        return f"MetricsExporter(port={self.port}, path={self.path})"
+
+    def start(self) -> None:
+        """Start exporting on a daemon thread."""
+        if self.port is not None:
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    body = metrics.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format: str, *args: object) -> None:
+                    pass
+
+            self.server = ThreadingHTTPServer((cfg.METRICS_HOST, self.port), Handler)
+            self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+            logging.info(f"Serving metrics on http://{cfg.METRICS_HOST}:{self.port}/metrics")
+        elif self.path is not None:
+            self.thread = threading.Thread(target=self._write_periodically, name="metrics", daemon=True)
+            logging.info(f"Writing metrics to {self.path}")
+        else:
+            return
+
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop exporting, writing the file one final time."""
+        self._stopping.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _write_periodically(self) -> None:
+        """Atomically replace the metrics file every METRICS_FILE_INTERVAL seconds."""
+        while True:
+            stopping = self._stopping.wait(cfg.METRICS_FILE_INTERVAL)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as file:
+                file.write(self.metrics.render())
+            os.replace(temporary, self.path)
+            if stopping:
+                return
@@ -0,0 +1,190 @@
+"""
+Hidden-line removal for the barrier wireframes.
+
+Each barrier is a grid of solid or open blocks, drawn as the boxes that grid.boxes() merges them
+into, so which of a box's faces can be seen only depends on the barrier's occupancy and on which
+side of each block plane the viewer is. An edge is only drawn when it borders a face that faces
+the viewer and is not covered by the solid blocks next to it. The edge lists are cached by
+occupancy and viewing region, so they are worked out once rather than every frame.
+
+On top of that, boxes that project entirely inside the solid front face of a nearer barrier are
+skipped altogether.
+"""
+import bisect
+import functools
+
+import config as cfg
+import geometry as geo
+import grid
+import utils
+from grid import Barrier
+
+# Vertices of each face of a block, indexed as in BLOCK_VERTEX
+FRONT = (0, 1, 2, 3)
+BACK = (4, 5, 6, 7)
+LEFT = (0, 3, 7, 4)
+RIGHT = (1, 2, 6, 5)
+TOP = (0, 1, 5, 4)
+BOTTOM = (3, 2, 6, 7)
+
+
+def region(pos: tuple[float, float, float], barrier: Barrier) -> tuple[int, int, int]:
+    """
+    Work out which side of each of a barrier's block planes the viewer is on
+
+    Args:
+        pos (tuple): The player's position in 3D space
+        barrier (Barrier): The barrier's start position, length, blocks and grid size
+
+    Returns:
+        tuple: The x and y regions (0 to size + 1, the number of planes to the viewer's left or above),
+            and the z region (0 in front of the barrier, 1 inside it, 2 past it)
+    """
+    x_planes, y_planes = geo.table.barrier_planes[barrier.size]
+    x_region = bisect.bisect_left(x_planes, pos[0])
+    y_region = bisect.bisect_left(y_planes, pos[1])
+    if pos[2] < barrier.start:
+        z_region = 0
+    elif pos[2] <= barrier.start + barrier.length:
+        z_region = 1
+    else:
+        z_region = 2
+    return x_region, y_region, z_region
+
+
+@functools.lru_cache(maxsize=4096)
+def visible_edges(
+    blocks: int,
+    size: int,
+    view: tuple[int, int, int],
+    detailed: bool) -> tuple[tuple[tuple[int, int, int, int], tuple[tuple[int, int], ...]], ...]:
+    """
+    Select the edges of each box of solid blocks that are not provably hidden
+
+    Args:
+        blocks (int): The barrier's bitset of solid blocks
+        size (int): Rows and columns of blocks
+        view (tuple): The viewing region, from region()
+        detailed (bool): Whether the diagonals across the front face are wanted
+
+    Returns:
+        tuple: (box, edges) of each box with any edges left to draw, the box as from grid.boxes()
+    """
+    x_region, y_region, z_region = view
+    solid = grid.rows(blocks, size)
+    selected = []
+    for box in grid.boxes(blocks, size):
+        left, top, right, bottom = box
+        beside = solid[top:bottom]
+        columns = ((1 << (right - left)) - 1) << left
+        faces = []
+        if z_region == 0:
+            faces.append(FRONT)
+        if z_region == 2:
+            faces.append(BACK)
+        # A side is only hidden when the blocks next to it are solid along the whole of it
+        if x_region <= left and (left == 0 or not all(row >> (left - 1) & 1 for row in beside)):
+            faces.append(LEFT)
+        if x_region >= right + 1 and (right == size or not all(row >> right & 1 for row in beside)):
+            faces.append(RIGHT)
+        if y_region <= top and (top == 0 or solid[top - 1] & columns != columns):
+            faces.append(TOP)
+        if y_region >= bottom + 1 and (bottom == size or solid[bottom] & columns != columns):
+            faces.append(BOTTOM)
+
+        edges = tuple(
+            edge for edge in cfg.BLOCK_OUTLINE
+            if any(edge[0] in face and edge[1] in face for face in faces)
+        )
+        if detailed and FRONT in faces:
+            edges += cfg.BLOCK_VERTEX[len(cfg.BLOCK_OUTLINE):]
+        if edges:
+            selected.append((box, edges))
+
+    return tuple(selected)
+
+
+@functools.lru_cache(maxsize=512)
+def solid_rectangles(blocks: int, size: int) -> tuple[tuple[float, float, float, float], ...]:
+    """
+    Cover the solid blocks of a barrier with rectangles, merging runs along the rows and along the columns
+
+    The boxes merged row first and those merged column first overlap, which makes for larger
+    occluders than either on its own, while staying a handful however fine the grid.
+
+    Args:
+        blocks (int): The barrier's bitset of solid blocks
+        size (int): Rows and columns of blocks
+
+    Returns:
+        tuple: (x1, y1, x2, y2) of each rectangle, in metres across the trench
+    """
+    xs, ys = geo.table.barrier_planes[size]
+    rectangles = {(xs[left], ys[top], xs[right], ys[bottom]) for left, top, right, bottom in grid.boxes(blocks, size)}
+    for top, left, bottom, right in grid.boxes(grid.transpose(blocks, size), size):
+        rectangles.add((xs[left], ys[top], xs[right], ys[bottom]))
+
+    return tuple(sorted(rectangles))
+
+
+def front_faces(
+    pos: tuple[float, float, float],
+    barrier: Barrier,
+    view: geo.Viewport | None = None) -> list[tuple[float, float, float, float]]:
+    """
+    Project the solid front face of a barrier onto the canvas, for hiding whatever is behind it
+
+    Args:
+        pos (tuple): The player's position in 3D space
+        barrier (Barrier): The barrier's start position, length, blocks and grid size
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+    Returns:
+        list: (x1, y1, x2, y2) canvas rectangles, empty if the viewer is not in front of the barrier
+    """
+    z = barrier.start
+    if z - pos[2] <= cfg.NEAR_PLANE_M:
+        return []
+
+    faces = []
+    for x1, y1, x2, y2 in solid_rectangles(barrier.blocks, barrier.size):
+        top_left = utils.project((x1, y1, z), pos, view)
+        bottom_right = utils.project((x2, y2, z), pos, view)
+        faces.append((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+    return faces
+
+
+def warm(pos: tuple[float, float, float], barrier: Barrier) -> None:
+    """
+    Fill the caches for a barrier before it comes into view, as seen from the current position
+
+    Args:
+        pos (tuple): The player's position in 3D space
+        barrier (Barrier): The barrier's start position, length, blocks and grid size
+    """
+    view = region(pos, barrier)
+    visible_edges(barrier.blocks, barrier.size, view, True)
+    visible_edges(barrier.blocks, barrier.size, view, False)
+    solid_rectangles(barrier.blocks, barrier.size)
+
+
+def hidden(points: list[tuple[float, float]], occluders: list[tuple[float, float, float, float]]) -> bool:
+    """
+    Check whether projected points all fall inside one of the occluding rectangles
+
+    The occluders are convex and nearer than the points, so anything drawn between them is hidden too.
+
+    Args:
+        points (list): Canvas coordinates of the corners of a box
+        occluders (list): (x1, y1, x2, y2) canvas rectangles of nearer solid faces
+
+    Returns:
+        bool: True if the box is hidden
+    """
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+    for x1, y1, x2, y2 in occluders:
+        if left >= x1 and right <= x2 and top >= y1 and bottom <= y2:
+            return True
+    return False
@@ -0,0 +1,165 @@
+"""
+Pipelined preparation of the gameplay geometry.
+
+Without the pipeline every frame is strictly sequential: update, project, draw, flip. With it,
+the culling, projection and line batching of the trench, its detail panels, barriers, exhaust port and projectiles
+are done from an immutable snapshot of the frame on a worker thread, while the main thread draws
+and flips the frame prepared before it. Two prepared frames are double buffered, so the worker
+only ever writes the one that is not being drawn.
+
+Overlapping pure Python work only pays off when the interpreter is free-threaded (Python 3.13t
+and later). On a build with the GIL the same snapshots are prepared on the main thread instead.
+"""
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from greebles import Greebles
+    from grid import Barrier
+    from player import ShipSnapshot
+    from torpedos import TorpedoSnapshot
+import render
+from raster import SegmentBatch
+
+FREE_THREADED: bool = not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+class FrameSnapshot(NamedTuple):
+
+    """Immutable copy of everything needed to prepare the geometry of a gameplay frame."""
+
+    ship: ShipSnapshot
+    torpedoes: TorpedoSnapshot
+    barriers: list[Barrier]  # Never modified once the run has started
+    barrier_index: int
+    greebles: Greebles | None  # Only ever touched by whoever prepares the frame
+
+
+class PreparedFrame:
+
+    """The projected geometry of a frame, ready to be drawn."""
+
+    def __init__(self) -> None:
+        """Create an empty prepared frame."""
+        self.snapshot: FrameSnapshot | None = None
+        self.segments = SegmentBatch()
+        self.circles: list[tuple[tuple[int, int, int], list[float], float]] = []
+
+    def __repr__(self) -> str:
+        """Return a string representation of the prepared frame."""
+        return f"PreparedFrame(segments={len(self.segments)}, circles={len(self.circles)})"
+
+    def prepare(self, snapshot: FrameSnapshot) -> None:
+        """
+        Cull and project the geometry of a snapshot, replacing whatever was prepared before
+
+        Args:
+            snapshot (FrameSnapshot): The frame to prepare
+        """
+        position = snapshot.ship.position
+        self.segments.clear()
+        render.trench(None, position, self.segments)
+        if snapshot.greebles is not None:
+            render.greebles(None, snapshot.greebles.project(position), self.segments)
+        render.barriers(None, snapshot.barriers, snapshot.barrier_index, position, self.segments)
+        render.exhaust_port(None, position, self.segments)
+        self.circles = render.project_projectiles(snapshot.torpedoes.positions, snapshot.torpedoes.owners, position)
+        self.snapshot = snapshot
+
+
+class GeometryPipeline:
+
+    """Prepares the geometry of each gameplay frame, one frame ahead of drawing when free-threaded."""
+
+    def __init__(self, enabled: bool = False, threaded: bool = True) -> None:
+        """
+        Create the pipeline, starting the worker if it can run in parallel
+
+        Args:
+            enabled (bool): Whether gameplay frames are drawn from prepared snapshots at all
+            threaded (bool): Whether to prepare on a worker thread, ignored unless the build is free-threaded
+        """
+        self.enabled = enabled
+        self.threaded = enabled and threaded and FREE_THREADED
+        self._frames = (PreparedFrame(), PreparedFrame())
+        self._back: int = 0  # The frame the worker writes to
+        self._pending: FrameSnapshot | None = None
+        self._submitted = threading.Condition()
+        self._done = threading.Event()
+        self._done.set()
+        self._stopping: bool = False
+        self._error: Exception | None = None
+
+        self._worker: threading.Thread | None = None
+        if self.threaded:
+            self._worker = threading.Thread(target=self._run, name="geometry", daemon=True)
+            self._worker.start()
+        elif enabled:
+            logging.info("Python has the GIL enabled, preparing geometry without the worker thread")
+
+    def __repr__(self) -> str:
+        """Return a string representation of the pipeline."""
+        return f"GeometryPipeline(enabled={self.enabled}, threaded={self.threaded})"
+
+    def swap(self, snapshot: FrameSnapshot) -> PreparedFrame:
+        """
+        Hand over the snapshot of this frame, and get back the geometry to draw
+
+        When threaded, the geometry returned is the previous frame's, and this snapshot is
+        prepared while it is drawn and flipped. Otherwise the snapshot is prepared immediately.
+
+        Args:
+            snapshot (FrameSnapshot): The state of the frame just updated
+
+        Returns:
+            PreparedFrame: The geometry to draw, which must not be kept beyond the next swap
+        """
+        if not self.threaded:
+            frame = self._frames[0]
+            frame.prepare(snapshot)
+            return frame
+
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        front = self._frames[self._back]
+        if front.snapshot is None or front.snapshot.barriers is not snapshot.barriers:
+            # First frame of a run, there is nothing from the run prepared ahead
+            front.prepare(snapshot)
+
+        self._back ^= 1
+        self._done.clear()
+        with self._submitted:
+            self._pending = snapshot
+            self._submitted.notify()
+        return front
+
+    def close(self) -> None:
+        """Stop the worker once it has finished the frame it is preparing."""
+        if self._worker is None:
+            return
+        with self._submitted:
+            self._stopping = True
+            self._submitted.notify()
+        self._worker.join()
+        self._worker = None
+
+    def _run(self) -> None:
+        """Worker loop, preparing each submitted snapshot into the back frame."""
+        while True:
+            with self._submitted:
+                while self._pending is None and not self._stopping:
+                    self._submitted.wait()
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+            try:
+                self._frames[self._back].prepare(snapshot)
+            except Exception as error:  # noqa: BLE001 - re-raised on the main thread by the next swap
+                self._error = error
+            finally:
+                self._done.set()
@@ -1,5 +1,16 @@
 """"""
+from typing import NamedTuple
+
 import config as cfg
+import geometry as geo
+
+
+class ShipSnapshot(NamedTuple):
+
+    """Immutable copy of the ship state needed to draw a frame."""
+
+    position: tuple[float, float, float]
+    distance: float
 
 
 class PlayerShip:
@@ -52,25 +63,24 @@ class PlayerShip:
         """
         Keep ship within the trench
 
-        The trench origin point is at the center of the screen, so bounds checking
-        needs to use the half-width and half-height of the trench
+        The trench origin point is at the center of the screen, so the ship's centre is kept
+        within the trench's half-width and half-height, less the ship's own half-size
         """
-        trench_halfwidth = cfg.TRENCH_WIDTH // 2
-        trench_halfheight = cfg.TRENCH_HEIGHT // 2
-        ship_halfwidth = self.wingspan // 2
-        ship_halfheight = self.height // 2
+        table = geo.table
+        x_limit = table.ship_x_limit
+        y_limit = table.ship_y_limit
 
         # Horizontal bounds checking
-        if self.position[0] < (-trench_halfwidth + ship_halfwidth):
-            self.position[0] = -trench_halfwidth + ship_halfwidth
-        elif self.position[0] > (trench_halfwidth - ship_halfwidth):
-            self.position[0] = trench_halfwidth - ship_halfwidth
+        if self.position[0] < -x_limit:
+            self.position[0] = -x_limit
+        elif self.position[0] > x_limit:
+            self.position[0] = x_limit
 
         # Vertical bounds checking, allowing ship to leave after torpedo launch
-        if self.position[1] < (-trench_halfheight + ship_halfheight) and not self.torpedos_launched:
-            self.position[1] = -trench_halfheight + ship_halfheight
-        elif self.position[1] > (trench_halfheight - ship_halfheight):
-            self.position[1] = trench_halfheight - ship_halfheight
+        if self.position[1] < -y_limit and not self.torpedos_launched:
+            self.position[1] = -y_limit
+        elif self.position[1] > y_limit:
+            self.position[1] = y_limit
 
     def get_position(self) -> tuple[float, float, float]:
         """Get the x, y, and z coordinates of the ship."""
@@ -84,6 +94,10 @@ class PlayerShip:
         """Get the distance from the ship to the launch zone."""
         return cfg.EXHAUST_POSITION - self.position[2]
 
+    def snapshot(self) -> ShipSnapshot:
+        """Take an immutable copy of the ship state, safe to hand to another thread."""
+        return ShipSnapshot(self.get_position(), self.get_distance())
+
     def travel(self) -> str | None:
         """Move the player ship forward down trench, and then on axis depending on acceleration."""
         status_message = None
@@ -104,9 +118,12 @@ class PlayerShip:
         for axis in range(2):
             self.position[axis] += self.velocity[axis] / self.movement_factor
 
-            # Dampen the velocity if there is no acceleration (acts essentially as friction)
+            # Dampen the velocity if the controls are not fully deflected (acts essentially as friction),
+            # in full with no acceleration and less the further an analog stick is pushed
+            deflection = min(1.0, abs(self.acceleration[axis]) / cfg.ACCELERATION_MSS)
+            if deflection < 1.0:
+                self.velocity[axis] *= 1.0 - (1.0 - cfg.VELOCITY_DAMPEN) * (1.0 - deflection)
             if self.acceleration[axis] == 0:
-                self.velocity[axis] *= cfg.VELOCITY_DAMPEN
                 continue
 
             self.velocity[axis] += self.acceleration[axis] / self.movement_factor
@@ -128,3 +145,14 @@ class PlayerShip:
             self.acceleration[1] = cfg.VERTICAL_KEYS[key] * key_type
         else:
             raise ValueError(f"Invalid key: {key}")
+
+    def steer_analog(self, x: float, y: float) -> None:
+        """
+        Handle axis movement from an analog stick
+
+        Args:
+            x (float): Horizontal deflection, -1 to 1
+            y (float): Vertical deflection, -1 to 1, +y is down
+        """
+        self.acceleration[0] = x * cfg.ACCELERATION_MSS
+        self.acceleration[1] = y * cfg.ACCELERATION_MSS
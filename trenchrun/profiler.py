@@ -0,0 +1,193 @@
+"""
+On-demand deterministic profiling of a window of frames.
+
+Nothing is profiled until a capture is triggered, either by the PROFILE_KEY hotkey or the
+--profile-frames command line option. The profiler is then enabled for the next N frames of
+Game.run, and the results are written on a background thread so that saving them does not
+hitch the frames that follow the capture.
+"""
+import cProfile
+import json
+import logging
+import pstats
+import threading
+import time
+from pathlib import Path
+
+import config as cfg
+
+
+class ProfileCapture:
+
+    """Captures cProfile data for a fixed number of frames at a time."""
+
+    def __init__(self, frames: int = cfg.PROFILE_FRAMES, directory: str = cfg.PROFILE_DIRECTORY) -> None:
+        """
+        Create an idle profile capture
+
+        Args:
+            frames (int): The number of frames each capture covers
+            directory (str): Where the capture files are written
+        """
+        self.frames = frames
+        self.directory = Path(directory)
+        self.profile: cProfile.Profile | None = None
+        self.remaining: int = 0
+        self.captured: int = 0
+        self._profiling: bool = False
+        self.tags: dict[str, object] = {}
+        self.writers: list[threading.Thread] = []
+
+    def __repr__(self) -> str:
+        """Return a string representation of the capture."""
+        return f"ProfileCapture(frames={self.frames}, active={self.active})"
+
+    @property
+    def active(self) -> bool:
+        """Whether a capture is in progress."""
+        return self.profile is not None
+
+    def trigger(self, frames: int | None = None) -> None:
+        """
+        Arm a capture of the next frames, ignored if one is already in progress
+
+        Args:
+            frames (int): Number of frames to capture, defaults to the configured count
+        """
+        if self.active:
+            return
+
+        # Created here so the start of the first captured frame only has to call enable()
+        self.profile = cProfile.Profile()
+        self.remaining = frames or self.frames
+        self.captured = 0
+        self.tags = {}
+        logging.info(f"Profiling the next {self.remaining} frames")
+
+    def begin_frame(self) -> None:
+        """Start profiling the frame, if a capture is armed."""
+        if self.profile is not None:
+            self._profiling = True
+            self.profile.enable()
+
+    def end_frame(self, tags: dict[str, object]) -> None:
+        """
+        Stop profiling the frame, and hand the capture off to be written once complete
+
+        Args:
+            tags (dict): Describes the game state (screen, barrier count, resolution)
+        """
+        if not self._profiling:
+            return
+
+        self.profile.disable()
+        self._profiling = False
+        self.tags = tags
+        self.captured += 1
+        self.remaining -= 1
+        if self.remaining > 0:
+            return
+
+        profile, self.profile = self.profile, None
+        writer = threading.Thread(target=self._write, args=(profile, dict(tags), self.captured), daemon=True)
+        writer.start()
+        self.writers.append(writer)
+
+    def wait(self, timeout: float | None = None) -> None:
+        """
+        Wait for any captures still being written
+
+        Args:
+            timeout (float, optional): Longest wait for all of them together, in seconds, no limit if None
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for writer in self.writers:
+            writer.join(None if deadline is None else max(0.0, deadline - time.perf_counter()))
+            if writer.is_alive():
+                logging.warning("Gave up waiting for a profile capture to be written")
+        self.writers.clear()
+
+    def _write(self, profile: cProfile.Profile, tags: dict[str, object], frames: int) -> None:
+        """Write the pstats dump, collapsed stacks and tags of a finished capture."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        width, height = tags.get("resolution", (0, 0))
+        stem = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}_{tags.get('screen', 'unknown')}"
+            f"_b{tags.get('barriers', 0)}_{width}x{height}"
+        )
+        base = self.directory / stem
+
+        stats = pstats.Stats(profile)
+        stats.dump_stats(base.with_suffix(".pstats"))
+        base.with_suffix(".collapsed").write_text("\n".join(collapsed_stacks(stats)) + "\n")
+        base.with_suffix(".json").write_text(json.dumps({"frames": frames, **tags}, indent=2))
+        logging.info(f"Wrote profile capture {base}")
+
+
+def collapsed_stacks(
+    stats: pstats.Stats,
+    max_depth: int = 64,
+    min_fraction: float = cfg.PROFILE_MIN_STACK_FRACTION,
+    time_limit: float = cfg.PROFILE_COLLAPSE_SECONDS) -> list[str]:
+    """
+    Convert profile statistics into collapsed stack lines, as consumed by flamegraph tools
+
+    cProfile only records caller -> callee edges, so full stacks are reconstructed by walking
+    down from the root functions, sharing each function's time between its callers in proportion
+    to the time it spent being called from each of them. The number of paths grows exponentially
+    with depth, so a path is only followed while the time it carries is at least min_fraction of
+    the whole capture, which leaves at most max_depth / min_fraction of them.
+
+    Args:
+        stats (pstats.Stats): The profile statistics
+        max_depth (int): Deepest stack to reconstruct, guards against runaway recursion
+        min_fraction (float): Smallest share of the total time a stack is followed for
+        time_limit (float): Seconds after which the remaining stacks are left out
+
+    Returns:
+        list: Lines of "frame;frame;frame microseconds"
+    """
+    entries = stats.stats  # func -> (primitive calls, calls, tottime, cumtime, callers)
+    callees: dict[tuple, list[tuple]] = {func: [] for func in entries}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            if caller in callees:
+                callees[caller].append(func)
+
+    def label(func: tuple) -> str:
+        filename, line, name = func
+        return f"{Path(filename).name}:{name}:{line}" if line else name
+
+    lines: dict[str, float] = {}
+    threshold = stats.total_tt * min_fraction
+    deadline = time.perf_counter() + time_limit
+
+    def walk(func: tuple, stack: list[str], share: float, on_stack: set[tuple]) -> bool:
+        """Add the stacks below func, returning False once out of time."""
+        if time.perf_counter() > deadline:
+            return False
+        tottime = entries[func][2]
+        stack = stack + [label(func)]
+        if tottime * share > 0:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0.0) + tottime * share
+        if len(stack) >= max_depth:
+            return True
+        for callee in callees[func]:
+            if callee in on_stack:
+                continue
+            callee_cumtime = entries[callee][3]
+            from_here = entries[callee][4][func][3] * share  # Cumulative time of callee when called on this path
+            if (
+                callee_cumtime > 0 and from_here > 0 and from_here >= threshold
+                and not walk(callee, stack, from_here / callee_cumtime, on_stack | {callee})
+            ):
+                return False
+        return True
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers and not walk(func, [], 1.0, {func}):
+            logging.warning(f"Collapsed stacks cut short after {time_limit}s, the flamegraph is incomplete")
+            break
+
+    return [f"{stack} {round(seconds * 1_000_000)}" for stack, seconds in lines.items() if seconds > 0]
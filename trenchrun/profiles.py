@@ -0,0 +1,121 @@
+"""
+Loadable config profiles, for the trench size, speeds and resolution.
+
+A profile is a TOML file in CONFIG_PROFILE_DIRECTORY, with [trench], [speeds] and [window]
+tables. Only the settings it contains are changed. Settings set by a profile are pinned, so the
+render quality presets applied afterwards do not override them. Once the configuration has been
+changed, refresh() re-derives the dependent settings and recompiles the geometry table.
+"""
+import logging
+import math
+import tomllib
+from pathlib import Path
+
+import config as cfg
+import geometry as geo
+import occlusion
+
+# Section -> key -> the config setting it sets
+PROFILE_SETTINGS: dict[str, dict[str, str]] = {
+    "trench": {
+        "length": "TRENCH_LENGTH",
+        "width": "TRENCH_WIDTH",
+        "height": "TRENCH_HEIGHT",
+        "wall_interval": "WALL_INTERVAL",
+    },
+    "speeds": {
+        "forward_velocity_ms": "FORWARD_VELOCITY_MS",
+        "velocity_max_ms": "VELOCITY_MAX_MS",
+        "velocity_dampen": "VELOCITY_DAMPEN",
+        "acceleration_mss": "ACCELERATION_MSS",
+    },
+    "window": {
+        "width": "CANVAS_WIDTH",
+        "height": "CANVAS_HEIGHT",
+    },
+}
+
+pinned: set[str] = set()
+
+
+def resolve(name: str) -> Path:
+    """
+    Find a profile, either by path or by name in CONFIG_PROFILE_DIRECTORY
+
+    Args:
+        name (str): A path to a TOML file, or the name of a profile without the extension
+
+    Returns:
+        Path: The profile file
+    """
+    path = Path(name)
+    if path.suffix == ".toml":
+        return path
+    return Path(cfg.CONFIG_PROFILE_DIRECTORY) / f"{name}.toml"
+
+
+def load_profile(name: str) -> dict[str, int | float]:
+    """
+    Read and validate a profile
+
+    Args:
+        name (str): A path to a TOML file, or the name of a profile without the extension
+
+    Returns:
+        dict: The config settings the profile sets, and their values
+
+    Raises:
+        ValueError: If the profile has unknown settings or values that are not positive numbers
+    """
+    path = resolve(name)
+    with open(path, "rb") as file:
+        profile = tomllib.load(file)
+
+    settings = {}
+    for section, values in profile.items():
+        if section not in PROFILE_SETTINGS or not isinstance(values, dict):
+            raise ValueError(f"{path}: unknown section [{section}]")
+        for key, value in values.items():
+            setting = PROFILE_SETTINGS[section].get(key)
+            if setting is None:
+                raise ValueError(f"{path}: unknown setting {key} in [{section}]")
+            if isinstance(value, bool) or not isinstance(value, int | float) or value <= 0:
+                raise ValueError(f"{path}: {section}.{key} must be a positive number, not {value!r}")
+            # Keep the type of the default, so integer settings stay integers
+            settings[setting] = type(getattr(cfg, setting))(value)
+
+    return settings
+
+
+def apply_profile(name: str) -> None:
+    """
+    Load a profile into the configuration, pinning the settings it sets
+
+    Args:
+        name (str): A path to a TOML file, or the name of a profile without the extension
+    """
+    settings = load_profile(name)
+    for setting, value in settings.items():
+        setattr(cfg, setting, value)
+    pinned.update(settings)
+    refresh()
+    logging.info(f"Loaded config profile {resolve(name)}")
+
+
+def refresh() -> None:
+    """Re-derive the settings that config.py derives from others, and recompile the geometry table."""
+    cfg.CANVAS_CENTER_X = cfg.CANVAS_WIDTH // 2
+    cfg.CANVAS_CENTER_Y = cfg.CANVAS_HEIGHT // 2
+    cfg.CANVAS_CENTER = (cfg.CANVAS_CENTER_X, cfg.CANVAS_CENTER_Y)
+    cfg.DEATH_STAR_RADIUS = cfg.CANVAS_HEIGHT * 0.4
+    cfg.SCALE_WIDTH = cfg.CANVAS_WIDTH / 2
+    cfg.SCALE_HEIGHT = cfg.CANVAS_HEIGHT / 2
+    cfg.EXHAUST_POSITION = cfg.TRENCH_LENGTH - 100
+    cfg.EXHAUST_WIDTH = cfg.TRENCH_WIDTH / 3.0
+    cfg.LAUNCH_POSITION = cfg.EXHAUST_POSITION - cfg.TORPEDO_RANGE - 50
+    cfg.PROTON_TORPEDO_VELOCITY_MS = cfg.FORWARD_VELOCITY_MS * 1.8
+    cfg.HORIZONTAL_KEYS = {key: math.copysign(cfg.ACCELERATION_MSS, value) for key, value in cfg.HORIZONTAL_KEYS.items()}
+    cfg.VERTICAL_KEYS = {key: math.copysign(cfg.ACCELERATION_MSS, value) for key, value in cfg.VERTICAL_KEYS.items()}
+    geo.compile_table()
+    # Cached in metres across the trench, so stale once the trench size changes
+    occlusion.solid_rectangles.cache_clear()
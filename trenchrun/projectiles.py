@@ -0,0 +1,180 @@
+"""
+Pool of every projectile in flight (proton torpedoes, laser bolts, turret fire).
+
+All projectile state lives in preallocated NumPy arrays indexed by slot, so movement
+and impact resolution are done for the whole pool at once rather than per object.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collision import ProjectileCollider
+import collision
+import config as cfg
+import numpy as np
+
+# Projectile owners
+OWNER_PLAYER = 0
+OWNER_TURRET = 1
+
+# Projectile states
+STATE_FREE = 0
+STATE_FLYING = 1
+STATE_DROPPING = 2
+STATE_IMPACT = 3
+
+
+class ProjectilePool:
+
+    """Fixed capacity, array-backed store of projectiles."""
+
+    def __init__(self, capacity: int = cfg.PROJECTILE_CAPACITY) -> None:
+        """
+        Preallocate the state arrays for the pool.
+
+        Args:
+            capacity (int): The maximum number of concurrent projectiles
+        """
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 3), dtype=np.float64)
+        self.velocity = np.zeros((capacity, 3), dtype=np.float64)
+        self.lifetime = np.zeros(capacity, dtype=np.float64)  # Remaining range in metres
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.state = np.zeros(capacity, dtype=np.int8)
+
+        # Scratch buffers so the per-frame update never allocates
+        self._step = np.zeros((capacity, 3), dtype=np.float64)
+        self._distance = np.zeros(capacity, dtype=np.float64)
+        self._moving = np.zeros(capacity, dtype=bool)
+        self._dropping = np.zeros(capacity, dtype=bool)
+        self._grounded = np.zeros(capacity, dtype=bool)
+        self._hit = np.zeros(capacity, dtype=bool)
+        self.impacted = np.zeros(capacity, dtype=bool)  # Slots that hit something during the last update
+        self.impact_kind = np.zeros(capacity, dtype=np.int8)  # What each impacted slot hit
+
+        self._next_free = 0
+
+    def __repr__(self) -> str:
+        """Return a string representation of the pool."""
+        return f"ProjectilePool(capacity={self.capacity}, active={self.active_count()})"
+
+    def active_count(self) -> int:
+        """Return the number of projectiles currently in flight."""
+        return int(np.count_nonzero(self.state == STATE_FLYING) + np.count_nonzero(self.state == STATE_DROPPING))
+
+    def spawn(
+        self,
+        position: tuple[float, float, float],
+        velocity: tuple[float, float, float],
+        lifetime: float,
+        owner: int = OWNER_PLAYER) -> int:
+        """
+        Place a new projectile into the first free slot
+
+        Args:
+            position (tuple): The starting position of the projectile
+            velocity (tuple): The velocity of the projectile in metres per second
+            lifetime (float): The range of the projectile, it drops once within PROJECTILE_DROP_RANGE of it
+            owner (int): Who fired the projectile
+
+        Returns:
+            int: The slot of the new projectile, or -1 if the pool is full
+        """
+        for offset in range(self.capacity):
+            slot = (self._next_free + offset) % self.capacity
+            if self.state[slot] == STATE_FREE:
+                break
+        else:
+            return -1
+
+        self.position[slot] = position
+        self.velocity[slot] = velocity
+        self.lifetime[slot] = lifetime
+        self.owner[slot] = owner
+        self.state[slot] = STATE_FLYING
+        self.impacted[slot] = False
+        self.impact_kind[slot] = collision.IMPACT_NONE
+        self._next_free = (slot + 1) % self.capacity
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Return a slot to the pool."""
+        self.state[slot] = STATE_FREE
+        self.impacted[slot] = False
+
+    def clear(self) -> None:
+        """Release every slot in the pool."""
+        self.state.fill(STATE_FREE)
+        self.impacted.fill(False)
+        self._next_free = 0
+
+    def update(self, dt: float = 1.0 / cfg.FPS, collider: ProjectileCollider | None = None) -> None:
+        """
+        Move every projectile in flight and resolve their impacts
+
+        Projectiles fly straight until they are within PROJECTILE_DROP_RANGE of their
+        lifetime, after which they drop towards the trench floor like the torpedoes
+        of the original game. Any projectile that enters a solid barrier block or reaches
+        the floor is marked as an impact, and its slot is recycled at the start of the
+        following update. Floor impacts within the exhaust port are recorded as on target.
+
+        Args:
+            dt (float): The simulation step in seconds
+            collider (ProjectileCollider): Collides the projectiles with the barriers, if given
+        """
+        moving = self._moving
+        dropping = self._dropping
+        grounded = self._grounded
+        step = self._step
+
+        # Recycle the slots of last update's impacts
+        np.equal(self.state, STATE_IMPACT, out=grounded)
+        np.copyto(self.state, STATE_FREE, where=grounded)
+
+        np.equal(self.state, STATE_FLYING, out=moving)
+        np.equal(self.state, STATE_DROPPING, out=dropping)
+        np.logical_or(moving, dropping, out=moving)
+        self.impacted.fill(False)
+        if not moving.any():
+            return
+
+        # Straight line movement
+        np.multiply(self.velocity, dt, out=step)
+        np.add(self.position, step, out=self.position, where=moving[:, np.newaxis])
+
+        # Consume range, using the forward distance travelled this step
+        np.abs(step[:, 2], out=self._distance)
+        np.subtract(self.lifetime, self._distance, out=self.lifetime, where=moving)
+
+        # Gravity drop phase near the end of the range
+        np.less_equal(self.lifetime, cfg.PROJECTILE_DROP_RANGE, out=dropping)
+        np.logical_and(dropping, moving, out=dropping)
+        np.multiply(self._distance, cfg.PROJECTILE_DROP_RATE, out=self._distance)
+        np.add(self.position[:, 1], self._distance, out=self.position[:, 1], where=dropping)
+        np.copyto(self.state, STATE_DROPPING, where=dropping)
+
+        # Impacts with the barriers
+        if collider is not None:
+            collider.barrier_hits(self.position, moving, out=self._hit)
+            np.copyto(self.impact_kind, collision.IMPACT_BARRIER, where=self._hit)
+            np.copyto(self.impacted, self._hit)
+            np.logical_xor(moving, self._hit, out=moving)
+
+        # Impacts with the trench floor (+y is down), and whether they went down the exhaust port
+        np.greater_equal(self.position[:, 1], cfg.TRENCH_HEIGHT / 2, out=grounded)
+        np.logical_and(grounded, moving, out=grounded)
+        np.copyto(self.impact_kind, collision.IMPACT_FLOOR, where=grounded)
+        np.logical_or(self.impacted, grounded, out=self.impacted)
+        if collider is not None:
+            collider.exhaust_port_hits(self.position, grounded, out=self._hit)
+            np.copyto(self.impact_kind, collision.IMPACT_TARGET, where=self._hit)
+        np.copyto(self.state, STATE_IMPACT, where=self.impacted)
+
+    def flying(self) -> np.ndarray:
+        """Return the slots of every projectile currently in flight."""
+        return np.flatnonzero((self.state == STATE_FLYING) | (self.state == STATE_DROPPING))
+
+    def in_flight(self, slot: int) -> bool:
+        """Check whether the projectile in the given slot is still moving."""
+        return self.state[slot] == STATE_FLYING or self.state[slot] == STATE_DROPPING
@@ -0,0 +1,196 @@
+"""
+Bulk rasterization of wireframe line segments straight into the surface's pixels.
+
+pygame.draw.line has a fixed cost per call, which adds up once there are hundreds of
+barrier edges on screen. Instead, the segments of a frame are collected as
+(colour, start, end) tuples and drawn here all at once: they are clipped to the surface,
+stepped along with a vectorized DDA and written through a pygame.surfarray pixel view.
+"""
+import config as cfg
+import numpy as np
+import pygame
+
+_palette: dict[object, int] = {}
+
+
+class SegmentBatch:
+
+    """
+    The line segments of a frame, kept as flat coordinate lists grouped by colour.
+
+    Appending floats to a list is the cheapest thing the projection code can do per line,
+    and a flat list converts to an array far faster than a list of nested tuples.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty batch."""
+        self.coords: dict[object, list[float]] = {}
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        """Return the number of segments in the batch."""
+        return self.count
+
+    def add(self, colour: tuple[int, int, int] | str, start: tuple[float, float], end: tuple[float, float]) -> None:
+        """
+        Add a segment to the batch
+
+        Args:
+            colour (tuple | str): The colour of the segment
+            start (tuple): The 2D canvas coordinates of the start of the segment
+            end (tuple): The 2D canvas coordinates of the end of the segment
+        """
+        coords = self.coords.get(colour)
+        if coords is None:
+            coords = self.coords[colour] = []
+        coords += start
+        coords += end
+        self.count += 1
+
+    def extend(self, colour: tuple[int, int, int] | str, lines: np.ndarray) -> None:
+        """
+        Add an array of segments of one colour to the batch
+
+        Args:
+            colour (tuple | str): The colour of the segments
+            lines (np.ndarray): (N, 4) canvas coordinates of the start and end of each segment
+        """
+        coords = self.coords.get(colour)
+        if coords is None:
+            coords = self.coords[colour] = []
+        coords += lines.ravel().tolist()
+        self.count += len(lines)
+
+    def clear(self) -> None:
+        """Empty the batch, keeping the colour groups."""
+        for coords in self.coords.values():
+            coords.clear()
+        self.count = 0
+
+    def segments(self) -> list[tuple]:
+        """Return the batch as (colour, start, end) tuples."""
+        return [
+            (colour, (coords[i], coords[i + 1]), (coords[i + 2], coords[i + 3]))
+            for colour, coords in self.coords.items()
+            for i in range(0, len(coords), 4)
+        ]
+
+
+def map_colour(surface: pygame.Surface, colour: tuple[int, int, int] | str) -> int:
+    """
+    Convert a colour to the surface's pixel value, caching the result
+
+    The display surface keeps its pixel format for the life of the game, so one cache is shared.
+
+    Args:
+        surface (pygame.Surface): The surface the colour will be written to
+        colour (tuple | str): Any colour pygame accepts
+
+    Returns:
+        int: The mapped pixel value
+    """
+    pixel = _palette.get(colour)
+    if pixel is None:
+        pixel = surface.map_rgb(pygame.Color(colour))
+        _palette[colour] = pixel
+    return pixel
+
+
+def clip_segments(coords: np.ndarray, width: int, height: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Clip segments to the surface with the Liang-Barsky algorithm, all segments at once
+
+    Args:
+        coords (np.ndarray): (N, 4) array of x0, y0, x1, y1
+        width (int): Surface width in pixels
+        height (int): Surface height in pixels
+
+    Returns:
+        tuple: The clipped (M, 4) coordinates, and the indices of the M segments that are visible
+    """
+    x0, y0, x1, y1 = coords.T
+    dx = x1 - x0
+    dy = y1 - y0
+    p = np.stack((-dx, dx, -dy, dy))
+    q = np.stack((x0, width - 1 - x0, y0, height - 1 - y0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = q / p
+    t0 = np.maximum(np.where(p < 0, r, -np.inf).max(axis=0), 0.0)
+    t1 = np.minimum(np.where(p > 0, r, np.inf).min(axis=0), 1.0)
+
+    visible = np.isfinite(coords).all(axis=1) & ~((p == 0) & (q < 0)).any(axis=0) & (t0 <= t1)
+    keep = np.flatnonzero(visible)
+    t0 = t0[keep]
+    t1 = t1[keep]
+    clipped = np.stack((
+        x0[keep] + t0 * dx[keep],
+        y0[keep] + t0 * dy[keep],
+        x0[keep] + t1 * dx[keep],
+        y0[keep] + t1 * dy[keep],
+    ), axis=1)
+    return clipped, keep
+
+
+def draw_segments(surface: pygame.Surface, batch: SegmentBatch, width: int | None = None) -> None:
+    """
+    Draw a batch of line segments
+
+    Below RASTER_MIN_SEGMENTS the setup cost of the arrays outweighs the per-call cost of
+    pygame.draw.line, so small batches are drawn with that instead. Colours are drawn in the
+    order they were first added, so where lines of different colours cross, the colour that
+    appeared later in the frame ends up on top.
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the segments
+        batch (SegmentBatch): The segments, in 2D canvas coordinates
+        width (int): Line width in pixels, lines are thickened across their major axis, defaults to LINE_WIDTH
+
+    Returns:
+        None
+    """
+    width = width or cfg.LINE_WIDTH
+    if len(batch) < cfg.RASTER_MIN_SEGMENTS:
+        for colour, start, end in batch.segments():
+            pygame.draw.line(surface, colour, start, end, width)
+        return
+
+    groups = [(colour, coords) for colour, coords in batch.coords.items() if coords]
+    coords = np.concatenate([np.array(coords, dtype=np.float32) for _, coords in groups]).reshape(-1, 4)
+    colours = np.repeat(
+        np.array([map_colour(surface, colour) for colour, _ in groups], dtype=np.int64),
+        [len(coords) // 4 for _, coords in groups],
+    )
+    surface_width, surface_height = surface.get_size()
+    coords, keep = clip_segments(coords, surface_width, surface_height)
+    if not len(keep):
+        return
+    colours = colours[keep]
+
+    # DDA: step one pixel at a time along the major axis of each segment
+    x0, y0, x1, y1 = coords.T
+    dx = x1 - x0
+    dy = y1 - y0
+    x_major = np.abs(dx) >= np.abs(dy)
+    steps = np.ceil(np.maximum(np.abs(dx), np.abs(dy))).astype(np.intp)
+    points = steps + 1
+    segment = np.repeat(np.arange(len(steps)), points)
+    offset = np.arange(points.sum(), dtype=np.float32) - np.repeat(np.cumsum(points) - points, points)
+    scale = 1 / np.maximum(steps, 1)
+    xs = np.rint(np.repeat(x0, points) + np.repeat(dx * scale, points) * offset).astype(np.intp)
+    ys = np.rint(np.repeat(y0, points) + np.repeat(dy * scale, points) * offset).astype(np.intp)
+    colours = colours[segment].astype(np.uint32)
+
+    pixels = pygame.surfarray.pixels2d(surface)
+    if width == 1:
+        pixels[xs, ys] = colours
+    else:
+        # Thicken each line by drawing it again, shifted across its major axis, clamped to the surface
+        across = x_major[segment]
+        shift_x = np.where(across, 0, 1)
+        shift_y = np.where(across, 1, 0)
+        for shift in range(-((width - 1) // 2), width // 2 + 1):
+            pixels[
+                np.clip(xs + shift_x * shift, 0, surface_width - 1),
+                np.clip(ys + shift_y * shift, 0, surface_height - 1),
+            ] = colours
+    del pixels
@@ -0,0 +1,239 @@
+"""
+Non-blocking capture of gameplay video, screenshots and an instant replay buffer.
+
+The frame loop only scales the display surface into a preallocated staging slot and queues
+it; encoding and writing happen on a background worker. If the worker falls behind and no
+staging slot is free, the capture frame is dropped, never the game frame. The instant replay
+keeps the last REPLAY_SECONDS in a preallocated ring buffer, so its memory use is constant.
+"""
+import contextlib
+import json
+import logging
+import queue
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import config as cfg
+import numpy as np
+import pygame
+
+# Work flags for a staged frame
+RECORD = 1
+REPLAY = 2
+
+# Worker commands
+_FRAME = 0
+_SCREENSHOT = 1
+_SAVE_REPLAY = 2
+_START = 3
+_STOP = 4
+_QUIT = 5
+
+
+class FrameRecorder:
+
+    """Captures frames from the display surface without stalling the frame loop."""
+
+    def __init__(
+        self,
+        size: tuple[int, int],
+        directory: str = cfg.CAPTURE_DIRECTORY,
+        sink: str = cfg.CAPTURE_FORMAT,
+        replay: bool = False) -> None:
+        """
+        Preallocate the staging and replay buffers and start the worker
+
+        Args:
+            size (tuple): The size of the display surface
+            directory (str): Where captures are written
+            sink (str): How recordings are written, one of "raw", "png" or "pipe"
+            replay (bool): Whether to keep the instant replay buffer
+        """
+        self.directory = Path(directory)
+        self.sink = sink
+        self.size = (max(1, int(size[0] * cfg.CAPTURE_SCALE)), max(1, int(size[1] * cfg.CAPTURE_SCALE)))
+        self.recording: bool = False
+        self.frame_index: int = 0
+        self.dropped: int = 0
+
+        self.record_interval = max(1, cfg.FPS // cfg.CAPTURE_FPS)
+        self.replay_interval = max(1, cfg.FPS // cfg.REPLAY_FPS)
+
+        width, height = self.size
+        self._scaled = pygame.Surface(self.size)
+        self._staging = np.zeros((cfg.CAPTURE_STAGING_FRAMES, width, height, 3), dtype=np.uint8)
+        self._free: queue.SimpleQueue[int] = queue.SimpleQueue()
+        for slot in range(cfg.CAPTURE_STAGING_FRAMES):
+            self._free.put(slot)
+
+        self._replay: np.ndarray | None = None
+        self._replay_next: int = 0
+        self._replay_count: int = 0
+        if replay:
+            frames = cfg.REPLAY_SECONDS * cfg.REPLAY_FPS
+            self._replay = np.zeros((frames, width, height, 3), dtype=np.uint8)
+
+        # Only touched by the worker thread
+        self._output = None
+        self._outputs = contextlib.ExitStack()  # Closes the recording's file or encoder when it stops
+        self._recorded: int = 0
+        self._recording_path: Path | None = None
+
+        self._work: queue.SimpleQueue[tuple] = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._worker.start()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the recorder."""
+        return f"FrameRecorder(size={self.size}, recording={self.recording}, dropped={self.dropped})"
+
+    def capture(self, surface: pygame.Surface) -> None:
+        """
+        Stage the current frame, if it is needed for the recording or the replay buffer
+
+        Args:
+            surface (pygame.Surface): The fully rendered display surface
+        """
+        self.frame_index += 1
+        flags = 0
+        if self.recording and self.frame_index % self.record_interval == 0:
+            flags |= RECORD
+        if self._replay is not None and self.frame_index % self.replay_interval == 0:
+            flags |= REPLAY
+        if not flags:
+            return
+
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+
+        pygame.transform.scale(surface, self.size, self._scaled)
+        pygame.pixelcopy.surface_to_array(self._staging[slot], self._scaled)
+        self._work.put((_FRAME, slot, flags))
+
+    def screenshot(self, surface: pygame.Surface) -> None:
+        """Queue a full resolution screenshot of the given surface to be saved."""
+        self._work.put((_SCREENSHOT, surface.copy(), 0))
+
+    def toggle_recording(self) -> None:
+        """Start recording if stopped, or stop if recording."""
+        self.recording = not self.recording
+        self._work.put((_START if self.recording else _STOP, None, 0))
+
+    def save_replay(self) -> None:
+        """Queue the contents of the instant replay buffer to be written out."""
+        if self._replay is not None:
+            self._work.put((_SAVE_REPLAY, None, 0))
+
+    def close(self) -> None:
+        """Finish any queued work and stop the worker."""
+        if self.recording:
+            self.toggle_recording()
+        self._work.put((_QUIT, None, 0))
+        self._worker.join()
+        if self.dropped:
+            logging.info(f"Dropped {self.dropped} capture frames")
+
+    def _run(self) -> None:
+        """Worker loop, handling queued frames and commands in order."""
+        while True:
+            command, payload, flags = self._work.get()
+            try:
+                if command == _FRAME:
+                    self._handle_frame(payload, flags)
+                elif command == _SCREENSHOT:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    path = self.directory / f"screenshot_{time.strftime('%Y%m%d-%H%M%S')}.png"
+                    pygame.image.save(payload, path)
+                    logging.info(f"Saved screenshot {path}")
+                elif command == _SAVE_REPLAY:
+                    self._write_replay()
+                elif command == _START:
+                    self._open_recording()
+                elif command == _STOP:
+                    self._close_recording()
+                elif command == _QUIT:
+                    return
+            except (OSError, pygame.error) as error:
+                logging.error(f"Capture failed: {error}")
+            except Exception:
+                # A bug in one job must not take every later screenshot, replay and recording down with the worker
+                logging.exception("Capture failed")
+            finally:
+                if command == _FRAME:
+                    self._free.put(payload)
+
+    def _handle_frame(self, slot: int, flags: int) -> None:
+        """Copy a staged frame into the replay buffer and/or write it to the recording."""
+        frame = self._staging[slot]
+        if flags & REPLAY:
+            self._replay[self._replay_next] = frame
+            self._replay_next = (self._replay_next + 1) % len(self._replay)
+            self._replay_count = min(self._replay_count + 1, len(self._replay))
+        if flags & RECORD and self._recording_path is not None:
+            self._write_frame(frame)
+
+    def _open_recording(self) -> None:
+        """Begin a new recording in the configured format."""
+        self._outputs.close()
+        self._output = None
+        self._recording_path = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"recording_{time.strftime('%Y%m%d-%H%M%S')}"
+        width, height = self.size
+        self._recorded = 0
+        if self.sink == "png":
+            stem.mkdir()
+            path = stem
+        elif self.sink == "pipe":
+            path = stem.with_suffix(".mp4")
+            command = [
+                part.format(width=width, height=height, fps=cfg.CAPTURE_FPS, output=path)
+                for part in cfg.CAPTURE_ENCODER_COMMAND
+            ]
+            self._output = self._outputs.enter_context(
+                subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            )
+        else:
+            path = stem.with_suffix(".rgb")
+            self._output = self._outputs.enter_context(path.open("wb"))
+            header = {"width": width, "height": height, "fps": cfg.CAPTURE_FPS, "pixel_format": "rgb24"}
+            stem.with_suffix(".json").write_text(json.dumps(header, indent=2))
+        # Only set once the recording is open, frames are not written until then
+        self._recording_path = path
+        logging.info(f"Recording to {self._recording_path}")
+
+    def _write_frame(self, frame: np.ndarray) -> None:
+        """Write a single (width, height, 3) frame to the recording."""
+        if self.sink == "png":
+            pygame.image.save(pygame.surfarray.make_surface(frame), self._recording_path / f"{self._recorded:06d}.png")
+        elif self._output is None:
+            return
+        elif self.sink == "pipe":
+            self._output.stdin.write(frame.transpose(1, 0, 2).tobytes())
+        else:
+            self._output.write(frame.transpose(1, 0, 2).tobytes())
+        self._recorded += 1
+
+    def _close_recording(self) -> None:
+        """Finish the current recording, closing the file or waiting for the encoder."""
+        path, self._recording_path = self._recording_path, None
+        self._output = None
+        self._outputs.close()
+        if path is not None:
+            logging.info(f"Recorded {self._recorded} frames to {path}")
+
+    def _write_replay(self) -> None:
+        """Write the instant replay buffer out as a PNG sequence, oldest frame first."""
+        directory = self.directory / f"replay_{time.strftime('%Y%m%d-%H%M%S')}"
+        directory.mkdir(parents=True, exist_ok=True)
+        frames = len(self._replay)
+        oldest = (self._replay_next - self._replay_count) % frames
+        for i in range(self._replay_count):
+            frame = self._replay[(oldest + i) % frames]
+            pygame.image.save(pygame.surfarray.make_surface(frame), directory / f"{i:06d}.png")
+        logging.info(f"Saved {self._replay_count} replay frames to {directory}")
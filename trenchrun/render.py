@@ -4,43 +4,46 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from geometry import Viewport
+    from grid import Barrier
+    from pipeline import PreparedFrame
+    from projectiles import ProjectilePool
+    from raster import SegmentBatch
     from screens import MainMenuScreen
-    from torpedos import Torpedos
+    from starfield import Starfield
 import config as cfg
+import geometry as geo
+import grid
+import numpy as np
+import occlusion
 import pygame
+import raster
 import utils
 
 
 def message(surface: pygame.Surface, msg: str) -> None:
     """"""
     # print(msg)
-    y = cfg.CANVAS_CENTER_Y + 90
+    y = surface.get_height() // 2 + 90
     for line in msg.split("\n"):
         text_centre(surface, line, y, 35, "White")
         y += 45
 
 
-def stars(stars: list, surface: pygame.Surface) -> None:
+def stars(stars: Starfield, surface: pygame.Surface, horizon: int | None = None, view: Viewport | None = None) -> None:
     """
     Draws stars on the given surface.
 
     Args:
-        stars (list): A list of star positions, where each position is a tuple (x, y).
+        stars (Starfield): The starfield to draw.
         surface (pygame.Surface): The surface on which to draw the stars.
+        horizon (int, optional): Only draw the stars above this screen row. Defaults to None.
+        view (Viewport, optional): The viewport projected onto. Defaults to the whole canvas.
 
     Returns:
         None
     """
-    star_colours = []
-    for shade in range(8, 16):
-        component = 16 * shade
-        colour = (component, component, component)
-        star_colours.append(colour)
-
-    colour_len = len(star_colours)
-    for i, star in enumerate(stars):
-        colour = star_colours[i % colour_len]
-        pygame.draw.circle(surface, colour, star, 1, 1)
+    stars.draw(surface, horizon, view)
 
 
 def deathstar(surface: pygame.Surface, fill_colour: tuple[int, int, int] | None = None) -> None:
@@ -80,23 +83,56 @@ def intro_text(self: MainMenuScreen, surface: pygame.Surface) -> None:
     Returns:
         None
     """
-    centre = cfg.CANVAS_CENTER
-    text_centre(surface, "Star Wars", 190, 58, cfg.INTRO_TEXT_COLOUR)
-    text_centre(surface, "Press Space to begin your attack run", 340, 24, cfg.INTRO_TEXT_COLOUR)
-    text_centre(surface, "Use Cursor Keys to move", 420, 19, cfg.INTRO_TEXT_COLOUR)
-    text_centre(surface, "Use Space to launch Proton Torpedo", 440, 19, cfg.INTRO_TEXT_COLOUR)
-    text_right(surface, cfg.VERSION, (cfg.CANVAS_WIDTH - 16, 14), 14, cfg.INTRO_TEXT_COLOUR)
-
+    centre = (surface.get_width() // 2, surface.get_height() // 2)
+    text_centre(surface, "Star Wars", centre[1] - 194, 58, cfg.INTRO_TEXT_COLOUR)
+    text_centre(surface, "Press Space to begin your attack run", centre[1] - 44, 24, cfg.INTRO_TEXT_COLOUR)
+    text_centre(surface, "or 2 for a two player run", centre[1] - 14, 19, cfg.INTRO_TEXT_COLOUR)
+    text_centre(surface, "Use Cursor Keys to move", centre[1] + 36, 19, cfg.INTRO_TEXT_COLOUR)
+    text_centre(surface, "Use Space to launch Proton Torpedo", centre[1] + 56, 19, cfg.INTRO_TEXT_COLOUR)
+    text_right(surface, cfg.VERSION, (surface.get_width() - 16, 14), 14, cfg.INTRO_TEXT_COLOUR)
+
+    # Offsets from the centre rather than fixed rows, so the warning stays on screen at every preset resolution
     x1 = centre[0] - 160
-    y1 = centre[1] + (185 if self.game.violent_death else 205)
+    y1 = centre[1] + (104 if self.game.violent_death else 124)
     x2 = centre[0] + 160
-    y2 = centre[1] + 225
+    y2 = centre[1] + 148
     pygame.draw.polygon(surface, "Black", ((x1, y1), (x2, y1), (x2, y2), (x1, y2)), 1)
     flash_warning = "Note: this game contains flashing colours which may not\nbe suitable for those with a history of epilepsy"
     flash_text = f"Press 'Q' to turn {'OFF' if self.game.violent_death else 'ON'} flashing colours"
-    text_centre(surface, flash_text, 520, 18, cfg.WARNING_TEXT_COLOUR)
+    text_centre(surface, flash_text, centre[1] + 136, 18, cfg.WARNING_TEXT_COLOUR)
     if self.game.violent_death:
-        text_centre(surface, flash_warning, 500, 18, cfg.WARNING_TEXT_COLOUR)
+        text_centre(surface, flash_warning, centre[1] + 116, 18, cfg.WARNING_TEXT_COLOUR)
+
+
+_fonts: dict[int, pygame.font.Font] = {}
+_text_surfaces: dict[tuple[str, int, object], pygame.Surface] = {}
+
+
+def text_surface(text: str, size: int, colour: str) -> pygame.Surface:
+    """
+    Render text, reusing the fonts and the surfaces of recently rendered text
+
+    Loading a font and rasterizing text are by far the most expensive parts of drawing the HUD,
+    and most HUD text is the same from one frame to the next.
+
+    Args:
+        text (str): The text to render
+        size (int): The font size
+        colour (str): The colour of the text
+
+    Returns:
+        pygame.Surface: The rendered text
+    """
+    key = (text, size, colour)
+    surface = _text_surfaces.get(key)
+    if surface is None:
+        font = _fonts.get(size)
+        if font is None:
+            font = _fonts[size] = pygame.font.Font(cfg.FONT_STYLE, size)
+        if len(_text_surfaces) >= cfg.TEXT_CACHE_SIZE:
+            _text_surfaces.clear()
+        surface = _text_surfaces[key] = font.render(text, True, colour)
+    return surface
 
 
 def text_centre(screen: pygame.Surface, text: str, y: int, size: int, colour: str) -> None:
@@ -113,10 +149,8 @@ def text_centre(screen: pygame.Surface, text: str, y: int, size: int, colour: st
     Returns:
         None
     """
-    font = pygame.font.Font(cfg.FONT_STYLE, size)
-    text_surface = font.render(text, True, colour)
-    text_rect = text_surface.get_rect(center=(cfg.CANVAS_WIDTH // 2, y))
-    screen.blit(text_surface, text_rect)
+    rendered = text_surface(text, size, colour)
+    screen.blit(rendered, rendered.get_rect(center=(screen.get_width() // 2, y)))
 
 
 def text_right(screen: pygame.Surface, text: str, coords: tuple[int, int], size: int, colour: str) -> None:
@@ -133,10 +167,8 @@ def text_right(screen: pygame.Surface, text: str, coords: tuple[int, int], size:
     Returns:
         None
     """
-    font = pygame.font.Font(cfg.FONT_STYLE, size)
-    text_surface = font.render(text, True, colour)
-    text_rect = text_surface.get_rect(topright=coords)
-    screen.blit(text_surface, text_rect)
+    rendered = text_surface(text, size, colour)
+    screen.blit(rendered, rendered.get_rect(topright=coords))
 
 
 def death(surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
@@ -157,20 +189,50 @@ def death(surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
     message_tick = pygame.time.get_ticks()
     if dead:
         if violent_death and (message_tick % 2 == 0):
+            width, height = surface.get_size()
             pygame.draw.polygon(
                 surface,
                 "Red",
                 (
                     (0, 0),
-                    (cfg.CANVAS_WIDTH, 0),
-                    (cfg.CANVAS_WIDTH, cfg.CANVAS_HEIGHT),
-                    (0, cfg.CANVAS_HEIGHT)
+                    (width, 0),
+                    (width, height),
+                    (0, height)
                 ),
                 1)
         message_tick += 1
 
 
-def trench(surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+def line(
+    surface: pygame.Surface,
+    colour: tuple[int, int, int] | str,
+    start: tuple[float, float],
+    end: tuple[float, float],
+    segments: SegmentBatch | None = None) -> None:
+    """
+    Draw a wireframe line, or add it to a batch of segments to be drawn later
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the line
+        colour (tuple | str): The colour of the line
+        start (tuple): The 2D canvas coordinates of the start of the line
+        end (tuple): The 2D canvas coordinates of the end of the line
+        segments (SegmentBatch, optional): If given, the line is added to it instead of drawn
+
+    Returns:
+        None
+    """
+    if segments is None:
+        pygame.draw.line(surface, colour, start, end, cfg.LINE_WIDTH)
+    else:
+        segments.add(colour, start, end)
+
+
+def trench(
+    surface: pygame.Surface,
+    pos: tuple[float, float, float],
+    segments: SegmentBatch | None = None,
+    view: Viewport | None = None) -> None:
     """
     Render the trench
 
@@ -181,102 +243,133 @@ def trench(surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
     Args:
         surface (pygame.Surface): The surface on which to draw the trench
         pos (tuple): The player's position in 3D space
+        segments (SegmentBatch, optional): Batch that the lines are added to instead of being drawn
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
 
     Returns:
         None
     """
-    tw = cfg.TRENCH_WIDTH // 2
-    th = cfg.TRENCH_HEIGHT // 2
-    trench = ([-tw, -th], [tw, -th], [tw, th], [-tw, th])
+    table = geo.table
+    tw = table.trench_half_width
+    th = table.trench_half_height
+    trench = ((-tw, -th), (tw, -th), (tw, th), (-tw, th))
     trench_p: list[tuple[float, float]] = []
-    for t in trench:
-        near = list(t)
-        near.append(pos[2])
-        far = list(t)
-        far.append(cfg.TRENCH_LENGTH)
-        near_p = utils.project(near, pos)
-        far_p = utils.project(far, pos)
-        pygame.draw.line(surface, cfg.TRENCH_COLOUR, near_p, far_p, cfg.LINE_WIDTH)
+    for x, y in trench:
+        near_p = utils.project((x, y, pos[2]), pos, view)
+        far_p = utils.project((x, y, table.trench_length), pos, view)
+        line(surface, cfg.TRENCH_COLOUR, near_p, far_p, segments)
         trench_p.append(far_p)
 
     # Draw far wall
     trench_p.append(trench_p[0])
-    pygame.draw.lines(surface, cfg.TRENCH_COLOUR, False, trench_p, cfg.LINE_WIDTH)
+    for i in range(4):
+        line(surface, cfg.TRENCH_COLOUR, trench_p[i], trench_p[i + 1], segments)
 
     # Draw vertical walls
-    distance = (int(pos[2] + cfg.WALL_INTERVAL) // cfg.WALL_INTERVAL) * cfg.WALL_INTERVAL
-    limit = min(pos[2] + cfg.FAR_PLANE_M, cfg.TRENCH_LENGTH)
+    interval = table.wall_interval
+    distance = (int(pos[2] + interval) // interval) * interval
+    limit = min(pos[2] + cfg.WALL_DETAIL_DISTANCE_M, table.trench_length)
     while distance < limit:
         for side in [-1, 1]:
-            p1 = utils.project((side * tw, -th, distance), pos)
-            p2 = utils.project((side * tw, th, distance), pos)
-            pygame.draw.line(surface, cfg.TRENCH_COLOUR, p1, p2, cfg.LINE_WIDTH)
-        distance += cfg.WALL_INTERVAL
+            p1 = utils.project((side * tw, -th, distance), pos, view)
+            p2 = utils.project((side * tw, th, distance), pos, view)
+            line(surface, cfg.TRENCH_COLOUR, p1, p2, segments)
+        distance += interval
+
+
+def greebles(surface: pygame.Surface, lines: np.ndarray, segments: SegmentBatch | None = None) -> None:
+    """
+    Render the detail panels along the trench walls and floor
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the panels
+        lines (np.ndarray): (N, 4) canvas coordinates of the start and end of each line, from Greebles.project
+        segments (SegmentBatch, optional): Batch that the lines are added to instead of being drawn
+
+    Returns:
+        None
+    """
+    if segments is not None:
+        segments.extend(cfg.GREEBLE_COLOUR, lines)
+        return
+    for x0, y0, x1, y1 in lines.tolist():
+        pygame.draw.line(surface, cfg.GREEBLE_COLOUR, (x0, y0), (x1, y1), cfg.LINE_WIDTH)
 
 
-def render_barrier(surface: pygame.Surface, pos: tuple[float, float, float], barrier: tuple[float, int, list[int]]) -> None:
+def render_barrier(
+    surface: pygame.Surface,
+    pos: tuple[float, float, float],
+    barrier: Barrier,
+    segments: SegmentBatch | None = None,
+    occluders: list[tuple[float, float, float, float]] | None = None,
+    view: Viewport | None = None) -> None:
     """
     Render a single barrier.
 
     Args:
         surface (pygame.Surface): The surface on which to draw the barrier.
-        barrier (tuple): A tuple containing the barrier's start position, length, and block array.
+        pos (tuple): The player's position in 3D space.
+        barrier (Barrier): The barrier's start position, length, blocks and grid size.
+        segments (SegmentBatch, optional): Batch that the lines are added to instead of being drawn.
+        occluders (list, optional): Canvas rectangles of nearer solid faces. If given, hidden lines are removed.
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas.
 
     Returns:
         None
     """
     barrier_start = barrier[0]
     barrier_end = barrier_start + barrier[1]
-    block_array = barrier[2]
-    block_width = cfg.TRENCH_WIDTH / 3.0
-    block_height = cfg.TRENCH_HEIGHT / 3.0
-    block_half_width = block_width / 2.0
-    block_half_height = block_height / 2.0
-
-    # Calculate the colour of the blocks, based on base colour and distance.
-    # The barrier's base colour is taken from its start position.
-    distance = 1.0 - 0.9 * (barrier_start - pos[2]) / cfg.FAR_PLANE_M
-    base_colour = cfg.BARRIER_COLOURS[int(barrier_start % len(cfg.BARRIER_COLOURS))]
-    colour = "#"
-    for component in range(0, 3):
-        colour += utils.hex(base_colour[component] * distance)
-
-    i = 0  # Block Index ( 0 to 8 )
-    for y in range(-1, 2):
-        for x in range(-1, 2):
-            if block_array[i] == 0:
-                i += 1
-                continue
-            px = x * block_width  # Coordinates at the centre of the block
-            py = y * block_height
-            # Define a tuple containing the coordinates for this cube. They are indexed by BLOCK_VERTEX.
-            cube = (
-                (px - block_half_width, py - block_half_height, barrier_start),
-                (px + block_half_width, py - block_half_height, barrier_start),
-                (px + block_half_width, py + block_half_height, barrier_start),
-                (px - block_half_width, py + block_half_height, barrier_start),
-                (px - block_half_width, py - block_half_height, barrier_end),
-                (px + block_half_width, py - block_half_height, barrier_end),
-                (px + block_half_width, py + block_half_height, barrier_end),
-                (px - block_half_width, py + block_half_height, barrier_end)
-            )
-
-            # Project the 3d coordinates into 2d canvas coordinates
-            cube_p = []
-            for p in cube:
-                cube_p.append(utils.project(p, pos))
-
-            # Draw the lines
-            for vi in cfg.BLOCK_VERTEX:
-                pygame.draw.line(surface, colour, cube_p[vi[0]], cube_p[vi[1]], cfg.LINE_WIDTH)
-            i += 1
+    table = geo.table
+    xs, ys = table.barrier_planes[barrier.size]
+
+    # The colour of the blocks fades with distance, from the barrier's base colour taken from its start position
+    shades = table.barrier_shades[int(barrier_start % len(cfg.BARRIER_COLOURS))]
+    level = int((barrier_start - pos[2]) / cfg.FAR_PLANE_M * cfg.BARRIER_SHADES)
+    colour = shades[min(max(level, 0), cfg.BARRIER_SHADES)]
+
+    # Far away, the diagonals only add clutter
+    detailed = barrier_start - pos[2] < cfg.BARRIER_DETAIL_DISTANCE_M
+    # Runs of solid blocks are drawn as one box
+    if occluders is None:
+        edges = cfg.BLOCK_VERTEX if detailed else cfg.BLOCK_OUTLINE
+        boxes = [(box, edges) for box in grid.boxes(barrier.blocks, barrier.size)]
+    else:
+        boxes = occlusion.visible_edges(barrier.blocks, barrier.size, occlusion.region(pos, barrier), detailed)
+
+    if not boxes:
+        return
+    # Every corner of every box lies on the block planes, so only the planes are projected
+    front_x, front_y = utils.project_planes(xs, ys, barrier_start, pos, view)
+    back_x, back_y = utils.project_planes(xs, ys, barrier_end, pos, view)
+
+    for (left, top, right, bottom), edges in boxes:
+        # The front corners of this box, followed by the back corners. They are indexed by BLOCK_VERTEX.
+        cube_p = (
+            (front_x[left], front_y[top]),
+            (front_x[right], front_y[top]),
+            (front_x[right], front_y[bottom]),
+            (front_x[left], front_y[bottom]),
+            (back_x[left], back_y[top]),
+            (back_x[right], back_y[top]),
+            (back_x[right], back_y[bottom]),
+            (back_x[left], back_y[bottom]),
+        )
+
+        if occluders and occlusion.hidden(cube_p, occluders):
+            continue
+
+        # Draw the lines
+        for vi in edges:
+            line(surface, colour, cube_p[vi[0]], cube_p[vi[1]], segments)
 
 
 def barriers(
     surface: pygame.Surface,
-    barriers: list[tuple[float, int, list[int]]],
+    barriers: list[Barrier],
     current_barrier_index: int,
-    pos: tuple[float, float, float]) -> None:
+    pos: tuple[float, float, float],
+    segments: SegmentBatch | None = None,
+    view: Viewport | None = None) -> None:
     """
     Draws all of the visible barriers.
 
@@ -289,6 +382,8 @@ def barriers(
         barriers (list): A list of all the barriers in the game.
         current_barrier_index (int): The index of the first visible barrier.
         pos (tuple): The player's position in 3D space.
+        segments (SegmentBatch, optional): Batch that the lines are added to instead of being drawn.
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas.
 
     Returns:
         None
@@ -308,80 +403,188 @@ def barriers(
         else:
             break
 
-    for barrier in visible_barriers:
-        render_barrier(surface, pos, barrier)
+    if not cfg.HIDDEN_LINES:
+        for barrier in visible_barriers:
+            render_barrier(surface, pos, barrier, segments, view=view)
+        return
+
+    # Each barrier can only be hidden by the solid front faces of those nearer than it
+    occluders: list[list[tuple[float, float, float, float]]] = []
+    nearer: list[tuple[float, float, float, float]] = []
+    for barrier in reversed(visible_barriers):
+        occluders.append(list(nearer))
+        nearer.extend(occlusion.front_faces(pos, barrier, view))
+    for barrier, hidden_by in zip(visible_barriers, reversed(occluders)):
+        render_barrier(surface, pos, barrier, segments, hidden_by, view)
 
 
-def exhaust_port(surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+def exhaust_port(
+    surface: pygame.Surface,
+    pos: tuple[float, float, float],
+    segments: SegmentBatch | None = None,
+    view: Viewport | None = None) -> None:
     """
     Render the exhaust port
 
     Args:
         surface (pygame.Surface): The surface on which to draw the exhaust port
         pos (tuple): The player's position in 3D space
+        segments (SegmentBatch, optional): Batch that the lines are added to instead of being drawn
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
 
     Returns:
         None
     """
-    y = cfg.TRENCH_HEIGHT / 2
-    z = cfg.EXHAUST_POSITION
-    w = cfg.EXHAUST_WIDTH
-    hw = w / 2
+    table = geo.table
+    y = table.trench_half_height
+    z = table.exhaust_position
+    hw = table.exhaust_half_width
+    w = hw * 2
     hole = ((-hw, y, z - hw), (hw, y, z - hw), (hw, y, z + hw), (-hw, y, z + hw))
     coords = []
     for p in hole:
-        coords.append(utils.project(p, pos))
+        coords.append(utils.project(p, pos, view))
     coords.append(coords[0])
-    pygame.draw.lines(surface, cfg.EXHAUST_PORT_COLOUR, True, coords, cfg.LINE_WIDTH)
-
-    pygame.draw.line(
-        surface,
-        cfg.EXHAUST_PORT_COLOUR,
-        utils.project((-w, y, z), pos),
-        utils.project((-hw, y, z), pos),
-        cfg.LINE_WIDTH)
-    pygame.draw.line(
-        surface,
-        cfg.EXHAUST_PORT_COLOUR,
-        utils.project((w, y, z), pos),
-        utils.project((hw, y, z), pos),
-        cfg.LINE_WIDTH)
-    pygame.draw.line(
-        surface,
-        cfg.EXHAUST_PORT_COLOUR,
-        utils.project((0, y, z - w), pos),
-        utils.project((0, y, z - hw), pos),
-        cfg.LINE_WIDTH)
-    pygame.draw.line(
-        surface,
-        cfg.EXHAUST_PORT_COLOUR,
-        utils.project((0, y, z + w), pos),
-        utils.project((0, y, z + hw), pos),
-        cfg.LINE_WIDTH)
-
-
-def torpedoes(surface: pygame.Surface, torpedos: Torpedos, player: tuple[float, float, float]) -> None:
-    """
-    Render the proton torpedoes
-
-    The torpedoes are drawn as circles on the screen, with their size determined by the distance from the player.
+    for i in range(4):
+        line(surface, cfg.EXHAUST_PORT_COLOUR, coords[i], coords[i + 1], segments)
+
+    line(surface, cfg.EXHAUST_PORT_COLOUR, utils.project((-w, y, z), pos, view), utils.project((-hw, y, z), pos, view), segments)
+    line(surface, cfg.EXHAUST_PORT_COLOUR, utils.project((w, y, z), pos, view), utils.project((hw, y, z), pos, view), segments)
+    line(surface, cfg.EXHAUST_PORT_COLOUR, utils.project((0, y, z - w), pos, view), utils.project((0, y, z - hw), pos, view), segments)
+    line(surface, cfg.EXHAUST_PORT_COLOUR, utils.project((0, y, z + w), pos, view), utils.project((0, y, z + hw), pos, view), segments)
+
+
+def torpedoes(
+    surface: pygame.Surface,
+    pool: ProjectilePool,
+    player: tuple[float, float, float],
+    view: Viewport | None = None) -> None:
+    """
+    Render every projectile in flight
+
+    The projectiles are drawn as circles on the screen, with their size determined by the distance from the player.
+    All of the projectiles are projected in a single vectorized pass before drawing.
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the projectiles
+        pool (ProjectilePool): The projectile pool containing the projectile positions
+        player (tuple): The player's position in 3D space
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+    Returns:
+        None
+    """
+    active = pool.flying()
+    if len(active) == 0:
+        return
+
+    circles(surface, project_projectiles(pool.position[active], pool.owner[active], player, view))
+
+
+def project_projectiles(
+    positions: np.ndarray,
+    owners: np.ndarray,
+    player: tuple[float, float, float],
+    view: Viewport | None = None) -> list[tuple[tuple[int, int, int], list[float], float]]:
+    """
+    Project projectiles onto the canvas as circles
 
     Args:
-        surface (pygame.Surface): The surface on which to draw the torpedoes
-        torpedos (Torpedos): The torpedos object containing the torpedo positions and launch position
+        positions (np.ndarray): (N, 3) array of projectile positions
+        owners (np.ndarray): The owner of each projectile, which picks its colour
         player (tuple): The player's position in 3D space
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+    Returns:
+        list: (colour, centre, radius) of each projectile
+    """
+    if len(positions) == 0:
+        return []
+
+    edges = positions.copy()
+    edges[:, 0] -= cfg.TORPEDO_RADIUS
+    centres_p = utils.project_array(positions, player, view)
+    radii = centres_p[:, 0] - utils.project_array(edges, player, view)[:, 0]
+    return [
+        (cfg.PROJECTILE_COLOURS[owner], centre, radius)
+        for centre, radius, owner in zip(centres_p.tolist(), radii.tolist(), owners.tolist())
+    ]
+
+
+def circles(surface: pygame.Surface, projected: list[tuple[tuple[int, int, int], list[float], float]]) -> None:
+    """
+    Draw projected projectiles
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the projectiles
+        projected (list): (colour, centre, radius) of each projectile, from project_projectiles
+
+    Returns:
+        None
+    """
+    for colour, centre, radius in projected:
+        pygame.draw.circle(surface, colour, centre, radius, cfg.LINE_WIDTH)
+
+
+_ghost_overlay: pygame.Surface | None = None
+
+
+def ghosts(surface: pygame.Surface, lines: np.ndarray, segments: SegmentBatch | None = None) -> None:
+    """
+    Draw the outlines of the ghosts, translucently
+
+    The lines are drawn onto an overlay, which is blended onto the surface in a single blit of
+    just the area they cover.
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the ghosts
+        lines (np.ndarray): (N, 4) canvas coordinates of the start and end of each line, from GhostSet.project
+        segments (SegmentBatch, optional): If given, the lines are rasterized in bulk through it
 
     Returns:
         None
     """
-    if torpedos.impact:
+    global _ghost_overlay
+    if len(lines) == 0:
+        return
+    if _ghost_overlay is None or _ghost_overlay.get_size() != surface.get_size():
+        _ghost_overlay = pygame.Surface(surface.get_size()).convert()
+        _ghost_overlay.set_colorkey((0, 0, 0))
+        _ghost_overlay.set_alpha(cfg.GHOST_ALPHA)
+
+    width, height = surface.get_size()
+    left, top = np.clip(lines.reshape(-1, 2).min(axis=0) - cfg.LINE_WIDTH, 0, (width, height)).astype(int)
+    right, bottom = np.clip(lines.reshape(-1, 2).max(axis=0) + cfg.LINE_WIDTH + 1, 0, (width, height)).astype(int)
+    area = pygame.Rect(left, top, right - left, bottom - top)
+    if not area:
         return
 
-    for torpedo in (torpedos.l_torpedo, torpedos.r_torpedo):
-        centre = utils.project((torpedo[0], abs(torpedo[1]), torpedo[2]), player)
-        edge = utils.project((torpedo[0] - cfg.TORPEDO_RADIUS, abs(torpedo[1]), torpedo[2]), player)
-        radius = centre[0] - edge[0]
-        pygame.draw.circle(surface, cfg.TORPEDO_COLOUR, centre, radius, cfg.LINE_WIDTH)
+    _ghost_overlay.fill((0, 0, 0), area)
+    if segments is None:
+        for x0, y0, x1, y1 in lines.tolist():
+            pygame.draw.line(_ghost_overlay, cfg.GHOST_COLOUR, (x0, y0), (x1, y1), cfg.LINE_WIDTH)
+    else:
+        segments.clear()
+        segments.extend(cfg.GHOST_COLOUR, lines)
+        raster.draw_segments(_ghost_overlay, segments)
+        segments.clear()
+    surface.blit(_ghost_overlay, area, area)
+
+
+def geometry(surface: pygame.Surface, frame: PreparedFrame) -> None:
+    """
+    Draw the geometry of a frame prepared by the pipeline
+
+    Args:
+        surface (pygame.Surface): The surface on which to draw the geometry
+        frame (PreparedFrame): The projected lines and projectiles
+
+    Returns:
+        None
+    """
+    for colour, start, end in frame.segments.segments():
+        pygame.draw.line(surface, colour, start, end, cfg.LINE_WIDTH)
+    circles(surface, frame.circles)
 
 
 def distance(surface: pygame.Surface, distance: int) -> None:
@@ -394,7 +597,7 @@ def distance(surface: pygame.Surface, distance: int) -> None:
     """
     if distance > 0:
         distance_str = f"{distance:04d}m"
-        text_centre(surface, distance_str, cfg.CANVAS_HEIGHT - 16, 34, cfg.DISTANCE_COLOUR)
+        text_centre(surface, distance_str, surface.get_height() - 16, 34, cfg.DISTANCE_COLOUR)
 
 
 def particles(surface: pygame.Surface, particles: list[list[float, float]]) -> None:
@@ -418,6 +621,7 @@ def debug(surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
     Returns:
         None
     """
-    text_right(surface, f"X: {pos[0]:.1f}", (cfg.CANVAS_WIDTH - 16, 14), 16, "White")
-    text_right(surface, f"Y: {pos[1]:.1f}", (cfg.CANVAS_WIDTH - 16, 28), 16, "White")
-    text_right(surface, f"Z: {pos[2]:.1f}", (cfg.CANVAS_WIDTH - 16, 42), 16, "White")
+    right = surface.get_width() - 16
+    text_right(surface, f"X: {pos[0]:.1f}", (right, 14), 16, "White")
+    text_right(surface, f"Y: {pos[1]:.1f}", (right, 28), 16, "White")
+    text_right(surface, f"Z: {pos[2]:.1f}", (right, 42), 16, "White")
@@ -0,0 +1,403 @@
+"""
+Renderer backends that the screens draw through.
+
+A renderer draws each element of the game (trench, barriers, exhaust port, torpedoes, HUD,
+text, particles). The screens only ever talk to the active renderer, so the drawing strategy
+can be swapped at startup, e.g. to benchmark the simulation without drawing anything.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    import numpy as np
+    from geometry import Viewport
+    from grid import Barrier
+    from pipeline import PreparedFrame
+    from projectiles import ProjectilePool
+    from screens import MainMenuScreen
+    from starfield import Starfield
+import pygame
+import raster
+import render
+
+
+class Renderer(Protocol):
+
+    """Interface that every rendering backend implements."""
+
+    def begin_frame(self, surface: pygame.Surface) -> None:
+        """Prepare the surface for a new frame."""
+
+    def end_frame(self, surface: pygame.Surface) -> None:
+        """Finish drawing the frame, before it is presented."""
+
+    def stars(self, stars: Starfield, surface: pygame.Surface, horizon: int | None = None, view: Viewport | None = None) -> None:
+        """Draw the starfield."""
+
+    def deathstar(self, surface: pygame.Surface, fill_colour: tuple[int, int, int] | str | None = None) -> None:
+        """Draw the Death Star."""
+
+    def intro_text(self, screen: MainMenuScreen, surface: pygame.Surface) -> None:
+        """Draw the text of the main menu."""
+
+    def message(self, surface: pygame.Surface, msg: str) -> None:
+        """Draw a status message."""
+
+    def text_centre(self, surface: pygame.Surface, text: str, y: int, size: int, colour: str) -> None:
+        """Draw text centred horizontally."""
+
+    def text_right(self, surface: pygame.Surface, text: str, coords: tuple[int, int], size: int, colour: str) -> None:
+        """Draw text right aligned."""
+
+    def death(self, surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
+        """Draw the death sequence."""
+
+    def trench(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Draw the trench."""
+
+    def greebles(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Draw the detail panels along the trench walls and floor."""
+
+    def barriers(
+        self,
+        surface: pygame.Surface,
+        barriers: list[Barrier],
+        current_barrier_index: int,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Draw the visible barriers."""
+
+    def exhaust_port(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Draw the exhaust port."""
+
+    def torpedoes(
+        self,
+        surface: pygame.Surface,
+        pool: ProjectilePool,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Draw the projectiles in flight."""
+
+    def geometry(self, surface: pygame.Surface, frame: PreparedFrame) -> None:
+        """Draw the trench, barriers, exhaust port and projectiles prepared by the pipeline."""
+
+    def ghosts(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Draw the projected outlines of the ghosts, translucently."""
+
+    def distance(self, surface: pygame.Surface, distance: int) -> None:
+        """Draw the distance to the exhaust port HUD."""
+
+    def debug(self, surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+        """Draw the debug HUD."""
+
+    def particles(self, surface: pygame.Surface, particles: list[list[float]]) -> None:
+        """Draw the explosion particles."""
+
+
+class PygameRenderer:
+
+    """Draws everything immediately with pygame.draw, using the functions in render."""
+
+    def begin_frame(self, surface: pygame.Surface) -> None:
+        """Clear the surface to black."""
+        surface.fill((0, 0, 0))
+
+    def end_frame(self, surface: pygame.Surface) -> None:
+        """Nothing is batched, so there is nothing left to draw."""
+
+    def stars(self, stars: Starfield, surface: pygame.Surface, horizon: int | None = None, view: Viewport | None = None) -> None:
+        """Draw the starfield."""
+        render.stars(stars, surface, horizon, view)
+
+    def deathstar(self, surface: pygame.Surface, fill_colour: tuple[int, int, int] | str | None = None) -> None:
+        """Draw the Death Star."""
+        render.deathstar(surface, fill_colour)
+
+    def intro_text(self, screen: MainMenuScreen, surface: pygame.Surface) -> None:
+        """Draw the text of the main menu."""
+        render.intro_text(screen, surface)
+
+    def message(self, surface: pygame.Surface, msg: str) -> None:
+        """Draw a status message."""
+        render.message(surface, msg)
+
+    def text_centre(self, surface: pygame.Surface, text: str, y: int, size: int, colour: str) -> None:
+        """Draw text centred horizontally."""
+        render.text_centre(surface, text, y, size, colour)
+
+    def text_right(self, surface: pygame.Surface, text: str, coords: tuple[int, int], size: int, colour: str) -> None:
+        """Draw text right aligned."""
+        render.text_right(surface, text, coords, size, colour)
+
+    def death(self, surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
+        """Draw the death sequence."""
+        render.death(surface, dead, violent_death)
+
+    def trench(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Draw the trench."""
+        render.trench(surface, pos, view=view)
+
+    def greebles(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Draw the detail panels along the trench walls and floor."""
+        render.greebles(surface, lines)
+
+    def barriers(
+        self,
+        surface: pygame.Surface,
+        barriers: list[Barrier],
+        current_barrier_index: int,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Draw the visible barriers."""
+        render.barriers(surface, barriers, current_barrier_index, pos, view=view)
+
+    def exhaust_port(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Draw the exhaust port."""
+        render.exhaust_port(surface, pos, view=view)
+
+    def torpedoes(
+        self,
+        surface: pygame.Surface,
+        pool: ProjectilePool,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Draw the projectiles in flight."""
+        render.torpedoes(surface, pool, pos, view)
+
+    def geometry(self, surface: pygame.Surface, frame: PreparedFrame) -> None:
+        """Draw the trench, barriers, exhaust port and projectiles prepared by the pipeline."""
+        render.geometry(surface, frame)
+
+    def ghosts(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Draw the projected outlines of the ghosts, translucently."""
+        render.ghosts(surface, lines)
+
+    def distance(self, surface: pygame.Surface, distance: int) -> None:
+        """Draw the distance to the exhaust port HUD."""
+        render.distance(surface, distance)
+
+    def debug(self, surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+        """Draw the debug HUD."""
+        render.debug(surface, pos)
+
+    def particles(self, surface: pygame.Surface, particles: list[list[float]]) -> None:
+        """Draw the explosion particles."""
+        render.particles(surface, particles)
+
+
+class SurfarrayRenderer(PygameRenderer):
+
+    """
+    Batches the wireframe lines of the trench, barriers and exhaust port, and rasterizes them in bulk.
+
+    Everything else is still drawn immediately, so the pending lines are flushed before any other
+    element is drawn to keep the painter's order of the pygame renderer.
+    """
+
+    def __init__(self) -> None:
+        """Create the renderer with an empty batch of segments."""
+        self.segments = raster.SegmentBatch()
+
+    def flush(self, surface: pygame.Surface) -> None:
+        """Rasterize and clear the pending segments."""
+        if len(self.segments):
+            raster.draw_segments(surface, self.segments)
+            self.segments.clear()
+
+    def begin_frame(self, surface: pygame.Surface) -> None:
+        """Clear the surface to black and drop any segments left from the last frame."""
+        self.segments.clear()
+        surface.fill((0, 0, 0))
+
+    def end_frame(self, surface: pygame.Surface) -> None:
+        """Draw any segments still pending."""
+        self.flush(surface)
+
+    def trench(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Add the lines of the trench to the batch."""
+        render.trench(surface, pos, self.segments, view)
+
+    def greebles(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Add the lines of the detail panels to the batch."""
+        render.greebles(surface, lines, self.segments)
+
+    def barriers(
+        self,
+        surface: pygame.Surface,
+        barriers: list[Barrier],
+        current_barrier_index: int,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Add the lines of the visible barriers to the batch."""
+        render.barriers(surface, barriers, current_barrier_index, pos, self.segments, view)
+
+    def exhaust_port(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Add the lines of the exhaust port to the batch."""
+        render.exhaust_port(surface, pos, self.segments, view)
+
+    def stars(self, stars: Starfield, surface: pygame.Surface, horizon: int | None = None, view: Viewport | None = None) -> None:
+        """Draw the starfield."""
+        self.flush(surface)
+        render.stars(stars, surface, horizon, view)
+
+    def deathstar(self, surface: pygame.Surface, fill_colour: tuple[int, int, int] | str | None = None) -> None:
+        """Draw the Death Star."""
+        self.flush(surface)
+        render.deathstar(surface, fill_colour)
+
+    def intro_text(self, screen: MainMenuScreen, surface: pygame.Surface) -> None:
+        """Draw the text of the main menu."""
+        self.flush(surface)
+        render.intro_text(screen, surface)
+
+    def message(self, surface: pygame.Surface, msg: str) -> None:
+        """Draw a status message."""
+        self.flush(surface)
+        render.message(surface, msg)
+
+    def text_centre(self, surface: pygame.Surface, text: str, y: int, size: int, colour: str) -> None:
+        """Draw text centred horizontally."""
+        self.flush(surface)
+        render.text_centre(surface, text, y, size, colour)
+
+    def text_right(self, surface: pygame.Surface, text: str, coords: tuple[int, int], size: int, colour: str) -> None:
+        """Draw text right aligned."""
+        self.flush(surface)
+        render.text_right(surface, text, coords, size, colour)
+
+    def death(self, surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
+        """Draw the death sequence."""
+        self.flush(surface)
+        render.death(surface, dead, violent_death)
+
+    def torpedoes(
+        self,
+        surface: pygame.Surface,
+        pool: ProjectilePool,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Draw the projectiles in flight."""
+        self.flush(surface)
+        render.torpedoes(surface, pool, pos, view)
+
+    def geometry(self, surface: pygame.Surface, frame: PreparedFrame) -> None:
+        """Rasterize the lines prepared by the pipeline in bulk, then draw the projectiles."""
+        self.flush(surface)
+        raster.draw_segments(surface, frame.segments)
+        render.circles(surface, frame.circles)
+
+    def ghosts(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Rasterize the projected outlines of the ghosts in bulk, and blend them in."""
+        self.flush(surface)
+        render.ghosts(surface, lines, self.segments)
+
+    def distance(self, surface: pygame.Surface, distance: int) -> None:
+        """Draw the distance to the exhaust port HUD."""
+        self.flush(surface)
+        render.distance(surface, distance)
+
+    def debug(self, surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+        """Draw the debug HUD."""
+        self.flush(surface)
+        render.debug(surface, pos)
+
+    def particles(self, surface: pygame.Surface, particles: list[list[float]]) -> None:
+        """Draw the explosion particles."""
+        self.flush(surface)
+        render.particles(surface, particles)
+
+
+class NullRenderer:
+
+    """Draws nothing, for headless runs and benchmarking the simulation on its own."""
+
+    def begin_frame(self, surface: pygame.Surface) -> None:
+        """Do nothing."""
+
+    def end_frame(self, surface: pygame.Surface) -> None:
+        """Do nothing."""
+
+    def stars(self, stars: Starfield, surface: pygame.Surface, horizon: int | None = None, view: Viewport | None = None) -> None:
+        """Do nothing."""
+
+    def deathstar(self, surface: pygame.Surface, fill_colour: tuple[int, int, int] | str | None = None) -> None:
+        """Do nothing."""
+
+    def intro_text(self, screen: MainMenuScreen, surface: pygame.Surface) -> None:
+        """Do nothing."""
+
+    def message(self, surface: pygame.Surface, msg: str) -> None:
+        """Do nothing."""
+
+    def text_centre(self, surface: pygame.Surface, text: str, y: int, size: int, colour: str) -> None:
+        """Do nothing."""
+
+    def text_right(self, surface: pygame.Surface, text: str, coords: tuple[int, int], size: int, colour: str) -> None:
+        """Do nothing."""
+
+    def death(self, surface: pygame.Surface, dead: bool, violent_death: bool) -> None:
+        """Do nothing."""
+
+    def trench(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Do nothing."""
+
+    def greebles(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Do nothing."""
+
+    def barriers(
+        self,
+        surface: pygame.Surface,
+        barriers: list[Barrier],
+        current_barrier_index: int,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Do nothing."""
+
+    def exhaust_port(self, surface: pygame.Surface, pos: tuple[float, float, float], view: Viewport | None = None) -> None:
+        """Do nothing."""
+
+    def torpedoes(
+        self,
+        surface: pygame.Surface,
+        pool: ProjectilePool,
+        pos: tuple[float, float, float],
+        view: Viewport | None = None) -> None:
+        """Do nothing."""
+
+    def geometry(self, surface: pygame.Surface, frame: PreparedFrame) -> None:
+        """Do nothing."""
+
+    def ghosts(self, surface: pygame.Surface, lines: np.ndarray) -> None:
+        """Do nothing."""
+
+    def distance(self, surface: pygame.Surface, distance: int) -> None:
+        """Do nothing."""
+
+    def debug(self, surface: pygame.Surface, pos: tuple[float, float, float]) -> None:
+        """Do nothing."""
+
+    def particles(self, surface: pygame.Surface, particles: list[list[float]]) -> None:
+        """Do nothing."""
+
+
+RENDERERS: dict[str, type[Renderer]] = {
+    "pygame": PygameRenderer,
+    "surfarray": SurfarrayRenderer,
+    "null": NullRenderer,
+}
+
+
+def create_renderer(name: str) -> Renderer:
+    """
+    Create the named renderer backend
+
+    Args:
+        name (str): One of the keys of RENDERERS
+
+    Returns:
+        Renderer: The renderer
+    """
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {name}")
+    return RENDERERS[name]()
@@ -0,0 +1,308 @@
+"""
+Compact per-tick snapshots of the simulation state, kept in a rewind ring buffer.
+
+Each tick of a run packs the whole simulation state (the ship, the torpedoes, the barrier
+index, the death and bullseye flags and the message on screen) into a fixed layout STATE
+record of 90 bytes. The barriers are not stored, they are rebuilt from the seed they were
+created from, which every record carries, and the barrier grid sizes, which a dump records
+in its header. The last REWIND_SECONDS of records are kept in a preallocated ring buffer,
+which is what practice mode rewinds through, what is dumped when the game crashes, and
+what --resume starts a run from.
+
+Positions across the trench, velocities and projectile state are stored as 32 bit floats,
+so a restored run matches the original to within float32 precision rather than exactly.
+"""
+from __future__ import annotations
+
+import logging
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from screens import GameplayScreen
+import config as cfg
+import grid
+import projectiles
+
+TORPEDO_SLOTS = 2
+
+# tick, barrier seed, ship position (x, y, z), velocity, acceleration, movement factor, barrier index,
+# flags, message, message timer, then for each torpedo its position, remaining range, state and impact kind
+STATE = struct.Struct("<II ffd fff ff f H B B H" + " fff f b b" * TORPEDO_SLOTS)
+
+# Dump file header: magic, version, record size, barrier grids, record count, length of the message table
+HEADER = struct.Struct("<4s H H I I I")
+MAGIC = b"TRRW"
+VERSION = 2
+
+# Flag bits
+SCREEN_DEAD = 1
+SCREEN_BULLSEYE = 2
+SHIP_DEAD = 4
+SHIP_TORPEDOS_LAUNCHED = 8
+SHIP_REACHED_LAUNCH_ZONE = 16
+TORPEDOS_LAUNCHED = 32
+TORPEDOS_IMPACT = 64
+TORPEDOS_BULLSEYE = 128
+
+MAX_MESSAGES = 256  # Messages are stored by their index in the buffer's message table, in one byte
+
+
+def seed_of(record: bytes | memoryview) -> int:
+    """Return the barrier seed of the run a record was taken from."""
+    return STATE.unpack_from(record)[1]
+
+
+def tick_of(record: bytes | memoryview) -> int:
+    """Return the tick a record was taken at."""
+    return STATE.unpack_from(record)[0]
+
+
+class RewindBuffer:
+
+    """Ring buffer of the last REWIND_SECONDS of state records of a run."""
+
+    def __init__(self, seconds: float = cfg.REWIND_SECONDS, fps: int = cfg.FPS) -> None:
+        """
+        Preallocate the ring buffer
+
+        Args:
+            seconds (float): How much of the run to keep
+            fps (int): Ticks per second
+        """
+        self.capacity = max(1, int(seconds * fps))
+        self.buffer = bytearray(self.capacity * STATE.size)
+        self.next: int = 0
+        self.count: int = 0
+        self.messages: list[str] = []
+        self._message_ids: dict[str, int] = {}
+        self.grids: int = grid.configuration(cfg.BARRIER_GRIDS)  # The barrier grid sizes the records were taken with
+
+    def __repr__(self) -> str:
+        """Return a string representation of the buffer."""
+        return f"RewindBuffer({self.count}/{self.capacity} ticks, {STATE.size} bytes each)"
+
+    def __len__(self) -> int:
+        """Return the number of records held."""
+        return self.count
+
+    def _message_id(self, text: str) -> int:
+        """Look up, or add, the index of a message in the message table."""
+        message_id = self._message_ids.get(text)
+        if message_id is None:
+            if len(self.messages) >= MAX_MESSAGES:
+                return 0
+            message_id = self._message_ids[text] = len(self.messages)
+            self.messages.append(text)
+        return message_id
+
+    def record(self, screen: GameplayScreen) -> None:
+        """
+        Pack the current simulation state into the next slot of the ring, overwriting the oldest
+
+        Args:
+            screen (GameplayScreen): The run to record
+        """
+        ship = screen.ship
+        torpedos = screen.torpedos
+        pool = screen.projectiles
+        flags = (
+            SCREEN_DEAD * screen.dead
+            | SCREEN_BULLSEYE * screen.bullseye
+            | SHIP_DEAD * ship.dead
+            | SHIP_TORPEDOS_LAUNCHED * ship.torpedos_launched
+            | SHIP_REACHED_LAUNCH_ZONE * ship.reached_launch_zone
+            | TORPEDOS_LAUNCHED * torpedos.launched
+            | TORPEDOS_IMPACT * torpedos.impact
+            | TORPEDOS_BULLSEYE * torpedos.bullseye
+        )
+        torpedoes = []
+        for i in range(TORPEDO_SLOTS):
+            if i < len(torpedos.slots):
+                slot = torpedos.slots[i]
+                position = pool.position[slot]
+                torpedoes += (
+                    position[0], position[1], position[2], pool.lifetime[slot], pool.state[slot], pool.impact_kind[slot]
+                )
+            else:
+                torpedoes += (0.0, 0.0, 0.0, 0.0, projectiles.STATE_FREE, 0)
+
+        STATE.pack_into(
+            self.buffer,
+            self.next * STATE.size,
+            screen.tick,
+            screen.seed,
+            *ship.position,
+            *ship.velocity,
+            *ship.acceleration,
+            ship.movement_factor,
+            screen.current_barrier_index,
+            flags,
+            self._message_id(screen.message["text"]),
+            max(0, min(screen.message["timer"], 0xFFFF)),
+            *torpedoes,
+        )
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def get(self, back: int = 0) -> memoryview:
+        """
+        Return a record from the ring
+
+        Args:
+            back (int): How many ticks back from the latest record, 0 is the latest
+
+        Returns:
+            memoryview: The record, only valid until the ring moves on
+        """
+        if not 0 <= back < self.count:
+            raise IndexError(f"Only {self.count} ticks are held, cannot go back {back}")
+        slot = (self.next - 1 - back) % self.capacity
+        return memoryview(self.buffer)[slot * STATE.size:(slot + 1) * STATE.size]
+
+    def find(self, tick: int) -> int:
+        """
+        Find how far back the record of a tick is
+
+        Args:
+            tick (int): The tick to find
+
+        Returns:
+            int: The number of ticks back from the latest, for get()
+        """
+        back = tick_of(self.get()) - tick
+        if not 0 <= back < self.count or tick_of(self.get(back)) != tick:
+            raise IndexError(f"Tick {tick} is not held")
+        return back
+
+    def restore(self, screen: GameplayScreen, back: int = 0) -> int:
+        """
+        Put a run back into a recorded state, forgetting every record after it
+
+        Args:
+            screen (GameplayScreen): The run to restore, its barriers must be built from the record's seed
+            back (int): How many ticks back from the latest record to restore
+
+        Returns:
+            int: The tick that was restored
+
+        Raises:
+            ValueError: If the record is from a run with different barriers
+        """
+        back = max(0, min(back, self.count - 1))
+        record = self.get(back)
+        (
+            tick, seed, x, y, z, vx, vy, vz, ax, ay, movement_factor,
+            barrier_index, flags, message_id, message_timer, *torpedoes,
+        ) = STATE.unpack_from(record)
+        if seed != screen.seed:
+            raise ValueError(f"Record is from the run with barrier seed {seed}, not {screen.seed}")
+        if self.grids != grid.configuration(cfg.BARRIER_GRIDS):
+            raise ValueError(f"Record is from a run with other barrier grid sizes than {cfg.BARRIER_GRIDS}, see --barrier-grid")
+
+        ship = screen.ship
+        ship.position[:] = (x, y, z)
+        ship.velocity[:] = (vx, vy, vz)
+        ship.acceleration[:] = (ax, ay)
+        ship.movement_factor = movement_factor
+        ship.dead = bool(flags & SHIP_DEAD)
+        ship.torpedos_launched = bool(flags & SHIP_TORPEDOS_LAUNCHED)
+        ship.reached_launch_zone = bool(flags & SHIP_REACHED_LAUNCH_ZONE)
+
+        torpedos = screen.torpedos
+        torpedos.launched = bool(flags & TORPEDOS_LAUNCHED)
+        torpedos.impact = bool(flags & TORPEDOS_IMPACT)
+        torpedos.bullseye = bool(flags & TORPEDOS_BULLSEYE)
+        if not torpedos.impact:
+            torpedos.impact_position = None
+
+        # The torpedoes go back into the first slots of the pool, in the order they were fired in
+        pool = screen.projectiles
+        pool.clear()
+        if torpedos.launched:
+            for slot in range(TORPEDO_SLOTS):
+                tx, ty, tz, lifetime, state, impact_kind = torpedoes[slot * 6:slot * 6 + 6]
+                pool.position[slot] = (tx, ty, tz)
+                pool.velocity[slot] = (0.0, 0.0, torpedos.velocity)
+                pool.lifetime[slot] = lifetime
+                pool.owner[slot] = projectiles.OWNER_PLAYER
+                pool.state[slot] = state
+                pool.impact_kind[slot] = impact_kind
+                pool.impacted[slot] = state == projectiles.STATE_IMPACT
+            pool._next_free = TORPEDO_SLOTS
+            torpedos.slots = tuple(range(TORPEDO_SLOTS))
+        else:
+            torpedos.slots = ()
+
+        screen.tick = tick
+        screen.current_barrier_index = barrier_index
+        screen.dead = bool(flags & SCREEN_DEAD)
+        screen.bullseye = bool(flags & SCREEN_BULLSEYE)
+        screen.message = {"text": self.messages[message_id] if message_id < len(self.messages) else "", "timer": message_timer}
+
+        # A crash stops the engine hum, going back to before it brings it back
+        if screen.dead:
+            screen.game.audio.stop_hum(screen)
+        else:
+            screen.game.audio.start_hum(screen)
+
+        self.next = (self.next - back) % self.capacity
+        self.count -= back
+        return tick
+
+    def dump(self, path: str | Path) -> None:
+        """
+        Write the records held, oldest first, with the message table
+
+        Args:
+            path (str): The file to write
+        """
+        messages = "\0".join(self.messages).encode()
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, STATE.size, self.grids, self.count, len(messages)))
+            file.writelines(self.get(back) for back in range(self.count - 1, -1, -1))
+            file.write(messages)
+
+    @classmethod
+    def load(cls, path: str | Path) -> RewindBuffer:
+        """
+        Read a dump written by dump()
+
+        Args:
+            path (str): The dump file
+
+        Returns:
+            RewindBuffer: A buffer holding the dumped records, with room for REWIND_SECONDS beyond them
+
+        Raises:
+            ValueError: If the file is not a dump, is from an incompatible version, or holds no whole record
+        """
+        data = Path(path).read_bytes()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a version {VERSION} state dump")
+        magic, version, size, grids, count, messages_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or size != STATE.size:
+            raise ValueError(f"{path} is not a version {VERSION} state dump")
+
+        # A dump cut short, such as by a crash while writing it, keeps the whole records it got to,
+        # the message table that comes after them is lost
+        present = (len(data) - HEADER.size) // STATE.size
+        if present < count:
+            logging.warning(f"{path} is cut short, only {present} of its {count} records are whole")
+            count = present
+            messages_length = 0
+        if count == 0:
+            raise ValueError(f"{path} holds no whole records")
+
+        buffer = cls(seconds=count / cfg.FPS + cfg.REWIND_SECONDS)
+        buffer.grids = grids
+        start = HEADER.size
+        end = start + count * STATE.size
+        buffer.buffer[:end - start] = data[start:end]
+        buffer.next = count % buffer.capacity
+        buffer.count = count
+        messages = data[end:end + messages_length].decode(errors="replace")
+        buffer.messages = messages.split("\0") if messages_length else []
+        buffer._message_ids = {text: i for i, text in enumerate(buffer.messages)}
+        return buffer
@@ -0,0 +1,297 @@
+"""
+Append-only binary log of every trench run, and a memory-mapped reader for long-term stats.
+
+Each run that ends is appended to RUN_LOG_FILE as one fixed size RECORD: where and how it ended,
+the barrier and block it hit, how far the torpedoes landed from the exhaust port and a summary
+of its frame times. Records are written by a background thread, so the frame loop only packs a
+record and queues it. The file starts with a HEADER and is only ever appended to, so a record cut
+short by a crash or power loss is simply ignored by the reader.
+
+The reader maps the file with numpy and aggregates it a chunk at a time, so millions of records
+take seconds and never become Python objects. It also reads logs of earlier versions, which the
+writer moves aside rather than appending to. Run it as a script for a summary of a log:
+
+    python trenchrun/runlog.py runs.bin
+"""
+import argparse
+import logging
+import queue
+import struct
+import threading
+from pathlib import Path
+
+import config as cfg
+import numpy as np
+
+HEADER = struct.Struct("<4s H H 8x")
+MAGIC = b"TRRL"
+VERSION = 2
+
+RECORD = np.dtype([
+    ("time", "<f8"),  # Unix time the run ended
+    ("seed", "<u4"),  # Barrier seed
+    ("ticks", "<u4"),  # Simulation steps the run lasted
+    ("x", "<f4"),  # Where the ship was when the run ended
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("bullseye_offset", "<f4"),  # Distance of the torpedo impact from the centre of the exhaust port, NaN if none
+    ("frame_p50", "<f4"),  # Frame times during the run, in milliseconds
+    ("frame_p95", "<f4"),
+    ("frame_p99", "<f4"),
+    ("frame_max", "<f4"),
+    ("barrier_index", "<u2"),
+    ("outcome", "u1"),
+    ("grid", "u1"),  # Rows and columns of blocks of the barrier that was hit, 0 if none
+    ("collision_cell", "<i2"),  # Block of the barrier that was hit, row by row from the top left, -1 if none
+    ("flags", "u1"),
+    ("preset", "u1"),  # Index into QUALITY_PRESETS
+])
+
+# Version 1 records, from before barriers had grids other than 3x3
+RECORD_V1 = np.dtype([
+    *((name, RECORD.fields[name][0]) for name in RECORD.names[:11]),
+    ("barrier_index", "<u2"),
+    ("outcome", "u1"),
+    ("collision_cell", "i1"),
+    ("flags", "u1"),
+    ("preset", "u1"),
+    ("reserved", "<u2"),
+])
+RECORDS = {1: RECORD_V1, VERSION: RECORD}
+
+# Outcomes
+OUTCOME_ABANDONED = 0
+OUTCOME_CRASHED = 1
+OUTCOME_WON = 2
+OUTCOMES = ("abandoned", "crashed", "won")
+
+# Flags
+FLAG_TORPEDOS_LAUNCHED = 1
+FLAG_BULLSEYE = 2
+FLAG_PRACTICE = 4
+FLAG_RESUMED = 8
+
+CHUNK_RECORDS = 1 << 20
+
+
+class RunLog:
+
+    """Appends run records to the log on a background thread."""
+
+    def __init__(self, path: str | None = cfg.RUN_LOG_FILE) -> None:
+        """
+        Open the log, creating it if it doesn't exist
+
+        Args:
+            path (str): The log file, None to not log runs
+        """
+        self.path = Path(path) if path else None
+        self.written: int = 0
+        self._queue: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        self._worker: threading.Thread | None = None
+        if self.path is None:
+            return
+
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, "rb") as file:
+                magic, version, size = HEADER.unpack(file.read(HEADER.size))
+            if magic == MAGIC and version < VERSION:
+                # Start a new log, the old one can still be read where it is moved to
+                old = self.path.with_name(f"{self.path.stem}.v{version}{self.path.suffix}")
+                self.path.rename(old)
+                logging.warning(f"Moved the version {version} run log {self.path} to {old}")
+            elif magic != MAGIC or version != VERSION or size != RECORD.itemsize:
+                logging.error(f"{self.path} is not a version {VERSION} run log, runs will not be logged")
+                self.path = None
+                return
+
+        self._worker = threading.Thread(target=self._run, name="run-log", daemon=True)
+        self._worker.start()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the log."""
+        return f"RunLog({self.path}, written={self.written})"
+
+    def append(self, **fields: float) -> None:
+        """
+        Queue a run to be written, fields that are not given are zero
+
+        Args:
+            fields: Values of the RECORD fields
+        """
+        if self._worker is None:
+            return
+        record = np.zeros(1, dtype=RECORD)
+        for name, value in fields.items():
+            record[name] = value
+        self._queue.put(record.tobytes())
+
+    def close(self) -> None:
+        """Write any queued runs and stop the worker."""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def _run(self) -> None:
+        """Worker thread, append each queued record and flush it."""
+        with open(self.path, "ab") as file:
+            if file.tell() == 0:
+                file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize))
+            # A record cut short by a crash would misalign everything after it, so pad it out
+            partial = (file.tell() - HEADER.size) % RECORD.itemsize
+            if partial:
+                file.write(bytes(RECORD.itemsize - partial))
+            while (data := self._queue.get()) is not None:
+                file.write(data)
+                file.flush()
+                self.written += 1
+
+
+def open_log(path: str | Path) -> np.ndarray:
+    """
+    Memory-map a run log
+
+    Args:
+        path (str): The log file
+
+    Returns:
+        np.ndarray: The records, read from disk as they are used
+
+    Raises:
+        ValueError: If the file is not a run log, or of an unknown version
+    """
+    path = Path(path)
+    with open(path, "rb") as file:
+        magic, version, size = HEADER.unpack(file.read(HEADER.size))
+    record = RECORDS.get(version)
+    if magic != MAGIC or record is None or size != record.itemsize:
+        raise ValueError(f"{path} is not a run log of versions {', '.join(map(str, RECORDS))}")
+
+    count = (path.stat().st_size - HEADER.size) // record.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=record)
+    return np.memmap(path, dtype=record, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def death_heatmap(records: np.ndarray) -> np.ndarray:
+    """
+    Count the crashes into each block of each barrier
+
+    Block numbers only mean something together with the grid they are from, so crashes are
+    binned by barrier, grid size and block. Version 1 records are all from 3x3 barriers.
+
+    Args:
+        records (np.ndarray): Run records, such as a mapped log
+
+    Returns:
+        np.ndarray: (barriers, BARRIER_MAX_GRID, BARRIER_MAX_GRID ** 2) crash counts, by barrier index,
+            grid size less one and block
+    """
+    blocks = cfg.BARRIER_MAX_GRID ** 2
+    per_barrier = cfg.BARRIER_MAX_GRID * blocks
+    barriers = 0
+    counts = np.zeros(0, dtype=np.int64)
+    for start in range(0, len(records), CHUNK_RECORDS):
+        chunk = records[start:start + CHUNK_RECORDS]
+        grids = chunk["grid"] if "grid" in chunk.dtype.names else np.full(len(chunk), 3, dtype=np.uint8)
+        crashed = (chunk["outcome"] == OUTCOME_CRASHED) & (chunk["collision_cell"] >= 0) & (grids >= 1)
+        cells = (
+            chunk["barrier_index"][crashed].astype(np.int64) * per_barrier
+            + (grids[crashed].astype(np.int64) - 1) * blocks
+            + chunk["collision_cell"][crashed]
+        )
+        if not len(cells):
+            continue
+        barriers = max(barriers, int(cells.max()) // per_barrier + 1)
+        chunk_counts = np.bincount(cells, minlength=barriers * per_barrier)
+        counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+        counts += chunk_counts
+    return counts.reshape(-1, cfg.BARRIER_MAX_GRID, blocks)
+
+
+def win_rate_over_time(records: np.ndarray, period: float = 86400.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Work out the fraction of runs won in each period
+
+    Args:
+        records (np.ndarray): Run records, such as a mapped log
+        period (float): Length of each period in seconds, a day by default
+
+    Returns:
+        tuple: The start time of each period, the runs in it and the fraction of them won
+    """
+    if not len(records):
+        empty = np.zeros(0)
+        return empty, empty, empty
+
+    first = float(records["time"].min())
+    runs = np.zeros(0, dtype=np.int64)
+    wins = np.zeros(0, dtype=np.int64)
+    for start in range(0, len(records), CHUNK_RECORDS):
+        chunk = records[start:start + CHUNK_RECORDS]
+        periods = ((chunk["time"] - first) // period).astype(np.int64)
+        size = max(len(runs), int(periods.max()) + 1)
+        runs = np.pad(runs, (0, size - len(runs))) + np.bincount(periods, minlength=size)
+        wins = np.pad(wins, (0, size - len(wins))) + np.bincount(periods, weights=chunk["outcome"] == OUTCOME_WON, minlength=size).astype(np.int64)
+
+    starts = first + np.arange(len(runs)) * period
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = np.where(runs > 0, wins / runs, np.nan)
+    return starts, runs, rates
+
+
+def summary(records: np.ndarray) -> dict[str, object]:
+    """
+    Summarise a run log
+
+    Args:
+        records (np.ndarray): Run records, such as a mapped log
+
+    Returns:
+        dict: Run counts by outcome, the bullseye offsets and the frame time percentiles
+    """
+    outcomes = np.zeros(len(OUTCOMES), dtype=np.int64)
+    offsets = []
+    worst_p99 = 0.0
+    for start in range(0, len(records), CHUNK_RECORDS):
+        chunk = records[start:start + CHUNK_RECORDS]
+        outcomes += np.bincount(chunk["outcome"], minlength=len(OUTCOMES))[:len(OUTCOMES)]
+        offset = chunk["bullseye_offset"]
+        offsets.append(offset[~np.isnan(offset)])
+        if len(chunk):
+            worst_p99 = max(worst_p99, float(chunk["frame_p99"].max()))
+
+    offsets = np.concatenate(offsets) if offsets else np.zeros(0)
+    return {
+        "runs": int(outcomes.sum()),
+        **{name: int(count) for name, count in zip(OUTCOMES, outcomes)},
+        "median_bullseye_offset_m": round(float(np.median(offsets)), 3) if len(offsets) else None,
+        "worst_frame_p99_ms": round(worst_p99, 2),
+    }
+
+
+def main() -> None:
+    """Print a summary, death heatmap and daily win rate of a run log"""
+    parser = argparse.ArgumentParser(description="Summarise a trench run log")
+    parser.add_argument("path", nargs="?", default=cfg.RUN_LOG_FILE)
+    parser.add_argument("--period", type=float, default=86400.0, help="Seconds in each win rate period")
+    args = parser.parse_args()
+
+    records = open_log(args.path)
+    print(summary(records))
+    heatmap = death_heatmap(records)
+    print("Crashes by barrier and grid, as block: count with blocks numbered row by row from the top left:")
+    for barrier, size in zip(*np.nonzero(heatmap.sum(axis=2))):
+        cells = heatmap[barrier, size]
+        print(f"  {barrier:4d} {size + 1}x{size + 1}: {' '.join(f'{cell}: {cells[cell]}' for cell in np.flatnonzero(cells))}")
+    starts, runs, rates = win_rate_over_time(records, args.period)
+    print("Win rate by period:")
+    for start, count, rate in zip(starts, runs, rates):
+        if count:
+            print(f"  {start:.0f}: {rate:.1%} of {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Frame budget scheduling of deferrable per-frame work.
+
+Critical work (the simulation and the core geometry) always runs. Deferrable work, such as
+refreshing HUD text, debug logging, updating particles beyond PARTICLE_UPDATE_CAP and warming
+caches, is queued with defer() and only run once the critical work of the frame is done, if the
+time measured so far plus the task's expected cost still fits within the frame budget. No task
+is put off for more than SCHEDULER_MAX_STARVATION frames in a row, however heavy the frames are.
+"""
+import logging
+import time
+from collections.abc import Callable
+
+import config as cfg
+
+
+class DeferredTask:
+
+    """A piece of deferrable work, with its running cost estimate."""
+
+    def __init__(self, name: str, task: Callable[[], None], cost: float = cfg.SCHEDULER_INITIAL_COST_S) -> None:
+        """
+        Create the task
+
+        Args:
+            name (str): Identifies the task, deferring the same name again replaces the queued callable
+            task (Callable): The work to do
+            cost (float): Expected run time until the task has been measured, in seconds
+        """
+        self.name = name
+        self.task = task
+        self.cost: float = cost  # Exponential moving average of the run time, in seconds
+        self.starved: int = 0  # Frames the task has been waiting
+        self.queued: bool = False
+        self.runs: int = 0
+        self.skips: int = 0
+        self.worst_starvation: int = 0
+
+    def __repr__(self) -> str:
+        """Return a string representation of the task."""
+        return f"DeferredTask({self.name}, cost={self.cost * 1000:.3f}ms, starved={self.starved})"
+
+
+class FrameScheduler:
+
+    """Runs deferrable work in whatever budget the critical work of each frame leaves."""
+
+    def __init__(
+        self,
+        fps: int = cfg.FPS,
+        budget: float = cfg.SCHEDULER_BUDGET,
+        max_starvation: int = cfg.SCHEDULER_MAX_STARVATION) -> None:
+        """
+        Create an idle scheduler
+
+        Args:
+            fps (int): The target frame rate
+            budget (float): Fraction of the frame time that work may use, the rest is left for presenting the frame
+            max_starvation (int): Frames after which a deferred task runs regardless of the budget
+        """
+        self.budget: float = budget / fps
+        self.max_starvation = max_starvation
+        self.frame_start: float = time.perf_counter()
+        self.tasks: dict[str, DeferredTask] = {}
+
+    def __repr__(self) -> str:
+        """Return a string representation of the scheduler."""
+        queued = [name for name, task in self.tasks.items() if task.queued]
+        return f"FrameScheduler(budget={self.budget * 1000:.1f}ms, queued={queued})"
+
+    def begin_frame(self) -> None:
+        """Mark the start of the frame's work, which the budget is measured from."""
+        self.frame_start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        """Return the time spent on the frame so far, in seconds."""
+        return time.perf_counter() - self.frame_start
+
+    def defer(self, name: str, task: Callable[[], None]) -> None:
+        """
+        Queue deferrable work to run at the end of the frame, budget permitting
+
+        Queueing a task that is already waiting replaces it, so work that is refreshed every frame
+        runs at most once however long it has been put off.
+
+        Args:
+            name (str): Identifies the task
+            task (Callable): The work to do
+        """
+        deferred = self.tasks.get(name)
+        if deferred is None:
+            deferred = self.tasks[name] = DeferredTask(name, task)
+        deferred.task = task
+        deferred.queued = True
+
+    def run_deferred(self) -> None:
+        """Run the queued tasks that fit in what is left of the budget, the longest starved first."""
+        queued = [task for task in self.tasks.values() if task.queued]
+        if not queued:
+            return
+
+        queued.sort(key=lambda task: task.starved, reverse=True)
+        for deferred in queued:
+            start = time.perf_counter()
+            if deferred.starved < self.max_starvation and start - self.frame_start + deferred.cost > self.budget:
+                deferred.starved += 1
+                deferred.skips += 1
+                deferred.worst_starvation = max(deferred.worst_starvation, deferred.starved)
+                continue
+
+            deferred.queued = False
+            deferred.starved = 0
+            deferred.runs += 1
+            deferred.task()
+            cost = time.perf_counter() - start
+            deferred.cost = cost if deferred.runs == 1 else deferred.cost * 0.9 + cost * 0.1
+
+    def report(self) -> None:
+        """Log how often each task ran and was put off."""
+        for deferred in self.tasks.values():
+            logging.info(
+                f"Deferred {deferred.name}: ran {deferred.runs}, put off {deferred.skips}, "
+                f"worst wait {deferred.worst_starvation} frames, cost {deferred.cost * 1000:.3f}ms"
+            )
@@ -1,18 +1,34 @@
 """Holds classes representing each game state (Main Menu, Gameplay, Victory)"""
 from __future__ import annotations
 
+import bisect
+import math
+import random
+import time
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from grid import Barrier
     from pygame.event import Event
+    from renderers import Renderer
     from trench import Game
 
 import config as cfg
+import geometry as geo
+import grid
+import numpy as np
+import occlusion
 import pygame
-import render
+import runlog
 import utils
+from collision import BarrierIndex, ProjectileCollider
+from ghosts import GhostRecorder, GhostSet
+from greebles import Greebles
 from icecream import ic
+from pipeline import FrameSnapshot
 from player import PlayerShip
+from projectiles import ProjectilePool
+from rewind import RewindBuffer, seed_of
 from torpedos import Torpedos
 
 
@@ -24,6 +40,11 @@ class Screen:
         """"""
         self.game = game
 
+    @property
+    def renderer(self) -> Renderer:
+        """The rendering backend the game was started with"""
+        return self.game.renderer
+
     def handle_events(self) -> None:
         """"""
         pass
@@ -36,6 +57,10 @@ class Screen:
         """"""
         pass
 
+    def leave(self) -> None:
+        """Called when the game moves on to another screen, or quits"""
+        pass
+
 
 class MainMenuScreen(Screen):
 
@@ -51,6 +76,7 @@ class MainMenuScreen(Screen):
     def __init__(self: Screen, game: Game) -> None:
         """"""
         super().__init__(game)
+        self.game.audio.stop_hum()
         # TODO on init draw the screen, then only redraw on event Q
         # Initialize game-specific variables and objects
 
@@ -59,7 +85,9 @@ class MainMenuScreen(Screen):
         for event in events:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    self.game.set_screen(GameplayScreen(self.game))
+                    self.game.set_screen(GameplayScreen(self.game, seed=cfg.RUN_SEED))
+                elif event.key == cfg.SPLIT_SCREEN_KEY:
+                    self.game.set_screen(SplitScreen(self.game, seed=cfg.RUN_SEED))
                 elif event.key == pygame.K_q:
                     self.game.violent_death = not self.game.violent_death
                     pass
@@ -69,14 +97,14 @@ class MainMenuScreen(Screen):
                     self.game.set_screen(VictoryScreen(self.game))
 
     def update(self: MainMenuScreen) -> None:
-        """"""
-        pass
+        """Drift slowly through the starfield"""
+        self.game.stars.update(cfg.STAR_CRUISE_SPEED_MS)
 
     def render(self: MainMenuScreen, surface: pygame.Surface) -> None:
         """"""
-        render.stars(self.game.stars, surface)
-        render.deathstar(surface)
-        render.intro_text(self, surface)
+        self.renderer.stars(self.game.stars, surface)
+        self.renderer.deathstar(surface)
+        self.renderer.intro_text(self, surface)
 
 
 class GameplayScreen(Screen):
@@ -90,98 +118,227 @@ class GameplayScreen(Screen):
         game (Game): The game object containing the game state and logic
     """
 
-    def __init__(self, game: Game) -> None:
-        """Initialize game-specific variables and objects"""
+    def __init__(
+        self,
+        game: Game,
+        seed: int | None = None,
+        view: geo.Viewport | None = None,
+        player: int | None = None,
+        world: GameplayScreen | None = None) -> None:
+        """
+        Initialize game-specific variables and objects
+
+        Args:
+            game (Game): The game object containing the game state and logic
+            seed (int, optional): Seed for the barrier layout, a random layout is used if None
+            view (Viewport, optional): The area of the canvas the run is drawn into, the whole canvas if None
+            player (int, optional): Index into PLAYER_KEYS of the keys the run is flown with, every key if None
+            world (GameplayScreen, optional): Another run whose barriers this one flies through, on a split screen
+        """
         super().__init__(game)
+        self.seed: int = world.seed if world is not None else random.randrange(2**32) if seed is None else seed
+        self.view = view
+        self.canvas = game.screen if view is None else game.screen.subsurface(view.rect)
+        self.player = player
+        keys = {"movement": cfg.MOVEMENT_KEYS, "fire": pygame.K_SPACE, "stick": True} if player is None else cfg.PLAYER_KEYS[player]
+        self.movement_keys = keys["movement"]
+        self.fire_key = keys["fire"]
+        self.uses_stick: bool = keys["stick"]
+        self.finished: type[Screen] | None = None  # The screen a split screen run asked to move on to
+        self.tick: int = 0
+        self.rewind = RewindBuffer()
         self.ship = PlayerShip()
-        self.torpedos = Torpedos()
-        self.barriers = utils.create_barriers()
+        self.projectiles = ProjectilePool()
+        self.torpedos = Torpedos(self.projectiles)
+        # Both players of a split screen share the barriers, their index and the wall detail, only the ship and torpedoes are their own
+        if world is not None:
+            self.barriers = world.barriers
+            self.greebles = world.greebles
+            index = world.collider.index
+        else:
+            self.barriers = utils.create_barriers(self.seed)
+            self.greebles = Greebles(self.seed) if cfg.GREEBLE_PANELS > 0 else None
+            index = BarrierIndex(self.barriers)
+        self.collider = ProjectileCollider(index, self.projectiles.capacity)
         self.current_barrier_index: int = 0
+        self.analog_steering: bool = False
         self.dead: bool = False
         self.bullseye: bool = False
+        self.collision_cell: int = -1
+        self.resumed: bool = False
+        self.frame_times = np.zeros(cfg.RUN_LOG_FRAMES, dtype=np.float32)
+        self.ghost_recorder = GhostRecorder() if cfg.GHOSTS else None
+        self.ghosts = GhostSet.load(self.seed, grid.configuration(cfg.BARRIER_GRIDS)) if cfg.GHOSTS else None
+
+        self.game.metrics.increment("runs")
 
         self.message = {"text": "Use the Force", "timer": 120}  # Timer is in frames (120 frames of message display)
 
         self.debug = True
+        # HUD values are refreshed as deferrable work, so they can lag the ship by a few frames on heavy frames
+        self.hud_ship = self.ship.snapshot()
+        self.hud: dict[str, object] = {"distance": int(self.hud_ship.distance), "position": self.hud_ship.position}
+
+        self.game.audio.start_hum(self)
+
+        # The world is built, once per world as a split screen shares it, move it out of the way of the garbage collector
+        if world is None:
+            self.game.memory.settle_world()
 
     def handle_events(self, events: list[Event]) -> None:
         """"""
         for event in events:
-            if event.type in {pygame.KEYDOWN, pygame.KEYUP} and event.key in cfg.MOVEMENT_KEYS:
+            if event.type in {pygame.KEYDOWN, pygame.KEYUP} and event.key in self.movement_keys:
                 key_type = 1 if event.type == pygame.KEYDOWN else 0
                 self.ship.steer(key_type, event.key)
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and self.ship.reached_launch_zone:
+                if event.key == self.fire_key and self.ship.reached_launch_zone:
                     if self.torpedos.impact or self.torpedos.launched:
                         self._create_message("Out of ammo!!", 45)
+                        self.game.audio.play("out_of_ammo")
                         continue
                     self.torpedos.fire(self.ship.get_position())
+                    self.game.audio.play("torpedo")
                     self.ship.torpedos_launched = True
                     self.ship.movement_factor = cfg.FPS
+                elif event.key == cfg.REWIND_KEY and cfg.PRACTICE_MODE and self.rewind:
+                    tick = self.rewind.restore(self, cfg.REWIND_STEP_SECONDS * cfg.FPS)
+                    self._create_message(f"Rewound to {tick / cfg.FPS:.1f}s", 45)
                 elif event.key == pygame.K_ESCAPE:
-                    self.game.set_screen(MainMenuScreen(self.game))
+                    self.exit(MainMenuScreen)
+
+    @classmethod
+    def resume(cls, game: Game, path: str, tick: int | None = None) -> GameplayScreen:
+        """
+        Start a run from a tick of a state dump, such as a crash dump
+
+        Args:
+            game (Game): The game object containing the game state and logic
+            path (str): The state dump
+            tick (int, optional): The tick to resume from, the last one in the dump if None
+
+        Returns:
+            GameplayScreen: The run, in the dumped state
+        """
+        buffer = RewindBuffer.load(path)
+        back = 0 if tick is None else buffer.find(tick)
+        screen = cls(game, seed=seed_of(buffer.get(back)))
+        screen.rewind = buffer
+        screen.resumed = True
+        buffer.restore(screen, back)
+        return screen
 
     def update(self) -> None:
         """"""
         curr_pos = self.ship.get_position()
         if self.message["timer"] > 0:
-            render.message(self.game.screen, self.message["text"])
+            self.renderer.message(self.canvas, self.message["text"])
             self.message["timer"] -= 1
 
         if self.dead:
-            if self.message["timer"] <= 0:
-                self.game.set_screen(MainMenuScreen(self.game))
+            # In practice mode the run waits to be rewound
+            if self.message["timer"] <= 0 and not cfg.PRACTICE_MODE:
+                self.exit(MainMenuScreen)
             return
 
         if (curr_pos[2] > cfg.TRENCH_LENGTH + 60) and (self.bullseye):
-            self.game.set_screen(VictoryScreen(self.game))
+            self.exit(VictoryScreen)
+
+        if curr_pos[1] < -cfg.TRENCH_HEIGHT / 2:
+            self.game.stars.update(cfg.STAR_CRUISE_SPEED_MS)
 
+        if self.uses_stick and self.game.stick.connected:
+            self._steer_analog()
+        reached_launch_zone = self.ship.reached_launch_zone
         travel_event = self.ship.travel()
         if travel_event:
             self._create_message(travel_event)
+        if self.ship.reached_launch_zone and not reached_launch_zone:
+            self.game.audio.play("launch_zone")
 
         # Update the barrier index based on the ship's position
         if curr_pos[2] > self.barriers[self.current_barrier_index][0] and self.current_barrier_index < len(self.barriers) - 1:
             self.current_barrier_index += 1
 
         if self.check_for_collisions():
+            self.game.metrics.increment("collisions")
             self.dead = True
-            self._create_message("Game over!")
+            self.game.audio.stop_hum(self)
+            self.game.audio.play("explosion")
+            self._create_message("Game over!\nBackspace to rewind" if cfg.PRACTICE_MODE else "Game over!")
             # TODO Game over screen
 
+        self.projectiles.update(collider=self.collider)
+        if cfg.HIDDEN_LINES:
+            self.game.scheduler.defer(self._task("warm_occlusion"), self._warm_caches)
+
         if self.torpedos.launched and not self.torpedos.impact:
-            ic(self.torpedos)
-            self.torpedos.travel()
+            if cfg.DEBUG_LOG:
+                self.game.scheduler.defer(self._task("torpedo_log"), self._log_torpedos)
             self.torpedos.check_impact()
             impact_outcome = self.torpedos.bullseye_check()
+            if self.torpedos.bullseye:
+                self.bullseye = True
+                self.game.metrics.increment("bullseyes")
             if impact_outcome:
                 self._create_message(impact_outcome)
+                self.game.audio.play("bullseye" if self.torpedos.bullseye else "impact")
+
+        self.frame_times[self.tick % len(self.frame_times)] = self.game.memory.frame_time
+        if self.ghost_recorder is not None:
+            self.ghost_recorder.record(self.tick, self.ship.get_position())
+        self.tick += 1
+        self.rewind.record(self)
 
     def render(self, surface: pygame.Surface) -> None:
         """"""
-        current_position = self.ship.get_position()
+        # The pipeline prepares one view a frame, the views of a split screen are projected as they are drawn
+        pipeline = self.game.pipeline
+        view = self.view
+        frame = pipeline.swap(self.snapshot()) if pipeline.enabled and view is None else None
+        # Everything is drawn from the state the prepared frame was taken from, so the HUD matches the geometry
+        ship = frame.snapshot.ship if frame is not None else self.ship.snapshot()
+        current_position = ship.position
         # TODO only render when dead
         if self.dead:
-            render.death(surface, self.dead, self.game.violent_death)
+            self.renderer.death(surface, self.dead, self.game.violent_death)
+
+        # Once the ship has pulled up out of the trench, space is visible above the horizon
+        if current_position[1] < -cfg.TRENCH_HEIGHT / 2:
+            horizon = cfg.CANVAS_CENTER_Y if view is None else view.centre_y
+            self.renderer.stars(self.game.stars, surface, horizon, view)
 
-        render.trench(surface, current_position)
-        render.barriers(surface, self.barriers, self.current_barrier_index, current_position)
+        if frame is not None:
+            self.renderer.geometry(surface, frame)
+        else:
+            self.renderer.trench(surface, current_position, view)
+            if self.greebles is not None:
+                self.renderer.greebles(surface, self.greebles.project(current_position, view))
+            self.renderer.barriers(surface, self.barriers, self.current_barrier_index, current_position, view)
+
+            self.renderer.exhaust_port(surface, current_position, view)
+            self.renderer.torpedoes(surface, self.projectiles, current_position, view)
 
-        render.exhaust_port(surface, current_position)
-        if self.torpedos.launched:
-            render.torpedoes(surface, self.torpedos, current_position)
+        if self.ghosts is not None:
+            self.renderer.ghosts(surface, self.ghosts.project(current_position, view=view))
 
-        render.distance(surface, int(self.ship.get_distance()))
+        self.hud_ship = ship
+        self.game.scheduler.defer(self._task("hud"), self._refresh_hud)
+        self.renderer.distance(surface, self.hud["distance"])
 
         if self.debug:
-            render.debug(surface, self.ship.get_position())
+            self.renderer.debug(surface, self.hud["position"])
+
+    def snapshot(self) -> FrameSnapshot:
+        """Take an immutable snapshot of the state needed to draw this frame"""
+        return FrameSnapshot(self.ship.snapshot(), self.torpedos.snapshot(), self.barriers, self.current_barrier_index, self.greebles)
 
     def check_for_collisions(self) -> bool:
         """Determine whether the ship has collided with any blocks"""
         if self.current_barrier_index >= len(self.barriers):
             return False
 
-        barrier: tuple[int, int, list[int]] = self.barriers[self.current_barrier_index]
+        barrier: Barrier = self.barriers[self.current_barrier_index]
         pos = self.ship.get_position()
 
         # Check if we are in the same Z position as the barrier
@@ -189,39 +346,181 @@ class GameplayScreen(Screen):
             return False
 
         # Calculate the area that our ship occupies
-        x1 = pos[0] - cfg.SHIP_WIDTH_M / 2.0
-        x2 = x1 + cfg.SHIP_WIDTH_M
-        y1 = pos[1] - cfg.SHIP_HEIGHT_M / 2.0
-        y2 = y1 + cfg.SHIP_HEIGHT_M
-
-        # Calculate block size
-        bw = cfg.TRENCH_WIDTH / 3.0
-        bh = cfg.TRENCH_HEIGHT / 3.0
-        bhw = bw / 2.0
-        bhh = bh / 2.0
-        for by in range(-1, 2):
-            by1 = by * bh - bhh
-            by2 = by1 + bh
-
-            # Check to see whether we intersect vertically
-            if y1 < by2 and y2 > by1:
-                for bx in range(-1, 2):
-                    block_index = (by + 1) * 3 + bx + 1
-                    if barrier[2][block_index] == 1:
-                        bx1 = bx * bw - bhw
-                        bx2 = bx1 + bw
-
-                        # Check to see whether we intersect horizontally
-                        if x1 < bx2 and x2 > bx1:
-                            return True
+        table = geo.table
+        x1 = pos[0] - table.ship_half_width
+        x2 = pos[0] + table.ship_half_width
+        y1 = pos[1] - table.ship_half_height
+        y2 = pos[1] + table.ship_half_height
+
+        # The columns and rows of blocks we intersect
+        xs, ys = table.barrier_planes[barrier.size]
+        first_column = max(bisect.bisect_right(xs, x1) - 1, 0)
+        last_column = min(bisect.bisect_left(xs, x2) - 1, barrier.size - 1)
+        if first_column > last_column:
+            return False
+        columns = ((1 << (last_column - first_column + 1)) - 1) << first_column
+
+        for row in range(max(bisect.bisect_right(ys, y1) - 1, 0), min(bisect.bisect_left(ys, y2) - 1, barrier.size - 1) + 1):
+            hit = barrier.row(row) & columns
+            if hit:
+                self.collision_cell = row * barrier.size + (hit & -hit).bit_length() - 1
+                return True
 
         return False
 
+    def leave(self) -> None:
+        """Write the run to the run log, it has been won, crashed or abandoned"""
+        if self.bullseye and self.ship.get_position()[2] > cfg.TRENCH_LENGTH:
+            outcome = runlog.OUTCOME_WON
+        elif self.dead:
+            outcome = runlog.OUTCOME_CRASHED
+        else:
+            outcome = runlog.OUTCOME_ABANDONED
+
+        offset = math.nan
+        if self.torpedos.impact_position is not None:
+            x, _, z = self.torpedos.impact_position
+            offset = math.hypot(x, z - geo.table.exhaust_position)
+
+        # The first frame of a run includes the time spent on the screen before it
+        frame_times = self.frame_times[1:min(self.tick, len(self.frame_times))] * 1000
+        p50, p95, p99, worst = np.percentile(frame_times, (50, 95, 99, 100)) if len(frame_times) else (0.0,) * 4
+        presets = tuple(cfg.QUALITY_PRESETS)
+
+        x, y, z = self.ship.get_position()
+        self.game.run_log.append(
+            time=time.time(),
+            seed=self.seed,
+            ticks=self.tick,
+            x=x,
+            y=y,
+            z=z,
+            bullseye_offset=offset,
+            frame_p50=p50,
+            frame_p95=p95,
+            frame_p99=p99,
+            frame_max=worst,
+            barrier_index=self.current_barrier_index,
+            outcome=outcome,
+            grid=self.barriers[self.current_barrier_index].size if self.dead else 0,
+            collision_cell=self.collision_cell if self.dead else -1,
+            flags=runlog.FLAG_TORPEDOS_LAUNCHED * self.torpedos.launched
+            | runlog.FLAG_BULLSEYE * self.bullseye
+            | runlog.FLAG_PRACTICE * cfg.PRACTICE_MODE
+            | runlog.FLAG_RESUMED * self.resumed,
+            preset=presets.index(self.game.preset) if self.game.preset in presets else 255,
+        )
+
+        # Only whole runs flown from the start are worth racing
+        if self.ghost_recorder is not None and outcome != runlog.OUTCOME_ABANDONED and not (cfg.PRACTICE_MODE or self.resumed):
+            self.ghost_recorder.save(self.tick, self.seed, grid.configuration(cfg.BARRIER_GRIDS), outcome)
+
+    def exit(self, screen: type[Screen]) -> None:
+        """
+        Move on from the run, or on a split screen wait for the other player to finish
+
+        Args:
+            screen (type): The screen to move on to
+        """
+        if self.player is None:
+            self.game.set_screen(screen(self.game))
+        elif self.finished is None:
+            self.finished = screen
+
+    def _task(self, name: str) -> str:
+        """Name deferrable work, so the work of each player on a split screen is queued separately"""
+        return name if self.player is None else f"{name}_{self.player}"
+
+    def _steer_analog(self) -> None:
+        """Steer with the joystick readings averaged since the last step, leaving the keys alone while it is centred"""
+        x, y = self.game.stick.take()
+        if x or y or self.analog_steering:
+            self.ship.steer_analog(x, y)
+        self.analog_steering = bool(x or y)
+
     def _create_message(self, text: str, time: int = 120) -> None:
         """Create a message to be displayed on the screen"""
         self.message["text"] = text
         self.message["timer"] = time
 
+    def _refresh_hud(self) -> None:
+        """Deferrable: update the values shown by the HUD from the last frame drawn"""
+        self.hud["distance"] = int(self.hud_ship.distance)
+        self.hud["position"] = self.hud_ship.position
+
+    def _log_torpedos(self) -> None:
+        """Deferrable: log the state of the torpedoes in flight"""
+        ic(self.torpedos)
+
+    def _warm_caches(self) -> None:
+        """Deferrable: work out the hidden lines of the next barrier before it comes into view"""
+        pos = self.ship.get_position()
+        for barrier in self.barriers[self.current_barrier_index:]:
+            if barrier[0] - pos[2] >= cfg.FAR_PLANE_M:
+                occlusion.warm(pos, barrier)
+                return
+
+
+class SplitScreen(Screen):
+
+    """
+    Two Player Split Screen
+
+    Two runs side by side through the same barriers, each drawn into its own viewport. The
+    barriers, their index and the caches built from them are shared, only the ships, torpedoes
+    and projection are kept per player. The game moves on once both runs are over.
+
+    Attributes:
+        game (Game): The game object containing the game state and logic
+        players (list): The run of each player, from left to right
+    """
+
+    def __init__(self, game: Game, seed: int | None = None) -> None:
+        """
+        Start both runs
+
+        Args:
+            game (Game): The game object containing the game state and logic
+            seed (int, optional): Seed for the barrier layout, a random layout is used if None
+        """
+        super().__init__(game)
+        views = geo.split(len(cfg.PLAYER_KEYS))
+        first = GameplayScreen(game, seed=seed, view=views[0], player=0)
+        self.players = [first] + [
+            GameplayScreen(game, view=view, player=player, world=first) for player, view in enumerate(views[1:], 1)
+        ]
+
+    def handle_events(self, events: list[Event]) -> None:
+        """Pass the events on to the runs still going"""
+        for screen in self.players:
+            if screen.finished is None:
+                screen.handle_events(events)
+
+    def update(self) -> None:
+        """Step the runs still going, and move on once they are all over"""
+        for screen in self.players:
+            if screen.finished is None:
+                screen.update()
+
+        outcomes = [screen.finished for screen in self.players]
+        if all(outcomes):
+            self.game.set_screen((VictoryScreen if VictoryScreen in outcomes else MainMenuScreen)(self.game))
+
+    def render(self, surface: pygame.Surface) -> None:
+        """Draw each run into its viewport, and the divider between them"""
+        for screen in self.players:
+            screen.render(screen.canvas)
+            # Batched lines are in the coordinates of the viewport, so they are drawn before moving on
+            self.renderer.end_frame(screen.canvas)
+
+        for view in (screen.view for screen in self.players[1:]):
+            pygame.draw.line(surface, cfg.SPLIT_DIVIDER_COLOUR, (view.left, 0), (view.left, view.height), 2)
+
+    def leave(self) -> None:
+        """Write both runs to the run log"""
+        for screen in self.players:
+            screen.leave()
+
 
 class VictoryScreen(Screen):
 
@@ -230,8 +529,12 @@ class VictoryScreen(Screen):
     def __init__(self, game: Game) -> None:
         """"""
         super().__init__(game)
+        self.game.metrics.increment("wins")
+        self.game.audio.stop_hum()
+        self.game.audio.play("explosion")
         self.explosion_countdown = 180
         self.particles = utils.create_particles()
+        self.particle_steps: int = 0  # Updates owed to the particles beyond PARTICLE_UPDATE_CAP
 
     def handle_events(self, events: list[Event]) -> None:
         """Allow the user to return to the main menu with ESC"""
@@ -240,12 +543,13 @@ class VictoryScreen(Screen):
                 self.game.set_screen(MainMenuScreen(self.game))
 
     def update(self) -> None:
-        """On each update, decrement the explosion countdown"""
+        """On each update, decrement the explosion countdown and fly away at warp speed"""
         self.explosion_countdown -= 1
+        self.game.stars.update(cfg.STAR_VICTORY_SPEED_MS)
 
     def render(self, surface: pygame.Surface) -> None:
         """Render the victory animation"""
-        render.stars(self.game.stars, surface)
+        self.renderer.stars(self.game.stars, surface)
         if self.explosion_countdown <= 0:
             if self.explosion_countdown > -160:
                 base_colour = (64, 32, 16)
@@ -253,13 +557,24 @@ class VictoryScreen(Screen):
                 colour = "#"
                 for c in range(0, 3):
                     colour += utils.hex(base_colour[c] * factor)
-                render.deathstar(surface, colour)
+                self.renderer.deathstar(surface, colour)
             elif self.explosion_countdown == -160:
                 self.particles = utils.create_particles()
+                self.particle_steps = 0
             elif self.explosion_countdown > -400:
-                render.particles(surface, self.particles)
-                self.particles = utils.move_particles(self.particles)
+                self.renderer.particles(surface, self.particles)
+                utils.move_particles(self.particles[:cfg.PARTICLE_UPDATE_CAP])
+                if len(self.particles) > cfg.PARTICLE_UPDATE_CAP:
+                    self.particle_steps += 1
+                    self.game.scheduler.defer("particles", self._move_remaining_particles)
             else:
                 self.game.set_screen(MainMenuScreen(self.game))
         else:
-            render.deathstar(surface)
+            self.renderer.deathstar(surface)
+
+    def _move_remaining_particles(self) -> None:
+        """Deferrable: catch the particles beyond PARTICLE_UPDATE_CAP up on the updates they are owed"""
+        remaining = self.particles[cfg.PARTICLE_UPDATE_CAP:]
+        for _ in range(self.particle_steps):
+            utils.move_particles(remaining)
+        self.particle_steps = 0
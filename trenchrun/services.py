@@ -0,0 +1,118 @@
+"""
+Background services, run as coroutines alongside the frame loop of Game.run_async.
+
+Services only run while the frame task waits for the next frame, in steps that must each fit in
+ASYNC_TIME_SLICE_S. Anything that would block for longer, such as file I/O, belongs in a thread
+with asyncio.to_thread; socket I/O should use the event loop's streams.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Coroutine
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from trench import Game
+import config as cfg
+
+
+class BackgroundServices:
+
+    """Keeps track of the background coroutines, so they can be cancelled at shutdown."""
+
+    def __init__(self) -> None:
+        """Create an empty set of services, must be created inside the running event loop."""
+        self.tasks: set[asyncio.Task] = set()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the services."""
+        return f"BackgroundServices({sorted(task.get_name() for task in self.tasks)})"
+
+    def spawn(self, coroutine: Coroutine, name: str) -> asyncio.Task:
+        """
+        Start a service
+
+        Args:
+            coroutine (Coroutine): The service
+            name (str): Names the service in logs
+
+        Returns:
+            asyncio.Task: The task running the service
+        """
+        task = asyncio.create_task(coroutine, name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task) -> None:
+        """Forget a finished service, logging it if it failed."""
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Background service {task.get_name()} failed", exc_info=task.exception())
+
+    async def close(self) -> None:
+        """Cancel every service and wait for them to finish."""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def telemetry_report(game: Game) -> dict[str, object]:
+    """
+    Summarise the session for the telemetry collector
+
+    Args:
+        game (Game): The running game
+
+    Returns:
+        dict: The counters, frame rate, input latency and what is on screen
+    """
+    return {
+        "time": time.time(),
+        "version": cfg.VERSION,
+        "preset": game.preset,
+        "fps": round(game.clock.get_fps(), 1),
+        "counters": dict(game.metrics.counters),
+        "input_latency_ms": game.input.percentiles(),
+        **game.describe(),
+    }
+
+
+async def send_telemetry(game: Game, host: str, port: int, interval: float = cfg.TELEMETRY_INTERVAL) -> None:
+    """
+    Send a telemetry report to a local collector every interval, as JSON lines over TCP
+
+    The collector being down or going away is not an error, the connection is retried with
+    an increasing delay.
+
+    Args:
+        game (Game): The running game
+        host (str): The collector's address
+        port (int): The collector's port
+        interval (float): Seconds between reports
+    """
+    delay = 1.0
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError as error:
+            logging.debug(f"Telemetry collector {host}:{port} unreachable, {error}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, cfg.TELEMETRY_RECONNECT_MAX_S)
+            continue
+
+        logging.info(f"Sending telemetry to {host}:{port}")
+        delay = 1.0
+        try:
+            while True:
+                writer.write(json.dumps(telemetry_report(game)).encode() + b"\n")
+                await writer.drain()
+                await asyncio.sleep(interval)
+        except OSError as error:
+            logging.info(f"Telemetry collector {host}:{port} went away, {error}")
+        finally:
+            writer.close()
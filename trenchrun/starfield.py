@@ -0,0 +1,106 @@
+"""
+Animated 3D starfield.
+
+Stars are stored as NumPy arrays of x, y and z, updated and projected in a single
+vectorized pass each frame, then written straight into the surface's pixel array.
+"""
+import config as cfg
+import geometry as geo
+import numpy as np
+import pygame
+
+
+class Starfield:
+
+    """A field of stars flying towards the viewer."""
+
+    def __init__(self, star_count: int | None = None, seed: int | None = None) -> None:
+        """
+        Scatter the stars through the volume in front of the viewer
+
+        Args:
+            star_count (int): The number of stars in the field, defaults to STAR_COUNT
+            seed (int): Seed for the random star positions
+        """
+        self.rng = np.random.default_rng(seed)
+        star_count = star_count or cfg.STAR_COUNT
+        self.star_count = star_count
+        self.z = self.rng.uniform(cfg.NEAR_PLANE_M, cfg.STAR_FIELD_DEPTH, star_count).astype(np.float32)
+        self.x = (self.rng.uniform(-1.0, 1.0, star_count) * self.z).astype(np.float32)
+        self.y = (self.rng.uniform(-1.0, 1.0, star_count) * self.z).astype(np.float32)
+        self.speed: float = 0.0
+        self._palettes: dict[tuple, np.ndarray] = {}
+
+    def __repr__(self) -> str:
+        """Return a string representation of the starfield."""
+        return f"Starfield(star_count={self.star_count}, speed={self.speed:.1f})"
+
+    def update(self, speed: float, dt: float = 1.0 / cfg.FPS) -> None:
+        """
+        Fly the stars towards the viewer, respawning any that pass it or leave the view
+
+        Args:
+            speed (float): The speed of the viewer through the field, in metres per second
+            dt (float): The simulation step in seconds
+        """
+        self.speed = speed
+        self.z -= speed * dt
+
+        # Recycle the stars that are behind the viewer or have drifted off the edge of the screen
+        sx, sy = self._project(self.z)
+        spent = (self.z <= cfg.NEAR_PLANE_M) | (sx < 0) | (sx >= cfg.CANVAS_WIDTH) | (sy < 0) | (sy >= cfg.CANVAS_HEIGHT)
+        count = int(np.count_nonzero(spent))
+        if count:
+            # Respawn in the far half of the field, somewhere that projects onto the screen
+            z = self.rng.uniform(cfg.STAR_FIELD_DEPTH * 0.5, cfg.STAR_FIELD_DEPTH, count)
+            self.z[spent] = z
+            self.x[spent] = self.rng.uniform(-1.0, 1.0, count) * z
+            self.y[spent] = self.rng.uniform(-1.0, 1.0, count) * z
+
+    def draw(self, surface: pygame.Surface, horizon: int | None = None, view: geo.Viewport | None = None) -> None:
+        """
+        Write the stars into the surface's pixels
+
+        Nearer stars are brighter. Once the field is moving faster than STAR_WARP_SPEED_MS,
+        each star is drawn as a streak back towards where it was a moment ago.
+
+        Args:
+            surface (pygame.Surface): The surface on which to draw the stars
+            horizon (int): If given, only stars above this screen row are drawn
+            view (Viewport): The viewport projected onto, defaults to the whole canvas
+        """
+        if view is None:
+            view = geo.table.viewport
+        sx, sy = self._project(self.z, view)
+        shade = np.clip(255.0 * (1.0 - self.z / cfg.STAR_FIELD_DEPTH), 64, 255).astype(np.intp)
+
+        if self.speed >= cfg.STAR_WARP_SPEED_MS:
+            trail_z = self.z + self.speed * cfg.STAR_STREAK_SECONDS
+            tx, ty = self._project(trail_z, view)
+            steps = np.linspace(0.0, 1.0, cfg.STAR_STREAK_SAMPLES, dtype=np.float32)[:, np.newaxis]
+            sx = (sx + (tx - sx) * steps).ravel()
+            sy = (sy + (ty - sy) * steps).ravel()
+            shade = np.tile(shade, cfg.STAR_STREAK_SAMPLES)
+
+        bottom = view.height if horizon is None else min(horizon, view.height)
+        width, height = surface.get_size()
+        visible = (sx >= 0) & (sx < min(width, view.width)) & (sy >= 0) & (sy < min(height, bottom))
+
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[sx[visible].astype(np.intp), sy[visible].astype(np.intp)] = self._palette(surface)[shade[visible]]
+        del pixels
+
+    def _project(self, z: np.ndarray, view: geo.Viewport | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Project the stars at the given depths onto a viewport, the whole canvas by default."""
+        if view is None:
+            view = geo.table.viewport
+        sx = self.x / z * view.scale_width + view.centre_x
+        sy = self.y / z * view.scale_height + view.centre_y
+        return sx, sy
+
+    def _palette(self, surface: pygame.Surface) -> np.ndarray:
+        """Return the 256 grey levels mapped to the surface's pixel format."""
+        key = (surface.get_bitsize(), surface.get_masks())
+        if key not in self._palettes:
+            self._palettes[key] = np.array([surface.map_rgb((i, i, i)) for i in range(256)], dtype=np.int64)
+        return self._palettes[key]
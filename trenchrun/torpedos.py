@@ -1,16 +1,36 @@
 """"""
+from typing import NamedTuple
+
+import collision
 import config as cfg
+import numpy as np
 from icecream import ic
+from projectiles import ProjectilePool
+
+
+class TorpedoSnapshot(NamedTuple):
+
+    """Immutable copy of the projectiles in flight, and the torpedo flags, needed to draw a frame."""
+
+    positions: np.ndarray
+    owners: np.ndarray
+    launched: bool
+    impact: bool
 
 
 class Torpedos:
 
     """Class for the torpedoes."""
 
-    def __init__(self) -> None:
-        """Create the torpedoes, initializing all positions and speeds to zero."""
-        self.l_torpedo: list[float] = [0.0, 0.0, 0.0]
-        self.r_torpedo: list[float] = [0.0, 0.0, 0.0]
+    def __init__(self, pool: ProjectilePool) -> None:
+        """
+        Create the torpedoes, initializing all positions and speeds to zero.
+
+        Args:
+            pool (ProjectilePool): The projectile pool that the torpedoes are launched into
+        """
+        self.pool = pool
+        self.slots: tuple[int, ...] = ()
         self.launch_position: tuple[float, float, float] = (0.0, 0.0, 0.0)
         self.velocity: float = cfg.PROTON_TORPEDO_VELOCITY_MS
         self.range: float = cfg.TORPEDO_RANGE
@@ -20,13 +40,14 @@ class Torpedos:
         self.launched: bool = False
         self.impact: bool = False
         self.bullseye: bool = False
+        self.impact_position: tuple[float, float, float] | None = None
 
     def __str__(self) -> str:
         """Return a string representation of the torpedoes."""
         torpstat = """
         Torpedos
-        Left Torpedo: {0}
-        Right Torpedo: {1}
+        Slots: {0}
+        Positions: {1}
         Launch Position: {2}
         Velocity: {3}
         Range: {4}
@@ -37,8 +58,8 @@ class Torpedos:
         Impact: {8}
         Bullseye: {9}"""
         return torpstat.format(
-            self.l_torpedo,
-            self.r_torpedo,
+            self.slots,
+            [self.pool.position[slot].tolist() for slot in self.slots],
             self.launch_position,
             self.velocity,
             self.range,
@@ -51,23 +72,32 @@ class Torpedos:
 
     def __repr__(self) -> str:
         """Return a string representation of the torpedoes."""
+        lead = self.pool.position[self.slots[0]] if self.slots else (0.0, 0.0, 0.0)
+        remaining = self.pool.lifetime[self.slots[0]] if self.slots else self.range
         return f"""
-            {self.l_torpedo[0]:.2f},{self.l_torpedo[1]:.2f},{self.l_torpedo[2]:.2f},{self.launch_position[2]:.2f},{self.range:.2f},{self.velocity:.2f}
+            {lead[0]:.2f},{lead[1]:.2f},{lead[2]:.2f},{self.launch_position[2]:.2f},{remaining:.2f},{self.velocity:.2f}
             """.strip()
 
-    def _check_ontarget(self) -> None:
-        """Check if the torpedoes have entered the exhaust port."""
-        exhaust_radius = cfg.EXHAUST_WIDTH / 2
-        exhaust_z_limits = [
-            (cfg.EXHAUST_POSITION - exhaust_radius) + cfg.TORPEDO_RADIUS,
-            (cfg.EXHAUST_POSITION + exhaust_radius) - cfg.TORPEDO_RADIUS
-            ]
+    def snapshot(self) -> TorpedoSnapshot:
+        """
+        Take an immutable copy of every projectile in flight in the pool, safe to hand to another thread
 
-        if self.l_torpedo[2] < exhaust_z_limits[0] or self.l_torpedo[2] > exhaust_z_limits[1]:
-            ic(self.l_torpedo, exhaust_z_limits)
+        Returns:
+            TorpedoSnapshot: Read-only copies of the positions and owners, with the torpedo flags
+        """
+        active = self.pool.flying()
+        positions = self.pool.position[active]
+        owners = self.pool.owner[active]
+        positions.flags.writeable = False
+        owners.flags.writeable = False
+        return TorpedoSnapshot(positions, owners, self.launched, self.impact)
+
+    def _check_ontarget(self, slot: int) -> None:
+        """Check if the torpedo in the given slot has entered the exhaust port."""
+        if self.pool.impact_kind[slot] != collision.IMPACT_TARGET:
+            ic(self.pool.position[slot], self.pool.impact_kind[slot])
             return
 
-        # TODO need to check x alignment of torpedos!
         self.bullseye = True
 
     def fire(self, position: tuple[float, float, float]) -> None:
@@ -81,27 +111,21 @@ class Torpedos:
             return
         self.launched = True
         self.launch_position = (position[0], position[1], position[2])
-        self.l_torpedo = [position[0] - self.span / 2, position[1] + 0.4, position[2]]
-        self.r_torpedo = [position[0] + self.span / 2, position[1] + 0.4, position[2]]
-
-    def travel(self) -> None:
-        """Move the torpedoes forward, if at their range limit also drop them down."""
-        if self.impact:
-            return
-
-        self.range -= self.velocity / cfg.FPS
-        for torpedo in (self.l_torpedo, self.r_torpedo):
-            torpedo[2] += self.velocity / cfg.FPS
-            if self.range <= 5:
-                torpedo[1] -= (self.velocity * 0.5) / cfg.FPS
+        velocity = (0.0, 0.0, self.velocity)
+        slots = (
+            self.pool.spawn((position[0] - self.span / 2, position[1] + 0.4, position[2]), velocity, self.range),
+            self.pool.spawn((position[0] + self.span / 2, position[1] + 0.4, position[2]), velocity, self.range),
+        )
+        self.slots = tuple(slot for slot in slots if slot >= 0)
 
     def check_impact(self) -> None:
-        """Check if the torpedoes have either hit the floor or entered the exhaust port"""
-        if self.l_torpedo[1] > -cfg.TRENCH_HEIGHT // 2:
-            return
-
-        self.impact = True
-        self._check_ontarget()
+        """Check if the torpedoes have hit a barrier, the floor, or entered the exhaust port"""
+        for slot in self.slots:
+            if self.pool.impacted[slot]:
+                self.impact = True
+                if self.impact_position is None:
+                    self.impact_position = tuple(self.pool.position[slot].tolist())
+                self._check_ontarget(slot)
 
     def bullseye_check(self) -> str | None:
         """Check if the torpedoes have hit the exhaust port."""
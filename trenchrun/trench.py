@@ -1,54 +1,417 @@
 """
 """
+import argparse
+import asyncio
+import logging
+import time
 
+import audio
+import calibration
 import config as cfg
+import profiles
 import pygame
-from screens import MainMenuScreen, Screen
-from utils import create_stars
+import services
+from allocations import AllocationTracker
+from audio import AudioEngine
+from icecream import ic
+from joystick import AnalogStick
+from latency import InputSampler
+from memory import MemoryManager
+from metrics import Metrics, MetricsExporter
+from pipeline import GeometryPipeline
+from profiler import ProfileCapture
+from recorder import FrameRecorder
+from renderers import RENDERERS, Renderer, create_renderer
+from runlog import RunLog
+from scheduler import FrameScheduler
+from screens import GameplayScreen, MainMenuScreen, Screen
+from services import BackgroundServices
+from starfield import Starfield
 
 
 class Game:
 
     """The primary class containing all game logic and state"""
 
-    def __init__(self) -> None:
+    def __init__(self, options: argparse.Namespace | None = None) -> None:
         """
         Initialize the game
 
         Initialize pygame module, game window, set up the starting screen, and call a few
         helper initialization methods
+
+        Args:
+            options (argparse.Namespace): Command line options, defaults are used if None
         """
+        options = options or parse_args([])
+        audio.pre_init()
         pygame.init()
         pygame.display.set_caption("Star Wars")
+        self.renderer: Renderer = create_renderer(options.renderer)
+        if options.config:
+            profiles.apply_profile(options.config)
+        self.preset = calibration.choose_preset(self.renderer, options.renderer, options.preset, options.calibrate)
         self.screen = pygame.display.set_mode((cfg.CANVAS_WIDTH, cfg.CANVAS_HEIGHT))
+        self.audio = AudioEngine()
+        cfg.HIDDEN_LINES = options.hidden_lines
+        cfg.PRACTICE_MODE = options.practice
+        cfg.GHOSTS = options.ghosts
+        cfg.RUN_SEED = options.seed
+        cfg.BARRIER_GRIDS = tuple(options.barrier_grid)
+        cfg.DEBUG_LOG = options.debug_log
+        # icecream parses the caller's source the first time it is used, which alone can take hundreds of ms
+        if not cfg.DEBUG_LOG:
+            ic.disable()
         self.clock = pygame.time.Clock()
+        self.stick = AnalogStick()
+        self.input = InputSampler(low_latency=options.low_latency, stick=self.stick)
+        # The allocation tracker measures one call stack at a time, so it needs geometry prepared on the main thread
+        self.pipeline = GeometryPipeline(options.pipeline, threaded=not options.profile_allocations)
+        self.memory = MemoryManager()
+        self.scheduler = FrameScheduler()
+        self.allocations: AllocationTracker | None = None
+        if options.profile_allocations:
+            self.allocations = AllocationTracker(strict=options.allocation_budgets)
+            self.allocations.install()
+        self.metrics = Metrics()
+        self.metrics_exporter = MetricsExporter(self.metrics, options.metrics_port, options.metrics_file)
+        self.metrics_exporter.start()
+        self.profiler = ProfileCapture(options.profile_frames or cfg.PROFILE_FRAMES, options.profile_dir)
+        if options.profile_frames:
+            self.profiler.trigger()
+        self.recorder = FrameRecorder(self.screen.get_size(), options.capture_dir, options.record_format, options.replay)
+        if options.record:
+            self.recorder.toggle_recording()
+        self.run_log = RunLog(options.run_log)
+        self.screenshot_requested: bool = False
+        self.services: BackgroundServices | None = None
         self.running: bool = True
         self.active_screen: Screen = MainMenuScreen(self)
 
-        self.stars: list = create_stars()
+        self.stars: Starfield = Starfield()
         self.violent_death: bool = False
+        # Everything loaded so far lives as long as the game, keep it out of the way of the garbage collector
+        self.memory.freeze_startup()
+        if options.resume:
+            self.active_screen = GameplayScreen.resume(self, options.resume, options.resume_tick)
 
     def run(self) -> None:
         """Main game loop"""
-        while self.running:
-            self.screen.fill((0, 0, 0))
-            self.clock.tick(60)
+        try:
+            while self.running:
+                self.renderer.begin_frame(self.screen)
+                self.input.wait(self.clock)
+                self.frame()
+        except Exception:
+            self.dump_state("crash")
+            raise
+
+        self.shutdown()
+
+    async def run_async(self, telemetry: tuple[str, int] | None = None) -> None:
+        """
+        Main game loop, as a task on an asyncio event loop
+
+        Background services run as coroutines in the slack between frames. The frame stops
+        yielding to them ASYNC_TIME_SLICE_S before it is due, and doesn't yield at all from
+        sampling the input to the flip, so they never hold up a flip as long as each step they
+        take fits in the slice. Blocking work belongs in a thread, with asyncio.to_thread.
+
+        Args:
+            telemetry (tuple): Host and port of a local collector to send telemetry to
+        """
+        self.services = BackgroundServices()
+        if telemetry:
+            self.services.spawn(services.send_telemetry(self, *telemetry), "telemetry")
+        try:
+            while self.running:
+                self.renderer.begin_frame(self.screen)
+                await self.input.wait_async(self.clock)
+                self.frame()
+        except Exception:
+            self.dump_state("crash")
+            raise
+        finally:
+            await self.services.close()
+
+        self.shutdown()
+
+    def frame(self) -> None:
+        """Sample the input, then update, render and show a frame"""
+        self.memory.begin_frame()
+        self.scheduler.begin_frame()
+        if self.memory.frame_time:
+            self.metrics.observe_frame(self.memory.frame_time)
+        self.profiler.begin_frame()
+        if self.allocations:
+            self.allocations.begin_frame()
+
+        events = self.input.sample()
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                self.handle_hotkey(event.key)
+            elif event.type in {pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED}:
+                self.stick.handle_event(event)
+        screen = self.active_screen
+        self.active_screen.handle_events(events)
+        self.active_screen.update()
+        self.active_screen.render(self.screen)
+        self.renderer.end_frame(self.screen)
+        # In low-latency mode nothing that isn't needed to show the frame runs before the flip
+        if not self.input.low_latency:
+            self.finish_frame()
+
+        pygame.display.flip()
+        latency = self.input.flipped()
+        if latency is not None:
+            self.metrics.input_latency.observe(latency)
+        if self.input.low_latency:
+            self.finish_frame()
+        if self.allocations:
+            self.allocations.end_frame(budgeted=self.active_screen is screen)
+        if self.profiler.active:
+            self.profiler.end_frame(self.describe())
+        self.memory.end_frame()
+
+    def shutdown(self) -> None:
+        """Stop the background workers and report on the session"""
+        self.active_screen.leave()
+        self.run_log.close()
+        if self.allocations:
+            self.allocations.report()
+            self.allocations.uninstall()
+        self.pipeline.close()
+        self.scheduler.report()
+        self.input.report()
+        self.audio.report()
+        self.memory.report()
+        self.memory.shutdown()
+        self.profiler.wait(cfg.PROFILE_WRITE_TIMEOUT_S)
+        self.metrics_exporter.stop()
+        self.recorder.close()
+
+    def finish_frame(self) -> None:
+        """Run the deferrable work and capture of the frame, which don't affect what it shows"""
+        self.scheduler.run_deferred()
+        self.recorder.capture(self.screen)
+        if self.screenshot_requested:
+            self.recorder.screenshot(self.screen)
+            self.screenshot_requested = False
+
+    def handle_hotkey(self, key: int) -> None:
+        """Handle the diagnostic and capture hotkeys, which work on every screen"""
+        if key == cfg.PROFILE_KEY:
+            self.profiler.trigger()
+        elif key == cfg.RECORD_KEY:
+            self.recorder.toggle_recording()
+        elif key == cfg.REPLAY_KEY:
+            self.recorder.save_replay()
+        elif key == cfg.SCREENSHOT_KEY:
+            self.screenshot_requested = True
+        elif key == cfg.JOYSTICK_CALIBRATE_KEY:
+            self.stick.toggle_calibration()
 
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    self.running = False
-            self.active_screen.handle_events(events)
-            self.active_screen.update()
-            self.active_screen.render(self.screen)
+    def dump_state(self, reason: str) -> None:
+        """
+        Write the rewind buffer of the run in progress to the capture directory, if there is one
+
+        Args:
+            reason (str): Prefix of the dump's file name
+        """
+        buffer = getattr(self.active_screen, "rewind", None)
+        if not buffer:
+            return
+        self.recorder.directory.mkdir(parents=True, exist_ok=True)
+        path = self.recorder.directory / f"{reason}-{time.strftime('%Y%m%d-%H%M%S')}.state"
+        buffer.dump(path)
+        logging.error(f"Dumped the last {len(buffer)} ticks of simulation state to {path}, resume with --resume")
 
-            pygame.display.flip()
+    def describe(self) -> dict[str, object]:
+        """Describe the current state of the game, used to tag diagnostics"""
+        return {
+            "screen": type(self.active_screen).__name__,
+            "barriers": len(getattr(self.active_screen, "barriers", ())),
+            "resolution": self.screen.get_size(),
+            "input_latency_ms": self.input.percentiles(),
+        }
 
     def set_screen(self, screen: Screen) -> None:
         """Set a new active screen to be rendering"""
+        self.active_screen.leave()
         self.active_screen = screen
 
 
+def address(value: str) -> tuple[str, int]:
+    """
+    Parse a HOST:PORT command line option, the host defaulting to METRICS_HOST
+
+    Args:
+        value (str): The option's value
+
+    Returns:
+        tuple: The host and port
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a host and a port from 1 to 65535
+    """
+    host, separator, port = value.rpartition(":")
+    if not separator or not port.isdigit() or not 0 < int(port) < 65536:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT with a port from 1 to 65535, not {value!r}")
+    return host.strip("[]") or cfg.METRICS_HOST, int(port)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line options
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv
+
+    Returns:
+        argparse.Namespace: The parsed options
+    """
+    parser = argparse.ArgumentParser(description="Star Wars Trench Run")
+    parser.add_argument(
+        "--renderer",
+        choices=sorted(RENDERERS),
+        default=cfg.RENDERER,
+        help="Rendering backend, surfarray batches the wireframe lines, null draws nothing for headless runs")
+    parser.add_argument(
+        "--config",
+        metavar="PROFILE",
+        help=f"Config profile for the trench size, speeds and resolution, by name from {cfg.CONFIG_PROFILE_DIRECTORY}/ or a path to a TOML file")
+    parser.add_argument(
+        "--preset",
+        choices=tuple(cfg.QUALITY_PRESETS),
+        help="Render quality preset to use, instead of the one chosen by calibration")
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Run the render quality calibration again, even if this hardware has already been calibrated")
+    parser.add_argument(
+        "--hidden-lines",
+        action="store_true",
+        default=cfg.HIDDEN_LINES,
+        help="Skip the edges of barriers that are hidden behind solid blocks")
+    parser.add_argument(
+        "--practice",
+        action="store_true",
+        default=cfg.PRACTICE_MODE,
+        help=f"Practice mode, the rewind key (Backspace) goes back {cfg.REWIND_STEP_SECONDS} seconds, also after a crash")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=cfg.RUN_SEED,
+        help="Seed of the barrier layout, the same layout every run, for racing ghosts and leaderboards")
+    parser.add_argument(
+        "--barrier-grid",
+        type=int,
+        nargs="+",
+        choices=range(1, cfg.BARRIER_MAX_GRID + 1),
+        default=cfg.BARRIER_GRIDS,
+        metavar="N",
+        help=f"Rows and columns of blocks of the barriers, up to {cfg.BARRIER_MAX_GRID}, each barrier picks one of several at random")
+    parser.add_argument(
+        "--ghosts",
+        action="store_true",
+        default=cfg.GHOSTS,
+        help=f"Race the ghosts of earlier runs of the same layout (see --seed), saving each run to {cfg.GHOST_DIRECTORY}/")
+    parser.add_argument(
+        "--resume",
+        metavar="DUMP",
+        help="Start straight into a run restored from a state dump, such as a crash dump")
+    parser.add_argument(
+        "--resume-tick",
+        type=int,
+        metavar="TICK",
+        help="The tick of the state dump to resume from (with --resume), the last one if not given")
+    parser.add_argument(
+        "--run-log",
+        default=cfg.RUN_LOG_FILE,
+        metavar="PATH",
+        help="Append-only log that every run is written to, for long-term stats (an empty path turns it off)")
+    parser.add_argument(
+        "--low-latency",
+        action="store_true",
+        default=cfg.LOW_LATENCY,
+        help="Sample input as late as possible before each frame, and defer non-critical work until after the flip")
+    parser.add_argument(
+        "--async",
+        dest="async_loop",
+        action="store_true",
+        default=cfg.ASYNC_LOOP,
+        help="Run the frame loop on asyncio, so background services run in the slack between frames")
+    parser.add_argument(
+        "--telemetry",
+        type=address,
+        metavar="HOST:PORT",
+        help="Send telemetry to a local collector as JSON lines over TCP (implies --async)")
+    parser.add_argument(
+        "--debug-log",
+        action="store_true",
+        default=cfg.DEBUG_LOG,
+        help="Log the torpedoes in flight every frame, slow enough to drop frames")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=cfg.PIPELINE_GEOMETRY,
+        help="Prepare each frame's geometry on a worker thread while the last is drawn (free-threaded Python only)")
+    parser.add_argument(
+        "--profile-allocations",
+        action="store_true",
+        help="Count the objects allocated per frame by the hot render and update paths")
+    parser.add_argument(
+        "--allocation-budgets",
+        action="store_true",
+        help="Fail the run when a function exceeds its allocation budget (with --profile-allocations)")
+    parser.add_argument(
+        "--profile-frames",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Profile the first N frames, and the N frames after each press of the profile hotkey (F9)")
+    parser.add_argument(
+        "--profile-dir",
+        default=cfg.PROFILE_DIRECTORY,
+        help="Directory that profile captures are written to")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics over HTTP on this local port")
+    parser.add_argument(
+        "--metrics-file",
+        help="Periodically write Prometheus metrics to this file, for a sidecar to scrape")
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Start recording gameplay immediately, the record hotkey (F10) toggles it")
+    parser.add_argument(
+        "--record-format",
+        choices=("raw", "png", "pipe"),
+        default=cfg.CAPTURE_FORMAT,
+        help="Write recordings as raw frames, a PNG sequence, or piped to a local encoder")
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help=f"Keep the last {cfg.REPLAY_SECONDS} seconds for instant replay, saved with the replay hotkey (F11)")
+    parser.add_argument(
+        "--capture-dir",
+        default=cfg.CAPTURE_DIRECTORY,
+        help="Directory that recordings, replays and screenshots are written to")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Entry point, parse the command line and run the game"""
+    options = parse_args()
+    game = Game(options)
+    if options.async_loop or options.telemetry:
+        asyncio.run(game.run_async(options.telemetry))
+    else:
+        game.run()
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    main()
@@ -6,13 +6,17 @@ import random
 import time
 
 import config as cfg
+import geometry as geo
+import grid
+import numpy as np
+from grid import Barrier
 
 logging.basicConfig(level=logging.INFO)
 
 
 def timeit(func: callable) -> callable:
     """Wrapper to measure the execution time of a function"""
-    def wrapper(*args, **kwargs):  #noqa
+    def wrapper(*args, **kwargs):
         start_time = time.time()
         result = func(*args, **kwargs)
         end_time = time.time()
@@ -39,63 +43,51 @@ def hex(n: int | float) -> str:
 
 
 @timeit
-def create_stars(star_count: int = 300) -> list[tuple[int, int]]:
-    """
-    Create a list of random star positions
-
-    Args:
-        star_count (int): The number of stars to create; default is 300
-
-    Returns:
-        list: A list of star position tuples
-    """
-    stars: list[tuple[int, int]] = []
-    for _ in range(star_count):
-        x: int = random.randrange(cfg.CANVAS_WIDTH)
-        y: int = random.randrange(cfg.CANVAS_HEIGHT)
-        stars.append((x, y))
-
-    return stars
-
-
-@timeit
-def create_barriers() -> list[tuple[float, float, list[int]]]:
+def create_barriers(seed: int | None = None) -> list[Barrier]:
     """
     Creates all of the barriers that appear in the game
 
-    Each Barrier is represented by three elements:
+    Each Barrier is represented by four elements:
     Start Position - the distance along the trench that the barrier starts
     Length - the length of the barrier
-    Blocks - an array of 9 ints, either 1 or 0, that indicate which blocks in a 3x3 square appear in the barrier.
+    Blocks - a bitset of the solid blocks in the barrier's grid, bit row * size + column from the top left
+    Size - the rows and columns of blocks in the grid, one of BARRIER_GRIDS
 
     The Barriers are placed in a list which is sequenced by the Start Position of the Barriers.
     This allows the rendering and collision code to consider only the barriers immediately surrounding the ship
 
     Args:
-        None
+        seed (int, optional): Seed for the layout, the same seed always creates the same barriers
 
     Returns:
         list: A list of all the barriers in the game
     """
+    rng = random.Random(seed)
     barriers = []
 
     # Determine Start Position and Last Position
     position = 150.0
     limit = cfg.LAUNCH_POSITION - 150
     while position < limit:
+        # With a single grid size nothing is drawn from the generator, so a seed keeps its layout
+        size = cfg.BARRIER_GRIDS[0] if len(cfg.BARRIER_GRIDS) == 1 else rng.choice(cfg.BARRIER_GRIDS)
+
         # Create a totally solid barrier
-        blocks = [1] * 9
+        blocks = grid.full(size)
 
-        # Punch a number of empty blocks in the barrier, adjusted by distance to exhaust port
+        # Punch a number of square openings in the barrier, adjusted by distance to exhaust port
+        # Each is a third of the barrier across, so finer barriers are as open as coarse ones
         empty_blocks = int((1.0 - (position / limit)) * 8) + 2
+        opening = max(1, size // 3)
         for i in range(0, empty_blocks):
-            blocks[random.randrange(9)] = 0
+            row, column = divmod(rng.randrange((size - opening + 1) ** 2), size - opening + 1)
+            blocks &= ~grid.rectangle(size, row, column, opening, opening)
 
         # Calculate a random length
-        length = random.randrange(5) + 5
-        barriers.append((position, length, blocks))
+        length = rng.randrange(5) + 5
+        barriers.append(Barrier(position, length, blocks, size))
         position += length
-        position += 40 + random.randrange(30)
+        position += 40 + rng.randrange(30)
 
     return barriers
 
@@ -113,7 +105,7 @@ def create_particles() -> list:
     """
     radius = cfg.DEATH_STAR_RADIUS
     particles: list[list[float, float]] = []
-    for _ in range(0, 500):
+    for _ in range(0, cfg.PARTICLE_COUNT):
         a = random.random() * 2 * math.pi
         m = random.random()
         x = math.sin(a) * m * radius
@@ -146,7 +138,10 @@ def move_particles(particles: list[list[float, float]]) -> list[list[float, floa
     return particles
 
 
-def project(point: tuple[float, float, float], pos: tuple[float, float, float]) -> tuple[float, float]:
+def project(
+    point: tuple[float, float, float],
+    pos: tuple[float, float, float],
+    view: geo.Viewport | None = None) -> tuple[float, float]:
     """
     Project a 3D point into a 2D canvas coordinate
 
@@ -156,17 +151,76 @@ def project(point: tuple[float, float, float], pos: tuple[float, float, float])
     Args:
         point (tuple): The 3D point to project
         pos (tuple): Current position of the ship
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
 
     Returns:
         tuple: The 2D canvas coordinates
     """
+    if view is None:
+        view = geo.table.viewport
     distance = point[2] - pos[2]
     distance = max(cfg.NEAR_PLANE_M, distance)
     x = (point[0] - pos[0]) / (distance + cfg.NEAR_PLANE_M)
     y = (point[1] - pos[1]) / (distance + cfg.NEAR_PLANE_M)
-    x *= cfg.SCALE_WIDTH
-    y *= cfg.SCALE_HEIGHT
-    x += (cfg.CANVAS_WIDTH // 2)
-    y += (cfg.CANVAS_HEIGHT // 2)
+    x *= view.scale_width
+    y *= view.scale_height
+    x += view.centre_x
+    y += view.centre_y
 
     return (x, y)
+
+
+def project_planes(
+    xs: tuple[float, ...],
+    ys: tuple[float, ...],
+    z: float,
+    pos: tuple[float, float, float],
+    view: geo.Viewport | None = None) -> tuple[list[float], list[float]]:
+    """
+    Project the x and y planes of a grid at a depth into canvas columns and rows
+
+    Projection is separable, the canvas x of a point only depends on its x and z and the canvas
+    y only on its y and z. So every corner of a grid of planes comes from projecting each plane
+    once, rather than each corner.
+
+    Args:
+        xs (tuple): The x of each plane
+        ys (tuple): The y of each plane
+        z (float): The depth of the grid
+        pos (tuple): Current position of the ship
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+    Returns:
+        tuple: The canvas x of each x plane, and the canvas y of each y plane, as project() would give
+    """
+    if view is None:
+        view = geo.table.viewport
+    distance = max(cfg.NEAR_PLANE_M, z - pos[2]) + cfg.NEAR_PLANE_M
+    return (
+        [(x - pos[0]) / distance * view.scale_width + view.centre_x for x in xs],
+        [(y - pos[1]) / distance * view.scale_height + view.centre_y for y in ys],
+    )
+
+
+def project_array(points: np.ndarray, pos: tuple[float, float, float], view: geo.Viewport | None = None) -> np.ndarray:
+    """
+    Project an array of 3D points into 2D canvas coordinates
+
+    Vectorized equivalent of project, for when many points need projecting at once.
+
+    Args:
+        points (np.ndarray): An (N, 3) array of the 3D points to project
+        pos (tuple): Current position of the ship
+        view (Viewport, optional): The viewport projected onto, defaults to the whole canvas
+
+    Returns:
+        np.ndarray: An (N, 2) array of the 2D canvas coordinates
+    """
+    if view is None:
+        view = geo.table.viewport
+    distance = np.maximum(points[:, 2] - pos[2], cfg.NEAR_PLANE_M) + cfg.NEAR_PLANE_M
+    projected = np.empty((len(points), 2), dtype=np.float64)
+    projected[:, 0] = (points[:, 0] - pos[0]) / distance * view.scale_width + view.centre_x
+    projected[:, 1] = (points[:, 1] - pos[1]) / distance * view.scale_height + view.centre_y
+
+    return projected